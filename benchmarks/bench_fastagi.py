@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Micro benchmarks of the FastAGI protocol parsing.
+
+Measure the parsing of the AGI environment, and the parsing of the command
+results and the quoting of arguments next to the implementations they replace.
+
+    python benchmarks/bench_fastagi.py --number 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import timeit
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from wazo_agid.fastagi import FastAGI  # noqa: E402
+
+AGI_ENV = b''.join(
+    [
+        b'agi_network: yes\n',
+        b'agi_network_script: incoming_user_set_features\n',
+        b'agi_request: agi://127.0.0.1/incoming_user_set_features\n',
+        b'agi_channel: PJSIP/rku1ry9a-00000004\n',
+        b'agi_language: en_US\n',
+        b'agi_type: PJSIP\n',
+        b'agi_uniqueid: 1695218632.4\n',
+        b'agi_version: 20.4.0\n',
+        b'agi_callerid: 1001\n',
+        b'agi_calleridname: Alice\n',
+        b'agi_callingpres: 0\n',
+        b'agi_callingani2: 0\n',
+        b'agi_callington: 0\n',
+        b'agi_callingtns: 0\n',
+        b'agi_dnid: 1002\n',
+        b'agi_rdnis: unknown\n',
+        b'agi_context: user\n',
+        b'agi_extension: s\n',
+        b'agi_priority: 2\n',
+        b'agi_enhanced: 0.0\n',
+        b'agi_accountcode: \n',
+        b'agi_threadid: 140106151368384\n',
+        b'agi_arg_1: 1\n',
+        b'\n',
+    ]
+)
+RESULTS = {
+    'result': '200 result=1\n',
+    'result with data': '200 result=1 (PJSIP/rku1ry9a)\n',
+    'result with endpos': '200 result=0 endpos=1234\n',
+}
+QUOTED: dict[str, str | int] = {
+    'plain': 'PJSIP/rku1ry9a-00000004',
+    'escaped': 'Alice "Al" Smith',
+    'int': 42,
+}
+
+
+class StreamAGI(FastAGI):
+    def __init__(self, inf):
+        self.inf = inf
+        self.env = {}
+
+
+def previous_result(agi):
+    # the parsing done before, kept for the less common responses
+    return agi._parse_result(agi.inf.readline().strip().decode('utf8'))
+
+
+def previous_quote(string):
+    # the quoting done before
+    return '"{}"'.format(
+        FastAGI._to_str(string)
+        .replace('\\', '\\\\')
+        .replace('"', '\\"')
+        .replace('\n', ' ')
+    )
+
+
+def measure(name, function, number):
+    elapsed = min(timeit.repeat(function, number=number, repeat=3))
+    print(f'{name:<40} {elapsed * 1e6 / number:8.3f} us/call')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--number', type=int, default=100000)
+    options = parser.parse_args()
+    number = options.number
+
+    agi = StreamAGI(BytesIO())
+    measure(
+        'env: FastAGI._get_agi_env',
+        lambda: StreamAGI(BytesIO(AGI_ENV))._get_agi_env(),
+        number,
+    )
+
+    for name, line in RESULTS.items():
+        encoded = line.encode('utf8')
+        agi.inf = BytesIO(encoded * number * 3)
+        measure(f'{name}: before', lambda: previous_result(agi), number)
+        agi.inf = BytesIO(encoded * number * 3)
+        measure(f'{name}: FastAGI.get_result', agi.get_result, number)
+
+    for name, value in QUOTED.items():
+        measure(f'quote {name}: before', lambda: previous_quote(value), number)
+        measure(f'quote {name}: FastAGI._quote', lambda: FastAGI._quote(value), number)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Measure Schedule.compute_state_for_now() across many schedules.
+
+The schedules get random periods and timezones. Each backend is measured on
+the first evaluation, which computes the next transition, and on the
+following ones, which reuse the state. The per-call evaluation used before
+schedules kept their state is measured as a baseline.
+
+    python benchmarks/bench_schedules.py --schedules 5000 --rounds 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import random
+import sys
+import time
+from pathlib import Path
+
+import pytz
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from wazo_agid import timezones  # noqa: E402
+from wazo_agid.schedule import (  # noqa: E402
+    ScheduleAction,
+    ScheduleBuilder,
+    SchedulePeriodBuilder,
+)
+
+TIMEZONES = [
+    'America/Montreal',
+    'America/Los_Angeles',
+    'Europe/Paris',
+    'Europe/London',
+    'Asia/Kolkata',
+    'Australia/Sydney',
+    'UTC',
+]
+
+
+def build_schedules(count: int, seed: int):
+    rng = random.Random(seed)
+    schedules = []
+    for _ in range(count):
+        builder = ScheduleBuilder().timezone_name(rng.choice(TIMEZONES))
+        builder.default_action(ScheduleAction('none', None, None))
+        for _ in range(rng.randint(1, 5)):
+            start = rng.randint(0, 22)
+            end = rng.randint(start + 1, 23)
+            period = SchedulePeriodBuilder().hours(f'{start:02d}:00-{end:02d}:59')
+            period.weekdays(rng.choice(['1-5', '6-7', '1-7']))
+            builder.opened(period.build())
+        closed = SchedulePeriodBuilder().months(str(rng.randint(1, 12)))
+        closed.action(ScheduleAction('voicemail', '1', None))
+        builder.closed(closed.build())
+        schedules.append(builder.build())
+    return schedules
+
+
+def per_call_state(schedule):
+    # the evaluation done before, loading the timezone on every call
+    timezone = pytz.timezone(schedule._timezone_name)
+    utc_now = pytz.utc.localize(datetime.datetime.utcnow())
+    return schedule.compute_state(utc_now.astimezone(timezone))
+
+
+def measure(name, function, schedules, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for schedule in schedules:
+            function(schedule)
+    elapsed = time.perf_counter() - start
+    calls = rounds * len(schedules)
+    print(f'{name:<32} {calls:>8d} calls {elapsed * 1e6 / calls:8.2f} us/call')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--schedules', type=int, default=5000)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    options = parser.parse_args()
+
+    measure(
+        'per call (pytz.timezone)',
+        per_call_state,
+        build_schedules(options.schedules, options.seed),
+        options.rounds,
+    )
+    for backend in timezones.BACKENDS:
+        timezones.configure(backend)
+        schedules = build_schedules(options.schedules, options.seed)
+        measure(
+            f'{backend} first evaluation',
+            lambda schedule: schedule.compute_state_for_now(),
+            schedules,
+            1,
+        )
+        measure(
+            f'{backend} cached state',
+            lambda schedule: schedule.compute_state_for_now(),
+            schedules,
+            options.rounds,
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Compare the threading and asyncio FastAGI server modes under load.
+
+Each mode is started in its own process with a synthetic handler that does a
+few AGI round trips and then waits, to simulate a slow database or REST call.
+The database is replaced by a no-op stand-in so only the server is measured.
+
+    python benchmarks/bench_server_modes.py --concurrency 500 --calls 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastagi_load import run_load, wait_for_server  # noqa: E402
+
+HOST = '127.0.0.1'
+SCRIPT = 'bench_handler'
+
+
+class NullPool:
+    def __init__(self, size):
+        self.size = size
+
+    def stats(self):
+        return {'size': self.size}
+
+
+class NullDatabase:
+    def __init__(self, db_uri, pool_size, **pool_options):
+        self.pool = NullPool(pool_size)
+
+    @contextmanager
+    def connection(self):
+        yield None
+
+    @contextmanager
+    def transaction(self, connection):
+        yield None
+
+
+def _serve(mode: str, port: int, max_workers: int, handler_delay: float) -> None:
+    from wazo_agid import agid
+
+    def bench_handler(agi, cursor, args):
+        for name in ('WAZO_USERID', 'WAZO_DSTID', 'WAZO_CALLORIGIN'):
+            agi.get_variable(name)
+        time.sleep(handler_delay)
+        for i in range(5):
+            agi.set_variable(f'WAZO_BENCH_{i}', i)
+
+    agid.Database = NullDatabase  # type: ignore[misc,assignment]
+    agid.register(bench_handler)
+    agid.init(
+        {
+            'db_uri': 'postgresql://',
+            'listen_address': HOST,
+            'listen_port': port,
+            'server_mode': mode,
+            'max_workers': max_workers,
+            'connection_pool_size': max_workers,
+        }
+    )
+    agid.run()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--max-workers', type=int, default=64)
+    parser.add_argument(
+        '--handler-delay',
+        type=float,
+        default=0.005,
+        help='seconds spent waiting in the handler for each call',
+    )
+    parser.add_argument('--port', type=int, default=14573)
+    parser.add_argument(
+        '--modes', nargs='+', default=['threading', 'asyncio'], metavar='MODE'
+    )
+    options = parser.parse_args()
+
+    for offset, mode in enumerate(options.modes):
+        port = options.port + offset
+        server = multiprocessing.Process(
+            target=_serve,
+            args=(mode, port, options.max_workers, options.handler_delay),
+            daemon=True,
+        )
+        server.start()
+        try:
+            wait_for_server(HOST, port, SCRIPT)
+            report = asyncio.run(
+                run_load(
+                    f'{mode} (concurrency={options.concurrency})',
+                    HOST,
+                    port,
+                    SCRIPT,
+                    options.concurrency,
+                    options.calls,
+                    server_pid=server.pid,
+                )
+            )
+            print(report.summary())
+        finally:
+            server.terminate()
+            server.join()
+
+
+if __name__ == '__main__':
+    main()
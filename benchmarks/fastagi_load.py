@@ -0,0 +1,209 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Asyncio FastAGI load generator playing the Asterisk side of AGI sessions"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import statistics
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+VariableAnswer = Callable[[str], str]
+
+SET_VARIABLE_REGEX = re.compile(
+    r'^SET VARIABLE "((?:[^"\\]|\\.)*)" "((?:[^"\\]|\\.)*)"$'
+)
+UNESCAPE_REGEX = re.compile(r'\\(.)')
+
+
+@dataclass
+class SessionResult:
+    latency: float
+    commands: int
+    failed: bool
+    variables: dict[str, str] = field(default_factory=dict)
+
+    def mismatches(self, expected: dict[str, str]) -> dict[str, str | None]:
+        """Variables of `expected` that were not set to the expected value"""
+        return {
+            name: self.variables.get(name)
+            for name, value in expected.items()
+            if self.variables.get(name) != value
+        }
+
+
+@dataclass
+class LoadReport:
+    name: str
+    duration: float
+    results: list[SessionResult] = field(default_factory=list)
+    peak_threads: int = 0
+
+    @property
+    def calls(self) -> int:
+        return len(self.results)
+
+    @property
+    def failures(self) -> int:
+        return sum(1 for result in self.results if result.failed)
+
+    def percentile(self, percent: float) -> float:
+        latencies = sorted(result.latency for result in self.results)
+        if not latencies:
+            return 0.0
+        index = min(len(latencies) - 1, int(len(latencies) * percent / 100))
+        return latencies[index]
+
+    def summary(self) -> str:
+        commands = [result.commands for result in self.results] or [0]
+        return (
+            f'{self.name:<40} calls={self.calls:<7d} failed={self.failures:<5d} '
+            f'calls/s={self.calls / self.duration:9.1f} '
+            f'p50={self.percentile(50) * 1000:8.2f}ms '
+            f'p99={self.percentile(99) * 1000:8.2f}ms '
+            f'cmds/call={statistics.mean(commands):6.1f} '
+            f'peak_threads={self.peak_threads}'
+        )
+
+
+def build_env(script: str, args: list[str], env: dict[str, str]) -> bytes:
+    lines = [
+        'agi_network: yes',
+        f'agi_network_script: {script}',
+        f'agi_request: agi://localhost/{script}',
+        'agi_channel: PJSIP/bench-00000001',
+        'agi_uniqueid: 1700000000.1',
+    ]
+    lines.extend(f'agi_arg_{i}: {arg}' for i, arg in enumerate(args, start=1))
+    lines.extend(f'{key}: {value}' for key, value in env.items())
+    return ('\n'.join(lines) + '\n\n').encode('utf8')
+
+
+def _record_set_variable(command: str, variables: dict[str, str]) -> None:
+    match = SET_VARIABLE_REGEX.match(command)
+    if match:
+        name, value = (UNESCAPE_REGEX.sub(r'\1', group) for group in match.groups())
+        variables[name] = value
+
+
+def _answer(command: str, variables: VariableAnswer) -> bytes:
+    if command.startswith('GET VARIABLE') or command.startswith('GET FULL VARIABLE'):
+        name = command.split('"')[1]
+        value = variables(name)
+        if value:
+            return f'200 result=1 ({value})\n'.encode('utf8')
+        return b'200 result=0\n'
+    return b'200 result=1\n'
+
+
+async def run_session(
+    host: str,
+    port: int,
+    script: str,
+    args: list[str] | None = None,
+    env: dict[str, str] | None = None,
+    variables: VariableAnswer | None = None,
+    expected: dict[str, str] | None = None,
+) -> SessionResult:
+    """Play one AGI session, failed if `expected` variables are not all set"""
+    variables = variables or (lambda name: '')
+    commands = 0
+    failed = False
+    set_variables: dict[str, str] = {}
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(build_env(script, args or [], env or {}))
+        await writer.drain()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode('utf8').strip()
+            if not command:
+                continue
+            commands += 1
+            if 'agi_fail' in command:
+                failed = True
+            if command.startswith('failure') or command.startswith('Status:'):
+                continue
+            if command.startswith('SET VARIABLE'):
+                _record_set_variable(command, set_variables)
+            writer.write(_answer(command, variables))
+            await writer.drain()
+    except ConnectionError:
+        failed = True
+    finally:
+        writer.close()
+    result = SessionResult(time.perf_counter() - start, commands, failed, set_variables)
+    if expected and result.mismatches(expected):
+        result.failed = True
+    return result
+
+
+def thread_count(pid: int) -> int:
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('Threads:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+async def run_load(
+    name: str,
+    host: str,
+    port: int,
+    script: str,
+    concurrency: int,
+    total_calls: int,
+    server_pid: int | None = None,
+    **session_kwargs,
+) -> LoadReport:
+    """Run `total_calls` sessions with at most `concurrency` of them in flight"""
+    report = LoadReport(name=name, duration=0.0)
+    semaphore = asyncio.Semaphore(concurrency)
+    sampling = True
+
+    async def sample_threads() -> None:
+        while sampling and server_pid:
+            report.peak_threads = max(report.peak_threads, thread_count(server_pid))
+            await asyncio.sleep(0.05)
+
+    async def one_call() -> None:
+        async with semaphore:
+            try:
+                result = await run_session(host, port, script, **session_kwargs)
+            except OSError:
+                result = SessionResult(0.0, 0, True)
+            report.results.append(result)
+
+    sampler = asyncio.create_task(sample_threads())
+    start = time.perf_counter()
+    await asyncio.gather(*(one_call() for _ in range(total_calls)))
+    report.duration = time.perf_counter() - start
+    sampling = False
+    await sampler
+    return report
+
+
+def wait_for_server(host: str, port: int, script: str, timeout: float = 30.0) -> None:
+    async def probe() -> None:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                await run_session(host, port, script)
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.1)
+            else:
+                return
+
+    asyncio.run(probe())
@@ -1,4 +1,4 @@
-# Copyright 2021-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2021-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import logging
@@ -6,6 +6,7 @@ import random
 from contextlib import contextmanager
 
 import sqlalchemy as sa
+from psycopg2.extras import DictCursor
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.sql import text
 from xivo_dao.alchemy.all import (
@@ -13,6 +14,7 @@ from xivo_dao.alchemy.all import (
     LineFeatures,
     OutcallTrunk,
     RightCallExten,
+    RightCallMember,
     UserFeatures,
 )
 from xivo_dao.tests.test_dao import ItemInserter
@@ -76,6 +78,16 @@ class DbHelper:
         with self.connect() as connection:
             yield DatabaseQueries(connection)
 
+    @contextmanager
+    def cursor(self):
+        # the cursor given to the handlers
+        connection = self._engine.raw_connection()
+        try:
+            with connection.cursor(cursor_factory=DictCursor) as cursor:
+                yield cursor
+        finally:
+            connection.close()
+
 
 class DatabaseQueries:
     def __init__(self, connection):
@@ -187,6 +199,12 @@ class DatabaseQueries:
             user_call_permission = inserter.add_user_call_permission(**kwargs)
             return {'id': user_call_permission.id}
 
+    def insert_call_permission_member(self, **kwargs):
+        with self.inserter() as inserter:
+            member = RightCallMember(**kwargs)
+            inserter.add_me(member)
+            return {'id': member.id}
+
     def insert_endpoint_sip(self, **kwargs):
         with self.inserter() as inserter:
             sip = inserter.add_endpoint_sip(**kwargs)
@@ -0,0 +1,169 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import pytest
+from hamcrest import assert_that, contains_exactly, empty, has_entries
+
+from wazo_agid.modules.user_set_call_rights import _fetch_rules
+
+from .helpers.base import BaseAssetLaunchingHelper
+
+
+@pytest.fixture(scope='module')
+def call_rights(base_asset: BaseAssetLaunchingHelper) -> dict[str, dict]:
+    """
+    alice is in the sales group, bob in the sales and support groups.
+    `shared` applies to alice, the sales group and the paris outcall.
+    """
+    with base_asset.db.queries() as queries:
+        alice = queries.insert_user(rightcallcode='1234')
+        bob = queries.insert_user()
+        carol = queries.insert_user()
+        sales = queries.insert_group()
+        support = queries.insert_group()
+        queries.insert_group_user_member(alice['id'], sales['name'])
+        queries.insert_group_user_member(bob['id'], sales['name'])
+        queries.insert_group_user_member(bob['id'], support['name'])
+        paris = queries.insert_outgoing_call()
+        london = queries.insert_outgoing_call()
+
+        rights = {
+            name: queries.insert_call_permission(
+                authorization=authorization, passwd=passwd, commented=commented
+            )
+            for name, authorization, passwd, commented in (
+                ('alice', 0, 'secret', 0),
+                ('alice_commented', 0, '', 1),
+                ('sales', 1, '', 0),
+                ('support', 0, '', 0),
+                ('paris', 0, '', 0),
+                ('london', 1, '', 0),
+                ('shared', 1, 'shared', 0),
+            )
+        }
+        members = (
+            ('alice', 'user', alice['id']),
+            ('alice_commented', 'user', alice['id']),
+            ('sales', 'group', sales['id']),
+            ('support', 'group', support['id']),
+            ('paris', 'outcall', paris['id']),
+            ('london', 'outcall', london['id']),
+            ('shared', 'user', alice['id']),
+            ('shared', 'group', sales['id']),
+            ('shared', 'outcall', paris['id']),
+        )
+        for name, type_, typeval in members:
+            queries.insert_call_permission_member(
+                rightcallid=rights[name]['id'], type=type_, typeval=str(typeval)
+            )
+
+    return {
+        'users': {'alice': alice, 'bob': bob, 'carol': carol},
+        'outcalls': {'paris': paris, 'london': london},
+        'rights': {name: right['id'] for name, right in rights.items()},
+    }
+
+
+def _rules(
+    base_asset: BaseAssetLaunchingHelper,
+    call_rights: dict[str, dict],
+    user: str | None,
+    outcall: str | None,
+    rights: list[str] | None = None,
+) -> dict[str, list[dict]]:
+    rights = rights or list(call_rights['rights'])
+    user_id = call_rights['users'][user]['id'] if user else None
+    outcall_id = call_rights['outcalls'][outcall]['id'] if outcall else None
+    with base_asset.db.cursor() as cursor:
+        rules = _fetch_rules(
+            cursor,
+            {call_rights['rights'][name] for name in rights},
+            user_id,
+            outcall_id,
+        )
+    return {
+        kind: [dict(row) for row in rules.get(kind, [])]
+        for kind in ('user', 'group', 'outcall')
+    }
+
+
+def test_rules_of_the_user_of_their_groups_and_of_the_outcall(
+    base_asset: BaseAssetLaunchingHelper, call_rights
+):
+    ids = call_rights['rights']
+
+    rules = _rules(base_asset, call_rights, 'alice', 'paris')
+
+    assert_that(
+        rules['user'],
+        contains_exactly(
+            has_entries(id=ids['alice'], passwd='secret', rightcallcode='1234'),
+            has_entries(id=ids['shared'], passwd='shared', rightcallcode='1234'),
+        ),
+    )
+    assert_that(
+        rules['group'],
+        contains_exactly(
+            has_entries(id=ids['sales'], authorization=1),
+            has_entries(id=ids['shared'], authorization=1),
+        ),
+    )
+    assert_that(
+        rules['outcall'],
+        contains_exactly(
+            has_entries(id=ids['paris'], authorization=0),
+            has_entries(id=ids['shared'], authorization=1),
+        ),
+    )
+
+
+def test_rules_of_all_the_groups_of_the_user(
+    base_asset: BaseAssetLaunchingHelper, call_rights
+):
+    ids = call_rights['rights']
+
+    rules = _rules(base_asset, call_rights, 'bob', 'london')
+
+    assert_that(
+        [row['id'] for row in rules['group']],
+        contains_exactly(*sorted([ids['sales'], ids['support'], ids['shared']])),
+    )
+    assert_that(rules['outcall'], contains_exactly(has_entries(id=ids['london'])))
+
+
+def test_only_the_matching_rights_are_returned(
+    base_asset: BaseAssetLaunchingHelper, call_rights
+):
+    ids = call_rights['rights']
+
+    rules = _rules(base_asset, call_rights, 'bob', 'paris', rights=['support'])
+
+    assert_that(rules['group'], contains_exactly(has_entries(id=ids['support'])))
+    assert_that(rules['outcall'], empty())
+
+
+def test_user_without_rules_is_returned(
+    base_asset: BaseAssetLaunchingHelper, call_rights
+):
+    rules = _rules(base_asset, call_rights, 'carol', None)
+
+    assert_that(rules['user'], contains_exactly(has_entries(id=None)))
+    assert_that(rules['group'], empty())
+    assert_that(rules['outcall'], empty())
+
+
+def test_unknown_user_has_no_user_rules(
+    base_asset: BaseAssetLaunchingHelper, call_rights
+):
+    ids = call_rights['rights']
+
+    rules = _rules(base_asset, call_rights, None, 'paris')
+
+    assert_that(rules['user'], empty())
+    assert_that(rules['group'], empty())
+    assert_that(
+        rules['outcall'],
+        contains_exactly(has_entries(id=ids['paris']), has_entries(id=ids['shared'])),
+    )
@@ -1,12 +1,16 @@
-# Copyright 2008-2024 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2008-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from __future__ import annotations
 
+import abc
 import logging
 import signal
+import socket
 import socketserver
+import threading
 import time
+from collections.abc import Iterator
 from contextlib import contextmanager
 from types import FrameType
 from typing import Any, Callable
@@ -17,7 +21,20 @@ from sqlalchemy.engine.url import make_url
 from xivo import agitb, moresynchro
 from xivo_dao.helpers.db_utils import session_scope
 
-from wazo_agid.fastagi import FastAGI, FastAGIDialPlanBreak
+from wazo_agid import (
+    cache,
+    circuit_breaker,
+    metrics,
+    mobile_connections,
+    outgoing_callerids,
+    pool,
+    profiler,
+    reverse_lookup,
+    timezones,
+    tracing,
+    workers,
+)
+from wazo_agid.fastagi import AGIInput, AGIOutput, FastAGI, FastAGIDialPlanBreak
 
 logger = logging.getLogger(__name__)
 
@@ -26,10 +43,14 @@ HandleFunction = Callable[[FastAGI, DictCursor, list], None]
 
 CONNECTION_TIMEOUT = 60
 
-_server: AGID = None  # type: ignore[assignment]
+_server: BaseAGID = None  # type: ignore[assignment]
 _handlers: dict[str, Handler] = {}
 
 
+class HandlerSaturated(FastAGIDialPlanBreak):
+    pass
+
+
 def info_from_db_uri(db_uri: str) -> dict[str, str | int]:
     parsed_url = make_url(db_uri)
     exceptions = {'database': 'dbname', 'username': 'user'}
@@ -42,18 +63,47 @@ def info_from_db_uri(db_uri: str) -> dict[str, str | int]:
 
 
 class Database:
-    def __init__(self, db_uri: str):
+    def __init__(
+        self,
+        db_uri: str,
+        pool_size: int = pool.DEFAULT_POOL_SIZE,
+        pool_timeout: float = pool.DEFAULT_WAIT_TIMEOUT,
+        max_lifetime: float = pool.DEFAULT_MAX_LIFETIME,
+    ):
         self.connection_info = info_from_db_uri(db_uri)
+        self.pool = pool.ConnectionPool(
+            self.connection_info,
+            size=pool_size,
+            wait_timeout=pool_timeout,
+            max_lifetime=max_lifetime,
+        )
 
     @contextmanager
     def connection(self):
-        with psycopg2.connect(**self.connection_info) as connection:
+        connection = self.pool.getconn()
+        try:
+            yield connection
+            connection.commit()
+        finally:
+            self.pool.putconn(connection)
+
+    @contextmanager
+    def unpooled_connection(self):
+        """
+        Connection opened outside of the pool, for the reloads that must not
+        wait for a worker to release a connection
+        """
+        connection = psycopg2.connect(**self.connection_info)
+        try:
             yield connection
+            connection.commit()
+        finally:
+            connection.close()
 
     @contextmanager
     def transaction(self, connection: psycopg2.connection) -> DictCursor:
         try:
-            with connection.cursor(cursor_factory=DictCursor) as cursor:
+            with connection.cursor(cursor_factory=metrics.TimedCursor) as cursor:
                 yield cursor
                 connection.commit()
         except psycopg2.DatabaseError:
@@ -62,80 +112,235 @@ class Database:
             raise
 
 
-class FastAGIRequestHandler(socketserver.StreamRequestHandler):
-    config: dict[str, Any]
+def handle_request(inf: AGIInput, outf: AGIOutput, config: dict[str, Any]) -> None:
+    with metrics.track_request() as timer:
+        _handle_request(inf, outf, config, timer)
 
-    def handle(self):
-        try:
-            logger.debug("handling request")
 
-            fagi = FastAGI(self.rfile, self.wfile, self.config)
-            except_hook = agitb.Hook(agi=fagi)
+def _handle_request(
+    inf: AGIInput, outf: AGIOutput, config: dict[str, Any], timer: metrics.RequestTimer
+) -> None:
+    try:
+        logger.debug("handling request")
 
-            handler_name = fagi.env['agi_network_script']
-            logger.debug("delegating request handling %r", handler_name)
-            with _server.database.connection() as conn:
-                with _server.database.transaction(conn) as cursor:
-                    _handlers[handler_name].handle(fagi, cursor, fagi.args)
+        fagi = FastAGI(inf, outf, config)
+        except_hook = agitb.Hook(agi=fagi)
 
-                fagi.verbose(f'AGI handler {handler_name!r} successfully executed')
-                logger.debug("request successfully handled")
+        handler_name = fagi.env['agi_network_script']
+        handler = _handlers[handler_name]
+        timer.handler = handler_name
+        logger.debug("delegating request handling %r", handler_name)
+        with handler.admission(), _server.database.connection() as conn:
+            with _server.database.transaction(conn) as cursor:
+                # channel variables are written once the handler returns
+                with fagi.batch(), metrics.timed('handler', handler_name):
+                    handler.handle(fagi, cursor, fagi.args)
 
-        # Attempt to relay errors to Asterisk, but if it fails, we
-        # just give up.
-        # XXX It may be here that dropped database connection
-        # exceptions could be caught.
-        except FastAGIDialPlanBreak as message:
-            logger.info("invalid request, dial plan broken")
+            fagi.verbose(f'AGI handler {handler_name!r} successfully executed')
+            logger.debug("request successfully handled")
 
-            try:
-                fagi.verbose(message)
-                # TODO: see under
-                fagi.appexec('Goto', 'agi_fail,s,1')
-                fagi.fail()
-            except Exception:
-                pass
+    # Attempt to relay errors to Asterisk, but if it fails, we
+    # just give up.
+    # XXX It may be here that dropped database connection
+    # exceptions could be caught.
+    except FastAGIDialPlanBreak as message:
+        logger.info("invalid request, dial plan broken")
+        timer.fail(message)
+
+        try:
+            fagi.verbose(message)
+            # TODO: see under
+            fagi.appexec('Goto', 'agi_fail,s,1')
+            fagi.fail()
         except Exception:
-            logger.exception("unexpected exception")
-            try:
-                except_hook.handle()
-                # TODO: (important!)
-                #   - rename agi_fail, or find a better way
-                #   - move at the beginning of a safe block
-                fagi.appexec('Goto', 'agi_fail,s,1')
-                fagi.fail()
-            except Exception:
-                pass
+            pass
+    except Exception as e:
+        logger.exception("unexpected exception")
+        timer.fail(e)
+        try:
+            except_hook.handle()
+            # TODO: (important!)
+            #   - rename agi_fail, or find a better way
+            #   - move at the beginning of a safe block
+            fagi.appexec('Goto', 'agi_fail,s,1')
+            fagi.fail()
+        except Exception:
+            pass
 
 
-class AGID(socketserver.ThreadingTCPServer):
-    allow_reuse_address = True
+class FastAGIRequestHandler(socketserver.StreamRequestHandler):
+    config: dict[str, Any]
+
+    def handle(self):
+        handle_request(self.rfile, self.wfile, self.config)
+
+
+def _create_database(config: dict[str, Any]) -> Database:
+    return Database(
+        config["db_uri"],
+        pool_size=int(config.get("connection_pool_size", pool.DEFAULT_POOL_SIZE)),
+        pool_timeout=float(
+            config.get("connection_pool_timeout", pool.DEFAULT_WAIT_TIMEOUT)
+        ),
+        max_lifetime=float(
+            config.get("connection_max_lifetime", pool.DEFAULT_MAX_LIFETIME)
+        ),
+    )
+
+
+def _setup_caches(config: dict[str, Any]) -> None:
+    cache.configure(
+        ttl=float(config.get("config_cache_ttl", cache.DEFAULT_TTL)),
+        max_entries=int(
+            config.get("config_cache_max_entries", cache.DEFAULT_MAX_ENTRIES)
+        ),
+    )
+
+    reverse_lookup_config = config.get("reverse_lookup", {})
+    reverse_lookup.configure(
+        ttl=float(reverse_lookup_config.get("cache_ttl", reverse_lookup.DEFAULT_TTL)),
+        negative_ttl=float(
+            reverse_lookup_config.get(
+                "negative_ttl", reverse_lookup.DEFAULT_NEGATIVE_TTL
+            )
+        ),
+        error_ttl=float(
+            reverse_lookup_config.get("error_ttl", reverse_lookup.DEFAULT_ERROR_TTL)
+        ),
+        max_entries=int(
+            reverse_lookup_config.get("max_entries", reverse_lookup.DEFAULT_MAX_ENTRIES)
+        ),
+        deferred=bool(reverse_lookup_config.get("deferred", False)),
+        wait_budget=float(
+            reverse_lookup_config.get(
+                "wait_budget_ms", reverse_lookup.DEFAULT_WAIT_BUDGET * 1000
+            )
+        )
+        / 1000,
+        lookup_workers=int(
+            reverse_lookup_config.get(
+                "lookup_workers", reverse_lookup.DEFAULT_LOOKUP_WORKERS
+            )
+        ),
+    )
+
+    outgoing_callerids_config = config.get("outgoing_callerids", {})
+    outgoing_callerids.configure(
+        ttl=float(
+            outgoing_callerids_config.get("cache_ttl", outgoing_callerids.DEFAULT_TTL)
+        ),
+        max_entries=int(
+            outgoing_callerids_config.get(
+                "max_entries", outgoing_callerids.DEFAULT_MAX_ENTRIES
+            )
+        ),
+    )
+
+    mobile_connections_config = config.get("mobile_connections", {})
+    mobile_connections.configure(
+        ttl=float(
+            mobile_connections_config.get("cache_ttl", mobile_connections.DEFAULT_TTL)
+        ),
+        negative_ttl=float(
+            mobile_connections_config.get(
+                "negative_ttl", mobile_connections.DEFAULT_NEGATIVE_TTL
+            )
+        ),
+        max_entries=int(
+            mobile_connections_config.get(
+                "max_entries", mobile_connections.DEFAULT_MAX_ENTRIES
+            )
+        ),
+    )
+
+
+def _setup_tracing(config: dict[str, Any]) -> None:
+    tracing_config = config.get("tracing", {})
+    tracing.configure(
+        bool(tracing_config.get("enabled", False)),
+        min_duration=float(
+            tracing_config.get("min_duration", tracing.DEFAULT_MIN_DURATION)
+        ),
+        buffer_size=int(tracing_config.get("buffer_size", tracing.DEFAULT_BUFFER_SIZE)),
+    )
+
+
+def _register_stats(database: Database) -> None:
+    metrics.registry.register_stats('wazo_agid_db_pool', database.pool.stats)
+    metrics.registry.register_stats(
+        'wazo_agid_config_cache', cache.stats, label='cache'
+    )
+    metrics.registry.register_stats(
+        'wazo_agid_reverse_lookup_cache', reverse_lookup.stats
+    )
+    metrics.registry.register_stats(
+        'wazo_agid_outgoing_callerid_cache', outgoing_callerids.stats
+    )
+    metrics.registry.register_stats(
+        'wazo_agid_mobile_connection_cache', mobile_connections.stats
+    )
+    metrics.registry.register_stats(
+        'wazo_agid_circuit_breaker', circuit_breaker.stats, label='service'
+    )
+
+
+def _max_workers(config: dict[str, Any], pool_size: int) -> int:
+    # each worker holds a database connection for the whole request
+    max_workers = int(config.get("max_workers") or workers.DEFAULT_MAX_WORKERS)
+    if max_workers > pool_size:
+        logger.warning(
+            'max_workers (%d) is limited to connection_pool_size (%d)',
+            max_workers,
+            pool_size,
+        )
+        max_workers = pool_size
+    logger.debug("max_workers: %d", max_workers)
+    return max_workers
+
+
+def _set_concurrency_limits(config: dict[str, Any]) -> None:
+    limits = config.get("handler_concurrency_limits") or {}
+    for handler_name, limit in limits.items():
+        if handler_name not in _handlers:
+            logger.warning('cannot limit unknown handler %r', handler_name)
+            continue
+        _handlers[handler_name].set_concurrency_limit(int(limit))
+
+
+class BaseAGID(abc.ABC):
     initialized = False
-    request_queue_size = 20
-    # Use Daemon threads to avoid memory leak in Python 3.7.
-    # The ThreadingMixin in Python 3.7 sets daemon_threads to false, but block_on_close to True
-    # and this causes a reference to accumulate over time and fills the memory.
-    # Using daemon threads avoids this problem, and they will be killed along with the main
-    # process if killed. This did not exist in Python 2.7. For reference:
-    # https://salsa.debian.org/debian/python-prometheus-client/-/commit/5aa256d8aab3b81604b855dc03f260342fc391fb
-    # Should be patched in later versions of Python so re-check after the upgrade to Bullseye
-    daemon_threads = True
-
-    def __init__(self, config: dict[str, Any]) -> None:
+
+    def __init__(
+        self,
+        config: dict[str, Any],
+        listen_socket: socket.socket | None = None,
+        worker_index: int = 0,
+    ) -> None:
         logger.info('wazo-agid starting...')
 
         self.config = config
+        self.listen_socket = listen_socket
+        self.worker_index = worker_index
         signal.signal(signal.SIGHUP, sighup_handle)
 
-        self.database = Database(self.config["db_uri"])
-        self.setup()
-
-        FastAGIRequestHandler.config = config
-        socketserver.ThreadingTCPServer.__init__(
-            self, (self.listen_addr, self.listen_port), FastAGIRequestHandler
+        self.database = _create_database(self.config)
+        _setup_caches(self.config)
+        timezones.configure(
+            self.config.get("timezone_backend", timezones.DEFAULT_BACKEND)
         )
-
-        self.initialized = True
+        _setup_tracing(self.config)
+        _register_stats(self.database)
+        metrics.setup(self.config.get("metrics", {}), port_offset=worker_index)
+        profiler.setup(self.config.get("profiling", {}))
+
+        self.max_workers = _max_workers(self.config, self.database.pool.size)
+        self.accept_queue_size = int(
+            self.config.get("accept_queue_size", workers.DEFAULT_QUEUE_SIZE)
+        )
+        logger.debug("accept_queue_size: %d", self.accept_queue_size)
+        _set_concurrency_limits(self.config)
+        metrics.registry.register_stats('wazo_agid_workers', self.worker_stats)
+        self.setup()
 
     def setup(self) -> None:
         if not self.initialized:
@@ -147,7 +352,7 @@ class AGID(socketserver.ThreadingTCPServer):
 
         for i in range(1, CONNECTION_TIMEOUT + 1):
             try:
-                with self.database.connection():
+                with self.database.unpooled_connection():
                     pass
                 break
             except psycopg2.OperationalError:
@@ -157,6 +362,88 @@ class AGID(socketserver.ThreadingTCPServer):
                 logger.error('Connecting to database timed out. Giving up.')
                 raise
 
+    @abc.abstractmethod
+    def serve_forever(self) -> None:
+        """Accept and handle the AGI connections until the server is shut down"""
+
+    @abc.abstractmethod
+    def worker_stats(self) -> dict[str, int]:
+        """Usage of the worker threads, exported with the metrics"""
+
+
+class AGID(socketserver.TCPServer, BaseAGID):
+    """
+    FastAGI server handling the connections in a fixed pool of max_workers
+    threads. When all the threads are busy and accept_queue_size connections
+    are already waiting, new calls are sent to agi_fail right away by the
+    threads of the rejector, so that slow clients do not delay the accept loop.
+    """
+
+    allow_reuse_address = True
+    request_queue_size = 20
+
+    def __init__(
+        self,
+        config: dict[str, Any],
+        listen_socket: socket.socket | None = None,
+        worker_index: int = 0,
+    ) -> None:
+        BaseAGID.__init__(self, config, listen_socket, worker_index)
+
+        FastAGIRequestHandler.config = config
+        socketserver.TCPServer.__init__(
+            self,
+            (self.listen_addr, self.listen_port),
+            FastAGIRequestHandler,
+            bind_and_activate=listen_socket is None,
+        )
+        if listen_socket is not None:
+            # the socket is bound by the parent process in pre-fork mode
+            self.socket.close()
+            self.socket = listen_socket
+        # Daemon threads are killed along with the main process
+        self.workers = workers.WorkerPool(
+            self.process_request_thread,
+            max_workers=self.max_workers,
+            queue_size=self.accept_queue_size,
+        )
+        self.rejector = workers.WorkerPool(
+            self.reject_request_thread,
+            max_workers=workers.REJECT_WORKERS,
+            queue_size=workers.REJECT_QUEUE_SIZE,
+            name='agid-reject',
+        )
+
+        self.initialized = True
+
+    def process_request(self, request, client_address) -> None:
+        if not self.workers.submit(request, client_address):
+            logger.warning(
+                'all %d workers are busy, rejecting connection from %s',
+                self.max_workers,
+                client_address,
+            )
+            if not self.rejector.submit(request):
+                # too many connections to reject, drop this one
+                self.shutdown_request(request)
+
+    def reject_request_thread(self, request) -> None:
+        try:
+            workers.reject_connection(request)
+        finally:
+            self.shutdown_request(request)
+
+    def process_request_thread(self, request, client_address) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def worker_stats(self) -> dict[str, int]:
+        return self.workers.stats()
+
 
 class Handler:
     def __init__(
@@ -169,6 +456,25 @@ class Handler:
         self.setup_fn = setup_fn
         self.handle_fn = handle_fn
         self.lock = moresynchro.RWLock()
+        self.concurrency_limit: threading.BoundedSemaphore | None = None
+
+    def set_concurrency_limit(self, limit: int) -> None:
+        logger.debug("limiting %r to %d concurrent requests", self.handler_name, limit)
+        self.concurrency_limit = threading.BoundedSemaphore(limit)
+
+    @contextmanager
+    def admission(self) -> Iterator[None]:
+        if self.concurrency_limit is None:
+            yield
+            return
+
+        if not self.concurrency_limit.acquire(blocking=False):
+            logger.warning("too many concurrent %r requests", self.handler_name)
+            raise HandlerSaturated(f'AGI handler {self.handler_name!r} is saturated')
+        try:
+            yield
+        finally:
+            self.concurrency_limit.release()
 
     def setup(self, cursor: DictCursor) -> None:
         if self.setup_fn:
@@ -207,9 +513,14 @@ def register(handle_fn: HandleFunction, setup_fn: SetupFunction | None = None) -
 def sighup_handle(signum: int, frame: FrameType | None) -> None:
     logger.debug("reloading core engine")
     _server.setup()
+    cache.clear_all()
+    reverse_lookup.clear()
+    outgoing_callerids.clear()
+    mobile_connections.clear()
 
     logger.debug("reloading handlers")
-    with _server.database.connection() as conn:
+    # the workers may hold all the connections of the pool
+    with _server.database.unpooled_connection() as conn:
         with _server.database.transaction(conn) as cursor:
             for handler in _handlers.values():
                 handler.reload(cursor)
@@ -226,6 +537,13 @@ def run() -> None:
     _server.serve_forever()
 
 
-def init(config) -> None:
+def init(
+    config, listen_socket: socket.socket | None = None, worker_index: int = 0
+) -> None:
     global _server
-    _server = AGID(config)
+    if config.get('server_mode') == 'asyncio':
+        from wazo_agid.aio import AsyncAGID
+
+        _server = AsyncAGID(config, listen_socket, worker_index)
+    else:
+        _server = AGID(config, listen_socket, worker_index)
@@ -0,0 +1,162 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import asyncio
+import errno
+import logging
+import signal
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from wazo_agid import agid, workers
+
+logger = logging.getLogger(__name__)
+
+
+async def read_agi_env(reader: asyncio.StreamReader) -> list[bytes]:
+    """Read the AGI environment block, up to and including the blank line"""
+    lines = []
+    while True:
+        line = await reader.readline()
+        lines.append(line)
+        if not line.strip():
+            # blank line signals end, EOF is handled by FastAGI
+            return lines
+
+
+class AsyncFastAGIStream:
+    """
+    Blocking file-like object wrapping an asyncio stream pair.
+
+    FastAGI and the registered handlers are synchronous and run in a worker
+    thread. Every read and write is delegated to the event loop so that the
+    socket itself is only ever touched by the loop.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        buffered_lines: list[bytes] | None = None,
+    ) -> None:
+        self._loop = loop
+        self._reader = reader
+        self._writer = writer
+        self._buffered_lines = list(buffered_lines or [])
+
+    def readline(self) -> bytes:
+        if self._buffered_lines:
+            return self._buffered_lines.pop(0)
+        future = asyncio.run_coroutine_threadsafe(self._reader.readline(), self._loop)
+        return future.result()
+
+    def write(self, data: bytes) -> int:
+        self._loop.call_soon_threadsafe(self._writer.write, data)
+        return len(data)
+
+    def flush(self) -> None:
+        future = asyncio.run_coroutine_threadsafe(self._writer.drain(), self._loop)
+        try:
+            future.result()
+        except ConnectionError as e:
+            # FastAGI detects hangups through EPIPE
+            raise BrokenPipeError(errno.EPIPE, str(e))
+
+
+class AsyncAGID(agid.BaseAGID):
+    """
+    FastAGI server running on an asyncio event loop.
+
+    Waiting for a connection, and for its AGI environment, costs a coroutine
+    instead of a thread. Once the environment is received, the request is
+    handled by the usual synchronous handlers in a bounded pool of threads.
+    When accept_queue_size requests are already waiting for a thread, new
+    calls are sent to agi_fail right away.
+    """
+
+    def __init__(
+        self,
+        config: dict[str, Any],
+        listen_socket: socket.socket | None = None,
+        worker_index: int = 0,
+    ) -> None:
+        super().__init__(config, listen_socket, worker_index)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix='agid-worker'
+        )
+        self._pending = 0
+        self._rejected = 0
+        self.initialized = True
+
+    def worker_stats(self) -> dict[str, int]:
+        return {
+            'max_workers': self.max_workers,
+            'busy': min(self._pending, self.max_workers),
+            'queued': max(self._pending - self.max_workers, 0),
+            'rejected': self._rejected,
+        }
+
+    def serve_forever(self) -> None:
+        asyncio.run(self._serve())
+
+    async def _serve(self) -> None:
+        loop = asyncio.get_running_loop()
+        # Reloading does blocking database work that must not stall the loop
+        loop.add_signal_handler(
+            signal.SIGHUP,
+            loop.run_in_executor,
+            self._executor,
+            agid.sighup_handle,
+            signal.SIGHUP,
+            None,
+        )
+        if self.listen_socket is not None:
+            # the socket is bound by the parent process in pre-fork mode
+            server = await asyncio.start_server(
+                self._handle_connection, sock=self.listen_socket
+            )
+        else:
+            server = await asyncio.start_server(
+                self._handle_connection,
+                self.listen_addr,
+                self.listen_port,
+                reuse_address=True,
+            )
+        async with server:
+            await server.serve_forever()
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            env_lines = await read_agi_env(reader)
+            if self._pending >= self.max_workers + self.accept_queue_size:
+                logger.warning(
+                    'all %d workers are busy, rejecting connection', self.max_workers
+                )
+                self._rejected += 1
+                writer.write(workers.REJECT_COMMANDS)
+                await writer.drain()
+                return
+
+            stream = AsyncFastAGIStream(loop, reader, writer, env_lines)
+            self._pending += 1
+            try:
+                await loop.run_in_executor(
+                    self._executor, agid.handle_request, stream, stream, self.config
+                )
+            finally:
+                self._pending -= 1
+        except Exception:
+            logger.exception("unexpected exception")
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
@@ -0,0 +1,189 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from multiprocessing.sharedctypes import Synchronized
+from typing import Callable, TypeVar, cast
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 60.0
+DEFAULT_MAX_ENTRIES = 1000
+
+T = TypeVar('T')
+
+_caches: dict[str, EntityCache] = {}
+_caches_lock = threading.Lock()
+# caches are disabled until configure() is called by the server
+_settings = {'ttl': 0.0, 'max_entries': DEFAULT_MAX_ENTRIES}
+
+
+class EntityCache:
+    """
+    Thread-safe read-through cache of the configuration of one kind of entity.
+
+    Entries expire `ttl` seconds after being loaded and the least recently
+    used entries are evicted when more than `max_entries` are stored. A `ttl`
+    of 0 disables the cache.
+
+    Cached values are shared between requests and must not be modified.
+
+    Once share() is called, clearing the cache also clears it in the
+    processes forked afterwards, through a generation counter in shared
+    memory that is checked by each get().
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (expiration time, value), the most recently used last
+        self._entries: OrderedDict[Hashable, tuple[float, object]] = OrderedDict()
+        self._generation: Synchronized[int] | None = None
+        self._seen_generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(
+        self,
+        key: Hashable,
+        load: Callable[[], T],
+        cache_none: bool = False,
+        ttl_for: Callable[[T], float] | None = None,
+    ) -> T:
+        """
+        Return the value cached for `key`, calling `load` to get it on a miss.
+
+        Exceptions raised by `load` are not cached. A None value is only cached
+        when `cache_none` is true, so that an entity created after a failed
+        lookup is found by the next one. `ttl_for` returns the time to live of
+        a loaded value when it is not the ttl of the cache.
+        """
+        now = self._clock()
+        with self._lock:
+            self._sync()
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]  # type: ignore[return-value]
+            self.misses += 1
+
+        value = load()
+        if self.ttl <= 0 or (value is None and not cache_none):
+            return value
+        ttl = self.ttl if ttl_for is None else ttl_for(value)
+        if ttl <= 0:
+            return value
+
+        with self._lock:
+            self._entries[key] = (now + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def share(self) -> None:
+        """Propagate clear() and invalidate() to the processes forked after this call"""
+        with self._lock:
+            if self._generation is None:
+                self._generation = cast(
+                    'Synchronized[int]', multiprocessing.Value('L', 0)
+                )
+                self._seen_generation = 0
+
+    def _sync(self) -> None:
+        # called with the lock held
+        if self._generation is None:
+            return
+        generation = self._generation.value
+        if generation != self._seen_generation:
+            self._entries.clear()
+            self._seen_generation = generation
+
+    def _bump(self) -> None:
+        # called with the lock held
+        if self._generation is None:
+            return
+        with self._generation.get_lock():
+            if self._generation.value != self._seen_generation:
+                self._entries.clear()
+            self._generation.value += 1
+            self._seen_generation = self._generation.value
+
+    def invalidate(self, key: Hashable) -> None:
+        """Forget `key`, the whole cache is cleared in the other processes"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._bump()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bump()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            'entries': entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+def get_cache(name: str) -> EntityCache:
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = EntityCache(name, **_settings)  # type: ignore[arg-type]
+        return _caches[name]
+
+
+def configure(ttl: float, max_entries: int) -> None:
+    with _caches_lock:
+        _settings.update(ttl=ttl, max_entries=max_entries)
+        for cache in _caches.values():
+            cache.ttl = ttl
+            cache.max_entries = max_entries
+            cache.clear()
+
+
+def share_all() -> None:
+    """Propagate the clears of the caches created so far to the forked processes"""
+    with _caches_lock:
+        caches = list(_caches.values())
+    for cache in caches:
+        cache.share()
+
+
+def clear_all() -> None:
+    logger.debug('clearing configuration caches')
+    with _caches_lock:
+        caches = list(_caches.values())
+    for cache in caches:
+        cache.clear()
+
+
+def stats() -> dict[str, dict[str, int]]:
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {cache.name: cache.stats() for cache in caches}
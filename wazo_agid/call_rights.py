@@ -1,9 +1,16 @@
-# Copyright 2006-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2006-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+from __future__ import annotations
+
 import logging
 import re
+from collections.abc import Iterable
+from functools import lru_cache
+
+from psycopg2.extras import DictCursor
 
+from wazo_agid import cache
 from wazo_agid import dialplan_variables as dv
 
 logger = logging.getLogger(__name__)
@@ -21,6 +28,12 @@ rep = (
     ('.', r'[0-9#\*]+'),
     ('!', r'[0-9#\*]*'),
 )
+# characters of a pattern that only match themselves
+LITERAL_CHARACTERS = frozenset('0123456789*#+')
+# regex operators that can make the characters before them optional
+PREFIX_BREAKING_CHARACTERS = frozenset('|?{')
+
+_matcher_cache = cache.get_cache('call_rights')
 
 
 class RuleAppliedException(Exception):
@@ -40,10 +53,92 @@ def deny(agi, password):
     raise RuleAppliedException()
 
 
-def extension_matches(number, pattern):
+@lru_cache(maxsize=4096)
+def compile_pattern(pattern: str) -> re.Pattern:
     for key, val in rep:
         pattern = pattern.replace(key, val)
-    return bool(re.match(rf"^{pattern}$", number))
+    return re.compile(rf"^{pattern}$")
+
+
+def extension_matches(number, pattern):
+    return bool(compile_pattern(pattern).match(number))
+
+
+class _TrieNode:
+    __slots__ = ('children', 'entries')
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        self.entries: list[tuple[int, re.Pattern]] = []
+
+
+class CallRightMatcher:
+    """
+    Find the call rights whose extension patterns match a number.
+
+    The patterns are compiled once and stored in a trie keyed on their
+    literal prefix, so only the patterns whose prefix is a prefix of the
+    number are evaluated.
+    """
+
+    def __init__(self, extens: Iterable[tuple[int, str]]) -> None:
+        self._root = _TrieNode()
+        self.size = 0
+        for rightcall_id, pattern in extens:
+            try:
+                compiled = compile_pattern(pattern)
+            except re.error:
+                logger.warning(
+                    'ignoring invalid call right pattern %r (call right %s)',
+                    pattern,
+                    rightcall_id,
+                )
+                continue
+
+            node = self._root
+            for char in self._literal_prefix(pattern):
+                node = node.children.setdefault(char, _TrieNode())
+            node.entries.append((rightcall_id, compiled))
+            self.size += 1
+
+    @staticmethod
+    def _literal_prefix(pattern: str) -> str:
+        pattern = pattern.replace('_', '')
+        if PREFIX_BREAKING_CHARACTERS.intersection(pattern):
+            return ''
+
+        for i, char in enumerate(pattern):
+            if char not in LITERAL_CHARACTERS:
+                return pattern[:i]
+        return pattern
+
+    def __bool__(self) -> bool:
+        return self.size > 0
+
+    def matching_ids(self, number: str) -> set[int]:
+        node = self._root
+        candidates = list(node.entries)
+        for char in number:
+            node = node.children.get(char)  # type: ignore[assignment]
+            if node is None:
+                break
+            candidates.extend(node.entries)
+
+        return {
+            rightcall_id
+            for rightcall_id, compiled in candidates
+            if compiled.match(number)
+        }
+
+
+def get_matcher(cursor: DictCursor) -> CallRightMatcher:
+    def load() -> CallRightMatcher:
+        cursor.execute("SELECT rightcallid, exten FROM rightcallexten")
+        return CallRightMatcher(
+            (row['rightcallid'], row['exten']) for row in cursor.fetchall()
+        )
+
+    return _matcher_cache.get('rightcallexten', load)
 
 
 def apply_rules(agi, rules):
@@ -0,0 +1,238 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Circuit breakers and deadlines of the HTTP requests to the Wazo services.
+
+The requests sent by the REST clients are matched with the services
+registered with register(), by host, port and prefix. Each request is sent in
+the thread of its caller, with its timeout capped to the deadline of the
+service. After failure_threshold consecutive failures, the circuit of the
+service opens: requests fail right away with CircuitOpen for reset_timeout
+seconds. Then one request is let through (half-open), its success closes the
+circuit and its failure opens it again.
+
+Only the requests themselves are guarded: building the objects of a client
+(e.g. relations) does not use a breaker, and the time a call waits for a
+thread of the parallel module is not counted against the service.
+
+CircuitOpen is a requests exception, so handlers fall back like they do when a
+service cannot be reached.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable, NamedTuple
+from urllib.parse import urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+_breakers: dict[str, CircuitBreaker] = {}
+_routes: list[Route] = []
+_settings = {
+    'failure_threshold': DEFAULT_FAILURE_THRESHOLD,
+    'reset_timeout': DEFAULT_RESET_TIMEOUT,
+}
+_instrumented = False
+
+
+class CircuitOpen(requests.ConnectionError):
+    pass
+
+
+def is_failure(exc: Exception) -> bool:
+    """Errors of the service itself, not of the request"""
+    if isinstance(exc, CircuitOpen):
+        return False
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout))
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._trial = False
+
+        self.failures = 0
+        self.rejected = 0
+        self.opened = 0
+
+    def check(self) -> None:
+        """Raise CircuitOpen if the request must not be sent"""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if (
+                self.state == OPEN
+                and self._clock() - self._opened_at >= self.reset_timeout
+            ):
+                logger.info('%s circuit is half-open', self.name)
+                self.state = HALF_OPEN
+                self._trial = False
+            if self.state == HALF_OPEN and not self._trial:
+                self._trial = True
+                return
+            self.rejected += 1
+        raise CircuitOpen(f'{self.name} circuit is open')
+
+    def release_trial(self) -> None:
+        """Let another request try the service, the trial did not reach it"""
+        with self._lock:
+            self._trial = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info('%s circuit is closed', self.name)
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (
+                self.state == CLOSED and self.failures >= self.failure_threshold
+            ):
+                logger.warning(
+                    '%s circuit is open after %d failures', self.name, self.failures
+                )
+                self.state = OPEN
+                self._opened_at = self._clock()
+                self.opened += 1
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                'open': int(self.state == OPEN),
+                'half_open': int(self.state == HALF_OPEN),
+                'failures': self.failures,
+                'rejected': self.rejected,
+                'opened': self.opened,
+            }
+
+
+class Route(NamedTuple):
+    host: str
+    port: int | None
+    prefix: str
+    breaker: CircuitBreaker
+    deadline: float
+
+
+def _cap_timeout(timeout: Any, deadline: float) -> Any:
+    if timeout is None:
+        return deadline
+    if isinstance(timeout, tuple):
+        return tuple(deadline if t is None else min(t, deadline) for t in timeout)
+    return min(timeout, deadline)
+
+
+def find_route(url: str) -> Route | None:
+    parts = urlsplit(url)
+    port = parts.port or DEFAULT_PORTS.get(parts.scheme)
+    matches = [
+        route
+        for route in _routes
+        if route.host == parts.hostname
+        and route.port in (None, port)
+        and parts.path.startswith(route.prefix)
+    ]
+    if not matches:
+        return None
+    return max(matches, key=lambda route: len(route.prefix))
+
+
+def guard_send(send: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap HTTPAdapter.send with the breaker and deadline of the service"""
+
+    def guarded_send(adapter, request, *args, **kwargs):
+        route = find_route(request.url)
+        if route is None:
+            return send(adapter, request, *args, **kwargs)
+
+        breaker = route.breaker
+        breaker.check()
+        kwargs['timeout'] = _cap_timeout(kwargs.get('timeout'), route.deadline)
+        try:
+            response = send(adapter, request, *args, **kwargs)
+        except Exception as e:
+            if is_failure(e):
+                breaker.record_failure()
+            else:
+                breaker.release_trial()
+            raise
+
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    return guarded_send
+
+
+def _instrument_requests() -> None:
+    # requests made by the wazo-*-client libraries
+    global _instrumented
+    if _instrumented:
+        return
+
+    from requests.adapters import HTTPAdapter
+
+    HTTPAdapter.send = guard_send(HTTPAdapter.send)  # type: ignore[method-assign]
+    _instrumented = True
+
+
+def configure(failure_threshold: int, reset_timeout: float) -> None:
+    _settings.update(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+    for breaker in _breakers.values():
+        breaker.failure_threshold = failure_threshold
+        breaker.reset_timeout = reset_timeout
+
+
+def get_breaker(service: str) -> CircuitBreaker:
+    if service not in _breakers:
+        _breakers[service] = CircuitBreaker(service, **_settings)  # type: ignore[arg-type]
+    return _breakers[service]
+
+
+def register(
+    service: str,
+    host: str,
+    port: int | None,
+    prefix: str | None,
+    deadline: float,
+) -> None:
+    """Guard the requests sent to `host`:`port` under `prefix` with the breaker of `service`"""
+    route = Route(host.lower(), port, prefix or '', get_breaker(service), deadline)
+    _routes.append(route)
+    _instrument_requests()
+
+
+def stats() -> dict[str, dict[str, int]]:
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
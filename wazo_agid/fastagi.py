@@ -1,4 +1,4 @@
-# Copyright 2004-2024 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2004-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 # Modifications by Proformatique from pyst-0.2:
@@ -15,15 +15,40 @@
 
 from __future__ import annotations
 
+import logging
 import pprint
 import re
-from typing import TYPE_CHECKING, Any, BinaryIO, NoReturn, Union
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, NoReturn, Protocol, Union
+
+from wazo_agid import metrics
 
 if TYPE_CHECKING:
     from typing import Literal
 
+logger = logging.getLogger(__name__)
 
 DigitList = Union[list[Union[str, int]], str]
+
+
+class AGIInput(Protocol):
+    """Stream the AGI environment and the command results are read from"""
+
+    def readline(self) -> bytes:
+        ...
+
+
+class AGIOutput(Protocol):
+    """Stream the AGI commands are written to"""
+
+    def write(self, data: bytes, /) -> int:
+        ...
+
+    def flush(self) -> None:
+        ...
+
+
 ResultDict = dict[str, tuple[str, str]]
 
 DEFAULT_TIMEOUT = 2000  # 2sec timeout used as default for functions that take timeouts
@@ -31,6 +56,17 @@ DEFAULT_RECORD = 20000  # 20sec record time
 
 re_code = re.compile(r'(^\d*)\s*(.*)')
 re_kv = re.compile(r'(?P<key>\w+)=(?P<value>[^\s]+)\s*(?:\((?P<data>.*)\))*')
+re_variable_name = re.compile(r'[A-Za-z0-9]\w*')
+
+# Most responses are a result, possibly followed by data in parentheses
+SIMPLE_RESULT_PREFIX = '200 result='
+
+# Variables whose value changes without the AGI setting them
+UNCACHED_VARIABLES = frozenset(['EPOCH', 'TIMESTAMP', 'DATETIME'])
+# Commands that do not change the value of channel variables
+VARIABLE_SAFE_COMMANDS = frozenset(
+    ['GET VARIABLE', 'GET FULL VARIABLE', 'SET VARIABLE', 'VERBOSE', 'NOOP']
+)
 
 __all__ = [
     'FastAGIException',
@@ -101,12 +137,17 @@ class FastAGI:
     Asterisk.
     """
 
-    def __init__(self, inf: BinaryIO, outf: BinaryIO, config: dict[str, Any]) -> None:
+    def __init__(self, inf: AGIInput, outf: AGIOutput, config: dict[str, Any]) -> None:
         self.inf = inf
         self.outf = outf
         self.config = config
 
         self._got_sighup = False
+        self._batch_depth = 0
+        self._pending_commands: list[str] = []
+        # index of the pending SET VARIABLE command of each plain variable
+        self._pending_variables: dict[str, int] = {}
+        self._variables: dict[str, str] = {}
         self.env: dict[str, str] = {}
         self._get_agi_env()
         self.args: list[str] = []
@@ -133,17 +174,23 @@ class FastAGI:
             i += 1
 
     @staticmethod
-    def _quote(string: str | int | bytes | None) -> str:
+    def _to_str(string: str | int | bytes | None) -> str:
         if string is None:
-            string = ''
-        elif isinstance(string, bytes):
-            string = string.decode('utf8')
-        elif not isinstance(string, str):
-            string = str(string)
-
-        return '"{}"'.format(
-            string.replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
-        )
+            return ''
+        if isinstance(string, bytes):
+            return string.decode('utf8')
+        if not isinstance(string, str):
+            return str(string)
+        return string
+
+    @classmethod
+    def _quote(cls, string: str | int | bytes | None) -> str:
+        if type(string) is not str:
+            string = cls._to_str(string)
+        # most values have nothing to escape
+        if '\\' in string or '"' in string or '\n' in string:
+            string = string.replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+        return f'"{string}"'
 
     @staticmethod
     def dp_break(message: str | Exception) -> NoReturn:
@@ -152,9 +199,13 @@ class FastAGI:
         )
 
     def execute(self, command: str, *args: str | int) -> ResultDict:
+        if command not in VARIABLE_SAFE_COMMANDS:
+            self._variables.clear()
+        self.flush()
         try:
-            self.send_command(command, *args)
-            return self.get_result()
+            with metrics.timed('agi', command):
+                self.send_command(command, *args)
+                return self.get_result()
         except OSError as e:
             if e.errno == 32:
                 # Broken Pipe * let us go
@@ -162,12 +213,86 @@ class FastAGI:
             else:
                 raise
 
+    @staticmethod
+    def _format_command(command: str, *args: str | int) -> str:
+        return ' '.join([command.strip()] + list(map(str, args))).strip() + "\n"
+
     def send_command(self, command: str, *args: str | int) -> None:
         """Send a command to Asterisk"""
-        command = ' '.join([command.strip()] + list(map(str, args))).strip() + "\n"
-        self.outf.write(command.encode('utf8'))
+        self.flush()
+        self.outf.write(self._format_command(command, *args).encode('utf8'))
         self.outf.flush()
 
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """
+        Pipeline the SET VARIABLE commands issued inside the block.
+
+        The queued commands are written to Asterisk at once when the block
+        exits, or before any other command is sent, and their results are
+        then read in order. Blocks can be nested, the commands are sent when
+        the outermost block exits.
+
+        A variable set more than once in the block is only sent with its last
+        value, unless a function was written in between. When the block exits
+        with an exception, the commands are still sent but their errors are
+        only logged, so that the exception of the block is the one raised.
+        """
+        self._batch_depth += 1
+        try:
+            yield
+        except BaseException:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception('failed to send the batched commands')
+            raise
+        self._batch_depth -= 1
+        if not self._batch_depth:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Send the commands queued by batch() and read their results.
+
+        All the results are read to keep the connection in sync, the first
+        error encountered is raised afterwards.
+        """
+        if not self._pending_commands:
+            return
+
+        commands, self._pending_commands = self._pending_commands, []
+        self._pending_variables.clear()
+        for result in self._pipeline(commands):
+            if isinstance(result, FastAGIException):
+                # the cached values of the failed commands cannot be trusted
+                self._variables.clear()
+                raise result
+
+    def _pipeline(self, commands: list[str]) -> list[ResultDict | FastAGIException]:
+        """
+        Write the commands at once and read their results in order.
+
+        Errors are returned in place of the result of the failing command.
+        """
+        results: list[ResultDict | FastAGIException] = []
+        try:
+            with metrics.timed('agi', 'pipeline'):
+                self.outf.write(''.join(commands).encode('utf8'))
+                self.outf.flush()
+                for _ in commands:
+                    try:
+                        results.append(self.get_result())
+                    except FastAGIException as e:
+                        results.append(e)
+        except OSError as e:
+            if e.errno == 32:
+                raise FastAGISIGPIPEHangup("Received SIGPIPE")
+            raise
+        return results
+
     def fail(self) -> None:
         """Force Asterisk to change the result state of the AGI to
         AGI_RESULT_FAILURE so that it will abort the AGI.
@@ -182,10 +307,44 @@ class FastAGI:
 
     def get_result(self) -> ResultDict:
         """Read the result of a command from Asterisk"""
+        line = self.inf.readline().strip().decode('utf8')
+        if line.startswith(SIMPLE_RESULT_PREFIX):
+            result = self._parse_simple_result(line[len(SIMPLE_RESULT_PREFIX) :])
+            if result is not None:
+                return result
+        return self._parse_result(line)
+
+    @staticmethod
+    def _parse_simple_result(response: str) -> ResultDict | None:
+        """
+        Parse the `X` or `X (data)` following `200 result=` without regex.
+
+        Returns None for the other forms, which are left to _parse_result.
+        """
+        if not response or response[0].isspace():
+            return None
+
+        parts = response.split(None, 1)
+        value = parts[0]
+        if len(parts) == 1:
+            data = ''
+        else:
+            tail = parts[1]
+            if tail[0] != '(' or tail[-1] != ')':
+                return None
+            data = tail[1:-1]
+
+        # If user hangs up... we get 'hangup' in the data
+        if data == 'hangup':
+            raise FastAGIResultHangup("User hungup during execution")
+        if value == '-1':
+            raise FastAGIAppError("Error executing application, or hangup")
+        return {'result': (value, data)}
+
+    def _parse_result(self, line: str) -> ResultDict:
         code = 0
         response = ''
         result = {'result': ('', '')}
-        line = self.inf.readline().strip().decode('utf8')
         m = re_code.search(line)
         if m:
             code = int(m.group(1))
@@ -561,22 +720,86 @@ class FastAGI:
 
         return int(result['result'][0])
 
+    @staticmethod
+    def _is_cacheable(name: str) -> bool:
+        return bool(re_variable_name.fullmatch(name)) and name not in UNCACHED_VARIABLES
+
     def set_variable(self, name: str, value: str | int) -> None:
         """Set a channel variable."""
-        self.execute('SET VARIABLE', self._quote(name), self._quote(value))
+        cache_name = name.lstrip('_')
+        cacheable = self._is_cacheable(cache_name)
+        if cacheable:
+            self._variables[cache_name] = self._to_str(value).replace('\n', ' ')
+        else:
+            # writing to a function may change any variable
+            self._variables.clear()
+
+        if not self._batch_depth:
+            self.execute('SET VARIABLE', self._quote(name), self._quote(value))
+            return
+
+        command = self._format_command(
+            'SET VARIABLE', self._quote(name), self._quote(value)
+        )
+        if not cacheable:
+            # keep the order of the writes around a function
+            self._pending_variables.clear()
+            self._pending_commands.append(command)
+        elif cache_name in self._pending_variables:
+            self._pending_commands[self._pending_variables[cache_name]] = command
+        else:
+            self._pending_variables[cache_name] = len(self._pending_commands)
+            self._pending_commands.append(command)
 
     def get_variable(self, name: str) -> str:
         """Get a channel variable.
 
         This function returns the value of the indicated channel variable.  If
         the variable is not set, an empty string is returned.
+
+        Values of plain variables are cached for the rest of the request, until
+        a command that could change them is sent.
         """
+        if name in self._variables:
+            return self._variables[name]
+
         try:
             result = self.execute('GET VARIABLE', self._quote(name))
         except FastAGIResultHangup:
-            result = {'result': ('1', 'hangup')}
-
-        return result['result'][1]
+            return 'hangup'
+
+        value = result['result'][1]
+        if self._is_cacheable(name):
+            self._variables[name] = value
+        return value
+
+    def get_variables(self, names: Iterable[str]) -> list[str]:
+        """Get many channel variables in a single exchange with Asterisk.
+
+        The GET VARIABLE commands of the variables that are not cached are
+        written at once and their results are read in order. The values are
+        returned in the order of the names.
+        """
+        names = list(names)
+        missing = [name for name in dict.fromkeys(names) if name not in self._variables]
+        if not missing:
+            return [self._variables[name] for name in names]
+
+        self.flush()
+        commands = [
+            self._format_command('GET VARIABLE', self._quote(name)) for name in missing
+        ]
+        values = dict(self._variables)
+        for name, result in zip(missing, self._pipeline(commands)):
+            if isinstance(result, FastAGIResultHangup):
+                values[name] = 'hangup'
+            elif isinstance(result, FastAGIException):
+                raise result
+            else:
+                values[name] = result['result'][1]
+                if self._is_cacheable(name):
+                    self._variables[name] = values[name]
+        return [values[name] for name in names]
 
     def get_full_variable(self, name: str, channel: str | None = None):
         """Get a channel variable.
@@ -1,4 +1,4 @@
-# Copyright 2006-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2006-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from __future__ import annotations
@@ -180,14 +180,26 @@ class OutgoingFeatures(Handler):
         self._agi.set_variable(dv.HANGUP_RING_TIME, hangupringtime)
 
     def _extract_dialplan_variables(self) -> None:
-        self.userid = self._agi.get_variable(dv.USERID)
-        self.useruuid = self._agi.get_variable(dv.USERUUID)
-        self.dialpattern_id = self._agi.get_variable(dv.DESTINATION_ID)
-        self.dstnum = self._agi.get_variable(dv.DESTINATION_NUMBER)
-        self.srcnum = self._agi.get_variable(dv.SOURCE_NUMBER)
+        (
+            self.userid,
+            self.useruuid,
+            self.dialpattern_id,
+            self.dstnum,
+            self.srcnum,
+            self._context,
+            self._tenant_uuid,
+        ) = self._agi.get_variables(
+            [
+                dv.USERID,
+                dv.USERUUID,
+                dv.DESTINATION_ID,
+                dv.DESTINATION_NUMBER,
+                dv.SOURCE_NUMBER,
+                dv.BASE_CONTEXT,
+                dv.TENANT_UUID,
+            ]
+        )
         self.orig_dstnum = self.dstnum
-        self._context = self._agi.get_variable(dv.BASE_CONTEXT)
-        self._tenant_uuid = self._agi.get_variable(dv.TENANT_UUID)
 
     def execute(self) -> None:
         self._extract_dialplan_variables()
@@ -1,4 +1,4 @@
-# Copyright 2013-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2013-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import unittest
@@ -151,6 +151,9 @@ class BaseOutgoingFeaturesTestCase(unittest.TestCase):
         self._channel_variables: defaultdict[str, Any] = defaultdict(str)
         self._agi = Mock(config=config, env=agi_environment)
         self._agi.get_variable.side_effect = self._channel_variables.get
+        self._agi.get_variables.side_effect = lambda names: [
+            self._channel_variables.get(name) for name in names
+        ]
         self._cursor = Mock()
         self._args = Mock()
         self.outgoing_features = OutgoingFeatures(self._agi, self._cursor, self._args)
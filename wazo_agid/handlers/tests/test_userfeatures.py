@@ -1,8 +1,8 @@
-# Copyright 2013-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2013-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import unittest
-from unittest.mock import Mock, call, patch, sentinel
+from unittest.mock import MagicMock, Mock, call, patch, sentinel
 
 from hamcrest import assert_that, contains_exactly, equal_to
 from requests.exceptions import HTTPError
@@ -30,7 +30,7 @@ class _BaseTestCase(unittest.TestCase):
             },
             'confd': {'client': self._confd_mock},
         }
-        self._agi = Mock(config=config)
+        self._agi = MagicMock(config=config)
         self._cursor = Mock(cast=lambda x, y: '')
         self._args = Mock()
 
@@ -61,6 +61,9 @@ class TestUserFeatures(_BaseTestCase):
         }
 
         self._agi.get_variable = lambda name: self._variables.get(name, '')
+        self._agi.get_variables = lambda names: [
+            self._variables.get(name, '') for name in names
+        ]
 
     def test_userfeatures(self):
         userfeatures = UserFeatures(self._agi, self._cursor, self._args)
@@ -296,6 +299,7 @@ class TestUserFeatures(_BaseTestCase):
         userfeatures._dstnum = '42'
 
         userfeatures._set_redirecting_info()
+        userfeatures._set_redirecting_extern_info()
 
         assert_that(
             self._agi.set_variable.call_args_list,
@@ -317,6 +321,7 @@ class TestUserFeatures(_BaseTestCase):
         userfeatures._dstnum = '42'
 
         userfeatures._set_redirecting_info()
+        userfeatures._set_redirecting_extern_info()
 
         assert_that(
             self._agi.set_variable.call_args_list,
@@ -337,6 +342,7 @@ class TestUserFeatures(_BaseTestCase):
         userfeatures._dstnum = '42'
 
         userfeatures._set_redirecting_info()
+        userfeatures._set_redirecting_extern_info()
 
         assert_that(
             self._agi.set_variable.call_args_list,
@@ -358,6 +364,7 @@ class TestUserFeatures(_BaseTestCase):
         self._set_confd_mock_outgoing_callerids_side_effect(HTTPError(404))
 
         userfeatures._set_redirecting_info()
+        userfeatures._set_redirecting_extern_info()
 
         assert_that(
             self._agi.set_variable.call_args_list,
@@ -390,6 +397,7 @@ class TestUserFeatures(_BaseTestCase):
         )
 
         userfeatures._set_redirecting_info()
+        userfeatures._set_redirecting_extern_info()
 
         assert_that(
             self._agi.set_variable.call_args_list,
@@ -422,6 +430,7 @@ class TestUserFeatures(_BaseTestCase):
         )
 
         userfeatures._set_redirecting_info()
+        userfeatures._set_redirecting_extern_info()
 
         assert_that(
             self._agi.set_variable.call_args_list,
@@ -1,9 +1,10 @@
-# Copyright 2012-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2012-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from __future__ import annotations
 
 import logging
+from functools import partial
 from typing import TYPE_CHECKING
 
 from requests import RequestException
@@ -14,7 +15,7 @@ from xivo_dao.resources.line_extension import dao as line_extension_dao
 from xivo_dao.resources.user_line import dao as user_line_dao
 
 from wazo_agid import dialplan_variables as dv
-from wazo_agid import objects
+from wazo_agid import objects, outgoing_callerids, parallel
 from wazo_agid.handlers.handler import Handler
 from wazo_agid.helpers import build_sip_interface
 from wazo_agid.objects import CallerID, DialAction
@@ -45,36 +46,39 @@ class UserFeatures(Handler):
         self._user: objects.User = None  # type: ignore[assignment]
         self._moh_uuid: str | None = None
         self._moh: objects.MOH | None = None
+        self._outgoing_callerids: parallel.Outcome | None = None
 
         self.lines: list[LineFeatures] = []
         self.main_line: LineFeatures | None = None
         self.main_extension: Extension = None  # type: ignore[assignment]
 
     def execute(self) -> None:
-        self._set_members()
-        self._set_interfaces()
-        self._find_moh()
-
-        filtered = self._call_filtering()
-        if filtered:
-            return
-
-        self._set_options()
-        self._set_callee_simultcalls()
-        self._set_ringseconds()
-        self._set_enablednd()
-        self._set_mailbox()
-        self._set_call_forwards()
-        self._set_dial_action_congestion()
-        self._set_dial_action_chanunavail()
-        self._set_music_on_hold()
-        self._set_call_record_enabled()
-        self._set_call_record_side()
-        self._set_preprocess_subroutine()
-        self._set_mobile_number()
-        self._set_vmbox_lang()
-        self._set_video_enabled()
-        self._set_path(UserFeatures.PATH_TYPE, self._user.id)
+        with self._agi.batch():
+            self._set_members()
+            self._set_interfaces()
+            self._find_moh()
+
+            filtered = self._call_filtering()
+            self._set_redirecting_extern_info()
+            if filtered:
+                return
+
+            self._set_options()
+            self._set_callee_simultcalls()
+            self._set_ringseconds()
+            self._set_enablednd()
+            self._set_mailbox()
+            self._set_call_forwards()
+            self._set_dial_action_congestion()
+            self._set_dial_action_chanunavail()
+            self._set_music_on_hold()
+            self._set_call_record_enabled()
+            self._set_call_record_side()
+            self._set_preprocess_subroutine()
+            self._set_mobile_number()
+            self._set_vmbox_lang()
+            self._set_video_enabled()
+            self._set_path(UserFeatures.PATH_TYPE, self._user.id)
 
     def _find_moh(self) -> None:
         if self._moh_uuid:
@@ -85,16 +89,27 @@ class UserFeatures(Handler):
                 self._agi.verbose(msg)
 
     def _set_members(self) -> None:
-        self._userid = self._agi.get_variable(dv.USERID)
-        self._dstid = self._agi.get_variable(dv.DESTINATION_ID)
-        self._destination_extension_id = self._agi.get_variable(
-            dv.DESTINATION_EXTENSION_ID
+        (
+            self._userid,
+            self._dstid,
+            self._destination_extension_id,
+            self._zone,
+            self._srcnum,
+            self._dstnum,
+            self._context,
+            self._moh_uuid,
+        ) = self._agi.get_variables(
+            [
+                dv.USERID,
+                dv.DESTINATION_ID,
+                dv.DESTINATION_EXTENSION_ID,
+                dv.CALL_ORIGIN,
+                dv.SOURCE_NUMBER,
+                dv.DESTINATION_NUMBER,
+                dv.BASE_CONTEXT,
+                dv.USER_MOH,
+            ]
         )
-        self._zone = self._agi.get_variable(dv.CALL_ORIGIN)
-        self._srcnum = self._agi.get_variable(dv.SOURCE_NUMBER)
-        self._dstnum = self._agi.get_variable(dv.DESTINATION_NUMBER)
-        self._context = self._agi.get_variable(dv.BASE_CONTEXT)
-        self._moh_uuid = self._agi.get_variable(dv.USER_MOH)
         self._set_caller()
         self._set_line()
         self._set_user()
@@ -212,11 +227,18 @@ class UserFeatures(Handler):
                 callerid_num = self._dstnum
         self._agi.set_variable(dv.DST_REDIRECTING_NUM, callerid_num)
 
+        # collected by _set_redirecting_extern_info, after the other requests
         confd_client = self._agi.config['confd']['client']
+        self._outgoing_callerids = parallel.start(
+            partial(outgoing_callerids.get, confd_client, self._user.uuid)
+        )
+
+    def _set_redirecting_extern_info(self) -> None:
+        if self._outgoing_callerids is None:
+            return
+
         try:
-            outgoing_callerids = confd_client.users.relations(
-                self._user.uuid
-            ).list_outgoing_callerids()['items']
+            callerids = self._outgoing_callerids.result()
         except (RequestException, KeyError) as e:
             logger.error(
                 'Error while getting user outgoing callerids for user %s in tenant %s: %s',
@@ -230,17 +252,13 @@ class UserFeatures(Handler):
 
         try:
             associated_callerid = [
-                callerid
-                for callerid in outgoing_callerids
-                if callerid['type'] == 'associated'
+                callerid for callerid in callerids if callerid['type'] == 'associated'
             ][0]
         except IndexError:
             associated_callerid = None
         try:
             main_callerid = [
-                callerid
-                for callerid in outgoing_callerids
-                if callerid['type'] == 'main'
+                callerid for callerid in callerids if callerid['type'] == 'main'
             ][0]
         except IndexError:
             main_callerid = None
@@ -1,7 +1,7 @@
-# Copyright 2017-2022 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2017-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-import requests
+from wazo_agid import mobile_connections
 
 
 def build_sip_interface(agi, user_uuid, aor_name):
@@ -18,28 +18,8 @@ def build_sip_interface(agi, user_uuid, aor_name):
 
 
 def _has_mobile_connection(agi, user_uuid):
-    mobile = False
     auth_client = agi.config['auth']['client']
-
-    try:
-        response = auth_client.token.list(user_uuid, mobile=True)
-    except requests.HTTPError as e:
-        agi.verbose(f'failed to fetch user refresh tokens {e}')
-    else:
-        mobile = response['filtered'] > 0
-
-    if not mobile:
-        try:
-            response = auth_client.users.get_sessions(user_uuid)
-        except requests.HTTPError as e:
-            agi.verbose(f'failed to fetch user sessions {e}')
-        else:
-            for session in response['items']:
-                if session['mobile']:
-                    mobile = True
-                    break
-
-    if mobile:
+    if mobile_connections.has_mobile_connection(auth_client, user_uuid, agi.verbose):
         agi.set_variable('WAZO_MOBILE_CONNECTION', True)
         return True
 
@@ -51,12 +31,16 @@ def _is_mobile_reachable(agi, aor_name):
     if not raw_contacts:
         return False
 
-    for contact in raw_contacts.split(','):
-        mobility = agi.get_variable(f'PJSIP_CONTACT({contact},mobility)')
-        if mobility != 'mobile':
-            continue
-        status = agi.get_variable(f'PJSIP_CONTACT({contact},status)')
-        if status == 'Reachable':
+    # the status of all the contacts is read in a single exchange with Asterisk
+    contacts = raw_contacts.split(',')
+    names = []
+    for contact in contacts:
+        names.append(f'PJSIP_CONTACT({contact},mobility)')
+        names.append(f'PJSIP_CONTACT({contact},status)')
+    values = agi.get_variables(names)
+
+    for mobility, status in zip(values[::2], values[1::2]):
+        if mobility == 'mobile' and status == 'Reachable':
             return True
 
     return False
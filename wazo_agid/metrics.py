@@ -0,0 +1,436 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Per-handler request metrics, exposed in the Prometheus text format.
+
+Each AGI request is tracked by a RequestTimer stored in a context variable.
+The time spent waiting for Asterisk, for the database and for the REST
+clients is added to the timer of the current request, and recorded in the
+histograms of its handler when the request ends. When tracing is enabled, the
+same measures are recorded as the spans of the trace of the request.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Union
+
+from psycopg2.extras import DictCursor
+from psycopg2.sql import Composable
+
+from wazo_agid import tracing
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LISTEN_ADDRESS = '127.0.0.1'
+DEFAULT_LISTEN_PORT = 9592
+UNKNOWN_HANDLER = 'unknown'
+
+# Upper bounds of the latency histograms, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Kinds of waiting time measured inside a request
+IO_KINDS = ('agi', 'db', 'http')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+StatsFunction = Callable[[], dict[str, Any]]
+SpanName = Union[str, Callable[[], str]]
+
+_current_request: ContextVar[RequestTimer | None] = ContextVar(
+    'current_request', default=None
+)
+
+
+class Histogram:
+    __slots__ = ('counts', 'count', 'sum')
+
+    def __init__(self) -> None:
+        # the last count is for the values above the last bucket
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def samples(self, name: str, labels: str) -> Iterator[str]:
+        separator = ',' if labels else ''
+        cumulative = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels}{separator}le="+Inf"}} {self.count}'
+        yield f'{name}_sum{{{labels}}} {self.sum}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+
+class HandlerMetrics:
+    __slots__ = ('requests', 'errors', 'duration', 'io')
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors: dict[str, int] = defaultdict(int)
+        self.duration = Histogram()
+        self.io = {kind: Histogram() for kind in IO_KINDS}
+
+
+class RequestTimer:
+    """Time spent by one request, by kind of waiting"""
+
+    __slots__ = ('handler', 'error', 'start', 'io', 'trace')
+
+    def __init__(self) -> None:
+        self.handler = UNKNOWN_HANDLER
+        self.error: str | None = None
+        self.start = time.perf_counter()
+        self.io = dict.fromkeys(IO_KINDS, 0.0)
+        self.trace = tracing.new_trace()
+
+    def fail(self, exception: BaseException) -> None:
+        self.error = type(exception).__name__
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._handlers: dict[str, HandlerMetrics] = {}
+        self._gauges: list[tuple[str, str, StatsFunction]] = []
+        # thread id -> request being handled by that thread
+        self._active: dict[int, RequestTimer] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._active)
+
+    def active_handlers(self) -> dict[int, str]:
+        """Return the name of the handler run by each thread handling a request"""
+        with self._lock:
+            return {ident: timer.handler for ident, timer in self._active.items()}
+
+    def begin(self, timer: RequestTimer) -> None:
+        with self._lock:
+            self._active[threading.get_ident()] = timer
+
+    def record(self, timer: RequestTimer, duration: float) -> None:
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+            metrics = self._handlers.get(timer.handler)
+            if metrics is None:
+                metrics = self._handlers[timer.handler] = HandlerMetrics()
+            metrics.requests += 1
+            if timer.error:
+                metrics.errors[timer.error] += 1
+            metrics.duration.observe(duration)
+            for kind, value in timer.io.items():
+                metrics.io[kind].observe(value)
+
+    def register_stats(
+        self, prefix: str, stats: StatsFunction, label: str = ''
+    ) -> None:
+        """
+        Export the values returned by `stats` as gauges named after `prefix`.
+
+        When `label` is given, `stats` returns a dictionary of statistics for
+        each value of that label.
+        """
+        self._gauges.append((prefix, label, stats))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._handlers.clear()
+            self._gauges.clear()
+            self._active.clear()
+
+    def render(self) -> str:
+        with self._lock:
+            handlers = sorted(self._handlers.items())
+            in_flight = self.in_flight
+            lines = list(self._render_handlers(handlers))
+
+        lines.extend(
+            [
+                '# TYPE wazo_agid_requests_in_flight gauge',
+                f'wazo_agid_requests_in_flight {in_flight}',
+                '# TYPE wazo_agid_threads_active gauge',
+                f'wazo_agid_threads_active {threading.active_count()}',
+            ]
+        )
+        for prefix, label, stats in self._gauges:
+            try:
+                lines.extend(_render_stats(prefix, label, stats()))
+            except Exception:
+                logger.exception('could not collect the %s metrics', prefix)
+        lines.append('')
+        return '\n'.join(lines)
+
+    @staticmethod
+    def _render_handlers(handlers: list[tuple[str, HandlerMetrics]]) -> Iterator[str]:
+        yield '# HELP wazo_agid_requests_total AGI requests handled'
+        yield '# TYPE wazo_agid_requests_total counter'
+        for name, metrics in handlers:
+            yield f'wazo_agid_requests_total{{handler="{name}"}} {metrics.requests}'
+
+        yield '# HELP wazo_agid_request_errors_total AGI requests that failed'
+        yield '# TYPE wazo_agid_request_errors_total counter'
+        for name, metrics in handlers:
+            for error, count in sorted(metrics.errors.items()):
+                yield (
+                    f'wazo_agid_request_errors_total'
+                    f'{{handler="{name}",error="{error}"}} {count}'
+                )
+
+        yield '# HELP wazo_agid_request_duration_seconds AGI request duration'
+        yield '# TYPE wazo_agid_request_duration_seconds histogram'
+        for name, metrics in handlers:
+            yield from metrics.duration.samples(
+                'wazo_agid_request_duration_seconds', f'handler="{name}"'
+            )
+
+        yield (
+            '# HELP wazo_agid_request_io_seconds Time spent by AGI requests '
+            'waiting for Asterisk, the database and HTTP services'
+        )
+        yield '# TYPE wazo_agid_request_io_seconds histogram'
+        for name, metrics in handlers:
+            for kind, histogram in metrics.io.items():
+                yield from histogram.samples(
+                    'wazo_agid_request_io_seconds', f'handler="{name}",kind="{kind}"'
+                )
+
+
+def _render_stats(prefix: str, label: str, stats: dict[str, Any]) -> Iterator[str]:
+    if not label:
+        for name, value in stats.items():
+            yield f'# TYPE {prefix}_{name} gauge'
+            yield f'{prefix}_{name} {value}'
+        return
+
+    by_name: dict[str, list[str]] = defaultdict(list)
+    for label_value, values in sorted(stats.items()):
+        for name, value in values.items():
+            by_name[name].append(f'{prefix}_{name}{{{label}="{label_value}"}} {value}')
+    for name, samples in by_name.items():
+        yield f'# TYPE {prefix}_{name} gauge'
+        yield from samples
+
+
+registry = Registry()
+
+
+@contextmanager
+def track_request() -> Iterator[RequestTimer]:
+    """Record the duration and the outcome of the request handled in the block"""
+    timer = RequestTimer()
+    token = _current_request.set(timer)
+    registry.begin(timer)
+    try:
+        yield timer
+    except BaseException as e:
+        timer.fail(e)
+        raise
+    finally:
+        _current_request.reset(token)
+        duration = time.perf_counter() - timer.start
+        registry.record(timer, duration)
+        if timer.trace is not None:
+            tracing.finish(timer.trace, timer.handler, timer.error, duration)
+
+
+@contextmanager
+def timed(kind: str, name: SpanName = '') -> Iterator[None]:
+    """
+    Add the time spent in the block to the `kind` time of the current request.
+
+    `name` identifies the block in the trace of the request. It can be given
+    as a function, only called when the request is traced.
+    """
+    timer = _current_request.get()
+    if timer is None:
+        yield
+        return
+
+    trace = timer.trace
+    if trace is not None:
+        trace.begin(kind, name() if callable(name) else name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        if kind in timer.io:
+            timer.io[kind] += duration
+        if trace is not None:
+            trace.end(duration)
+
+
+def _begin(kind: str, name: SpanName) -> float | None:
+    timer = _current_request.get()
+    if timer is None:
+        return None
+    if timer.trace is not None:
+        timer.trace.begin(kind, name() if callable(name) else name)
+    return time.perf_counter()
+
+
+def _end(kind: str, start: float | None) -> None:
+    timer = _current_request.get()
+    if timer is None or start is None:
+        return
+    duration = time.perf_counter() - start
+    timer.io[kind] += duration
+    if timer.trace is not None:
+        timer.trace.end(duration)
+
+
+class TimedCursor(DictCursor):
+    """DictCursor measuring the time spent executing queries"""
+
+    def _fingerprint(self, query: str | bytes | Composable) -> str:
+        if isinstance(query, Composable):
+            query = query.as_string(self)
+        elif isinstance(query, bytes):
+            query = query.decode('utf8', 'replace')
+        return tracing.query_fingerprint(query)
+
+    def execute(self, query, vars=None):
+        with timed('db', lambda: self._fingerprint(query)):
+            return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        with timed('db', lambda: self._fingerprint(query)):
+            return super().executemany(query, vars_list)
+
+
+QUERY_START_KEY = 'wazo_agid_query_start'
+_sqlalchemy_instrumented = False
+
+
+def _instrument_sqlalchemy() -> None:
+    # queries made through xivo_dao
+    global _sqlalchemy_instrumented
+    if _sqlalchemy_instrumented:
+        return
+
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        start = _begin('db', lambda: tracing.query_fingerprint(statement))
+        conn.info.setdefault(QUERY_START_KEY, []).append((context, start))
+
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        _, start = conn.info[QUERY_START_KEY].pop()
+        _end('db', start)
+
+    def handle_error(exception_context):
+        # after_cursor_execute is not called for the queries that fail
+        conn = exception_context.connection
+        if conn is None:
+            return
+        starts = conn.info.get(QUERY_START_KEY)
+        if starts and starts[-1][0] is exception_context.execution_context:
+            _, start = starts.pop()
+            _end('db', start)
+
+    event.listen(Engine, 'before_cursor_execute', before_execute)
+    event.listen(Engine, 'after_cursor_execute', after_execute)
+    event.listen(Engine, 'handle_error', handle_error)
+    _sqlalchemy_instrumented = True
+
+
+_http_instrumented = False
+
+
+def _instrument_requests() -> None:
+    # calls made by the wazo-*-client libraries
+    global _http_instrumented
+    if _http_instrumented:
+        return
+
+    from requests.adapters import HTTPAdapter
+
+    send = HTTPAdapter.send
+
+    def timed_send(self, request, *args, **kwargs):
+        def name() -> str:
+            return tracing.url_fingerprint(request.method, request.url)
+
+        with timed('http', name):
+            return send(self, request, *args, **kwargs)
+
+    HTTPAdapter.send = timed_send  # type: ignore[method-assign]
+    _http_instrumented = True
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        path = self.path.split('?', 1)[0]
+        if path == '/metrics':
+            body = registry.render().encode('utf8')
+            content_type = CONTENT_TYPE
+        elif path == '/traces':
+            body = json.dumps(tracing.recent_traces()).encode('utf8')
+            content_type = 'application/json'
+        else:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug('metrics: ' + format, *args)
+
+
+def instrument() -> None:
+    """Measure the queries made through xivo_dao and the HTTP calls"""
+    _instrument_sqlalchemy()
+    _instrument_requests()
+
+
+def serve(listen_address: str, listen_port: int) -> ThreadingHTTPServer:
+    """
+    Serve the metrics on http://<listen_address>:<listen_port>/metrics and
+    the recent traces on /traces
+    """
+    server = ThreadingHTTPServer((listen_address, listen_port), MetricsRequestHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(
+        target=server.serve_forever, name='agid-metrics', daemon=True
+    )
+    thread.start()
+    logger.info('serving metrics on %s:%d', listen_address, listen_port)
+    return server
+
+
+def setup(config: dict[str, Any], port_offset: int = 0) -> None:
+    """
+    Serve the metrics as configured. In pre-fork mode, each worker serves its
+    own metrics on listen_port + its index, given by `port_offset`.
+    """
+    if config.get('enabled') or tracing.is_enabled():
+        instrument()
+
+    if not config.get('enabled'):
+        logger.debug('metrics are disabled')
+        return
+
+    serve(
+        config.get('listen_address', DEFAULT_LISTEN_ADDRESS),
+        int(config.get('listen_port', DEFAULT_LISTEN_PORT)) + port_offset,
+    )
@@ -0,0 +1,89 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Cache of the users having a mobile connection in wazo-auth.
+
+Calling a WebRTC user without a reachable mobile contact checks if the user has
+a mobile refresh token or session. The answer is cached for ttl seconds when
+the user has one and for negative_ttl seconds otherwise, so that a user logging
+in on a mobile is found quickly. Answers are not cached when wazo-auth fails.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable
+
+import requests
+
+from wazo_agid.cache import EntityCache
+
+DEFAULT_TTL = 30.0
+DEFAULT_NEGATIVE_TTL = 5.0
+DEFAULT_MAX_ENTRIES = 10000
+
+# disabled until configure() is called by the server
+_cache = EntityCache('mobile_connections', ttl=0)
+_negative_ttl = DEFAULT_NEGATIVE_TTL
+
+
+def configure(
+    ttl: float = DEFAULT_TTL,
+    negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+    max_entries: int = DEFAULT_MAX_ENTRIES,
+) -> None:
+    global _negative_ttl
+    _cache.ttl = ttl
+    _cache.max_entries = max_entries
+    _negative_ttl = negative_ttl
+    _cache.clear()
+
+
+def stats() -> dict[str, int]:
+    return _cache.stats()
+
+
+def clear() -> None:
+    _cache.clear()
+
+
+def _ttl_for(mobile: bool | None) -> float:
+    return _cache.ttl if mobile else _negative_ttl
+
+
+def _fetch(auth_client: Any, user_uuid: str, log: Callable[[str], None]) -> bool | None:
+    failed = False
+
+    try:
+        response = auth_client.token.list(user_uuid, mobile=True)
+    except requests.RequestException as e:
+        log(f'failed to fetch user refresh tokens {e}')
+        failed = True
+    else:
+        if response['filtered'] > 0:
+            # the sessions are only requested when needed
+            return True
+
+    try:
+        response = auth_client.users.get_sessions(user_uuid)
+    except requests.RequestException as e:
+        log(f'failed to fetch user sessions {e}')
+        failed = True
+    else:
+        if any(session['mobile'] for session in response['items']):
+            return True
+
+    # unknown, not cached
+    return None if failed else False
+
+
+def has_mobile_connection(
+    auth_client: Any, user_uuid: str, log: Callable[[str], None]
+) -> bool:
+    """True if the user has a mobile refresh token or session, through the cache"""
+
+    def load() -> bool | None:
+        return _fetch(auth_client, user_uuid, log)
+
+    mobile = _cache.get(user_uuid, load, ttl_for=_ttl_for)
+    return bool(mobile)
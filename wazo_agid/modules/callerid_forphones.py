@@ -1,4 +1,4 @@
-# Copyright 2012-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2012-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from __future__ import annotations
@@ -12,6 +12,7 @@ from xivo_dao.resources.directory_profile import dao as directory_profile_dao
 
 from wazo_agid import agid
 from wazo_agid import dialplan_variables as dv
+from wazo_agid import reverse_lookup
 
 logger = logging.getLogger(__name__)
 
@@ -39,20 +40,23 @@ def callerid_forphones(agi: agid.FastAGI, cursor: DictCursor, args: list[str]) -
 
         tenant_uuid = agi.get_variable('WAZO_TENANT_UUID')
         # It is not possible to associate a profile to a reverse configuration in the web
-        lookup_result = dird_client.directories.reverse(
+        lookup_result = reverse_lookup.reverse(
+            dird_client,
             profile='default',
             user_uuid=user_uuid,
             exten=cid_number,
             tenant_uuid=tenant_uuid,
         )
-        if lookup_result['display'] is not None:
-            logger.debug(
-                'Found caller ID from reverse lookup: "%s"<%s>',
-                lookup_result['display'],
-                cid_number,
-            )
-            _set_new_caller_id(agi, lookup_result['display'], cid_number)
-            _set_reverse_lookup_variable(agi, lookup_result['fields'])
+        if lookup_result is None or not reverse_lookup.is_found(lookup_result):
+            return
+
+        logger.debug(
+            'Found caller ID from reverse lookup: "%s"<%s>',
+            lookup_result['display'],
+            cid_number,
+        )
+        _set_new_caller_id(agi, lookup_result['display'], cid_number)
+        _set_reverse_lookup_variable(agi, lookup_result['fields'])
     except Exception as e:
         msg = f'Reverse lookup failed: {e}'
         logger.info(msg)
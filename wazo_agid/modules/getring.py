@@ -1,4 +1,4 @@
-# Copyright 2006-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2006-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from __future__ import annotations
@@ -18,11 +18,16 @@ logger = logging.getLogger(__name__)
 
 
 def getring(agi: agid.FastAGI, cursor: DictCursor, args: list[str]) -> None:
-    dstnum = agi.get_variable(dv.REAL_NUMBER)
-    context = agi.get_variable(dv.REAL_CONTEXT)
-    origin = agi.get_variable('WAZO_CALLORIGIN')
-    referer = agi.get_variable('WAZO_FWD_REFERER').split(':', 1)[0]
-    forwarded = agi.get_variable(dv.CALLFORWARDED)
+    dstnum, context, origin, referer, forwarded = agi.get_variables(
+        [
+            dv.REAL_NUMBER,
+            dv.REAL_CONTEXT,
+            'WAZO_CALLORIGIN',
+            'WAZO_FWD_REFERER',
+            dv.CALLFORWARDED,
+        ]
+    )
+    referer = referer.split(':', 1)[0]
     # TODO: maybe replace number@context with user id in conf file ?
     dstnum_context = f"{dstnum}@{context}"
     referer_origin = f"{referer}@{origin}"
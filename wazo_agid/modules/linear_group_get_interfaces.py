@@ -1,16 +1,13 @@
-# Copyright 2018-2024 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2018-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from __future__ import annotations
 
 import logging
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, Literal
+from typing import TYPE_CHECKING, ClassVar, Literal, Union
 
-from xivo_dao.alchemy.groupfeatures import GroupFeatures
-from xivo_dao.resources.group import dao as group_dao
-
-from wazo_agid import agid
+from wazo_agid import agid, cache
 
 if TYPE_CHECKING:
     from psycopg2.extras import DictCursor
@@ -20,24 +17,57 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
-
-@dataclass
+# member lists by group id, cleared on reload. The DND of the users changes
+# often and is read on each call.
+_group_cache = cache.get_cache('linear_group')
+
+AVAILABLE_STATES = ('NOT_INUSE', 'UNKNOWN')
+
+# The group and its members in a single round trip: the user members first,
+# then the extension members (userid 0), each by position. The group row is
+# returned with NULL members when the group has no member.
+GROUP_MEMBERS_QUERY = (
+    "SELECT groupfeatures.name, groupfeatures.ring_in_use, "
+    "userfeatures.uuid, "
+    "queuemember.exten, queuemember.context "
+    "FROM groupfeatures "
+    "LEFT JOIN queuemember "
+    "ON queuemember.queue_name = groupfeatures.name "
+    "AND queuemember.category = 'group' "
+    "AND queuemember.usertype = 'user' "
+    "LEFT JOIN userfeatures "
+    "ON userfeatures.id = queuemember.userid "
+    "WHERE groupfeatures.id = %s "
+    "ORDER BY userfeatures.id IS NULL, queuemember.position"
+)
+
+DND_QUERY = "SELECT uuid FROM userfeatures WHERE uuid = ANY(%s) AND enablednd = 1"
+
+
+@dataclass(frozen=True)
 class UserMemberInfo:
+    __slots__ = ('uuid',)
     uuid: str
-    dnd: bool
-    type: Literal['user'] = 'user'
+    type: ClassVar[Literal['user']] = 'user'
 
 
-@dataclass
+@dataclass(frozen=True)
 class ExtensionMemberInfo:
+    __slots__ = ('extension', 'context')
     extension: str
     context: str
-    type: Literal['extension'] = 'extension'
+    type: ClassVar[Literal['extension']] = 'extension'
+
+
+MemberInfo = Union[UserMemberInfo, ExtensionMemberInfo]
 
 
-@dataclass
+@dataclass(frozen=True)
 class GroupInfo:
-    members: list[UserMemberInfo | ExtensionMemberInfo]
+    """Members of a group, shared between requests by the cache"""
+
+    __slots__ = ('members', 'name', 'ring_in_use')
+    members: tuple[MemberInfo, ...]
     name: str
     ring_in_use: bool
 
@@ -50,32 +80,37 @@ def build_extension_interface(extension: str, context: str):
     return f'Local/{extension}@{context}'
 
 
-def get_group_info(group_id: int) -> GroupInfo:
-    group: GroupFeatures = group_dao.get(group_id=group_id)
+def get_group_info(cursor: DictCursor, group_id: int) -> GroupInfo:
+    return _group_cache.get(group_id, lambda: _load_group_info(cursor, group_id))
 
-    user_member_info = [
-        UserMemberInfo(
-            uuid=user_member.user.uuid,
-            dnd=user_member.user.enablednd,
-        )
-        for user_member in group.user_queue_members
-    ]
 
-    extension_member_info = [
-        ExtensionMemberInfo(
-            extension=extension_member.extension.exten,
-            context=extension_member.extension.context,
-        )
-        for extension_member in group.extension_queue_members
-    ]
+def _load_group_info(cursor: DictCursor, group_id: int) -> GroupInfo:
+    cursor.execute(GROUP_MEMBERS_QUERY, (group_id,))
+    rows = cursor.fetchall()
+    if not rows:
+        raise LookupError(f'Unable to find group (id: {group_id})')
+
+    members: list[MemberInfo] = []
+    for row in rows:
+        if row['uuid'] is not None:
+            members.append(UserMemberInfo(uuid=row['uuid']))
+        elif row['exten'] is not None:
+            members.append(
+                ExtensionMemberInfo(extension=row['exten'], context=row['context'])
+            )
 
-    group_info = GroupInfo(
-        members=user_member_info + extension_member_info,
-        name=group.name,
-        ring_in_use=group.ring_in_use,
+    return GroupInfo(
+        members=tuple(members),
+        name=rows[0]['name'],
+        ring_in_use=bool(rows[0]['ring_in_use']),
     )
 
-    return group_info
+
+def get_users_in_dnd(cursor: DictCursor, user_uuids: list[str]) -> set[str]:
+    if not user_uuids:
+        return set()
+    cursor.execute(DND_QUERY, (user_uuids,))
+    return {row['uuid'] for row in cursor.fetchall()}
 
 
 def linear_group_get_interfaces(
@@ -83,53 +118,60 @@ def linear_group_get_interfaces(
 ) -> None:
     group_id = int(args[0])
     logger.info('Computing member interfaces for group (id=%s)', group_id)
-    group_info = get_group_info(group_id)
+    group_info = get_group_info(cursor, group_id)
     logger.debug(
         'group %s(id=%s) has %d members',
         group_info.name,
         group_id,
         len(group_info.members),
     )
-    member_interfaces = []
+    users_in_dnd = get_users_in_dnd(
+        cursor, [member.uuid for member in group_info.members if member.type == 'user']
+    )
+    extensions = []
     for member in group_info.members:
         if member.type == 'user':
-            if member.dnd:
+            if member.uuid in users_in_dnd:
                 logger.debug(
                     'group member (user_uuid=%s) is in DND, skipping', member.uuid
                 )
                 continue
-            extension = f'{member.uuid}@usersharedlines'
-            extension_state = agi.get_variable(f'EXTENSION_STATE({extension})')
+            extensions.append(f'{member.uuid}@usersharedlines')
         elif member.type == 'extension':
-            extension = f'{member.extension}@{member.context}'
-            extension_state = agi.get_variable(f'EXTENSION_STATE({extension})')
-
-        if group_info.ring_in_use or extension_state in (
-            'NOT_INUSE',
-            'UNKNOWN',
-        ):
-            interface = f'Local/{extension}'
-            member_interfaces.append(interface)
-        else:
-            logger.info(
-                'ring in use is disabled for group %s, '
-                'and extension %s is not available(state %s), '
-                'excluding it from linear group dialing',
-                group_info.name,
-                extension,
-                extension_state,
-            )
+            extensions.append(f'{member.extension}@{member.context}')
+
+    if group_info.ring_in_use:
+        member_interfaces = [f'Local/{extension}' for extension in extensions]
+    else:
+        # the states of all the members are read in a single exchange
+        extension_states = agi.get_variables(
+            f'EXTENSION_STATE({extension})' for extension in extensions
+        )
+        member_interfaces = []
+        for extension, extension_state in zip(extensions, extension_states):
+            if extension_state in AVAILABLE_STATES:
+                member_interfaces.append(f'Local/{extension}')
+            else:
+                logger.info(
+                    'ring in use is disabled for group %s, '
+                    'and extension %s is not available(state %s), '
+                    'excluding it from linear group dialing',
+                    group_info.name,
+                    extension,
+                    extension_state,
+                )
 
     logger.debug('Identified %d available member interfaces', len(member_interfaces))
-    agi.set_variable(
-        'WAZO_GROUP_LINEAR_INTERFACE_COUNT',
-        len(member_interfaces),
-    )
-    for i, interface in enumerate(member_interfaces):
+    with agi.batch():
         agi.set_variable(
-            f'WAZO_GROUP_LINEAR_{i}_INTERFACE',
-            interface,
+            'WAZO_GROUP_LINEAR_INTERFACE_COUNT',
+            len(member_interfaces),
         )
+        for i, interface in enumerate(member_interfaces):
+            agi.set_variable(
+                f'WAZO_GROUP_LINEAR_{i}_INTERFACE',
+                interface,
+            )
 
 
 agid.register(linear_group_get_interfaces)
@@ -1,13 +1,15 @@
-# Copyright 2011-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2011-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from __future__ import annotations
 
 import logging
+from functools import partial
 from typing import TYPE_CHECKING, Any
 
 from wazo_agid import agid
 from wazo_agid import dialplan_variables as dv
+from wazo_agid import parallel
 
 if TYPE_CHECKING:
     from psycopg2.extras import DictCursor
@@ -20,11 +22,17 @@ TIMEOUT = 10
 
 
 def _do_provision(client: ConfdClient, provcode: str, ip: str) -> None:
-    device = _get_device(client, ip)
     if provcode == "autoprov":
+        device = _get_device(client, ip)
         client.devices.autoprov(device['id'])
     else:
-        line = _get_line(client, provcode)
+        device_outcome, line_outcome = parallel.run(
+            partial(_get_device, client, ip),
+            partial(_get_line, client, provcode),
+            timeout=TIMEOUT,
+        )
+        device = device_outcome.result()
+        line = line_outcome.result()
         client.lines(line).add_device(device)
     client.devices.synchronize(device['id'])
 
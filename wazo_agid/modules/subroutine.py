@@ -1,4 +1,4 @@
-# Copyright 2023-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2023-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import logging
@@ -50,20 +50,30 @@ def pre_subroutine_compat(
     agi: agid.FastAGI, cursor: DictCursor, args: list[str]
 ) -> None:
     logger.debug('Entering pre-subroutine compatibility')
-    for new_name, old_name in VARIABLE_MAP.items():
-        current_value = agi.get_variable(new_name)
-        agi.set_variable(old_name, current_value)
-        agi.set_variable(ORIG_VALUE_TPL.format(new_name=new_name), current_value)
+    current_values = dict(zip(VARIABLE_MAP, agi.get_variables(VARIABLE_MAP)))
+    with agi.batch():
+        for new_name, old_name in VARIABLE_MAP.items():
+            current_value = current_values[new_name]
+            agi.set_variable(old_name, current_value)
+            agi.set_variable(ORIG_VALUE_TPL.format(new_name=new_name), current_value)
 
 
 def post_subroutine_compat(
     agi: agid.FastAGI, cursor: DictCursor, args: list[str]
 ) -> None:
     logger.debug('Entering post-subroutine compatibility')
+    with agi.batch():
+        _post_subroutine_compat(agi)
+
+
+def _post_subroutine_compat(agi: agid.FastAGI) -> None:
+    names = []
     for new_name, old_name in VARIABLE_MAP.items():
-        orig_value = agi.get_variable(ORIG_VALUE_TPL.format(new_name=new_name))
-        new_value = agi.get_variable(new_name)
-        compat_value = agi.get_variable(old_name)
+        names.extend([ORIG_VALUE_TPL.format(new_name=new_name), new_name, old_name])
+    values = agi.get_variables(names)
+
+    for i, (new_name, old_name) in enumerate(VARIABLE_MAP.items()):
+        orig_value, new_value, compat_value = values[i * 3 : i * 3 + 3]
 
         # Cleanup the mess to make sure it does not get used
         agi.set_variable(old_name, '')
@@ -1,4 +1,4 @@
-# Copyright 2019-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2019-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from __future__ import annotations
@@ -34,7 +34,9 @@ class TestGetRing(unittest.TestCase):
             dv.REAL_CONTEXT: 'default',
             'WAZO_FWD_REFERER': 'foo:bar',
         }
-        self.agi.get_variable.side_effect = lambda var: variables.get(var)
+        self.agi.get_variables.side_effect = lambda names: [
+            variables.get(name, '') for name in names
+        ]
 
         assert_that(
             calling(getring.getring).with_args(self.agi, self.cursor, []),
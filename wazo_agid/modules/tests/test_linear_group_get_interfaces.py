@@ -1,117 +1,192 @@
-# Copyright 2015-2024 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2015-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from __future__ import annotations
 
 import unittest
-from unittest.mock import Mock, patch
+from unittest.mock import MagicMock, Mock, patch
 from uuid import uuid4
 
-from hamcrest import assert_that, contains_inanyorder, has_properties
-from xivo_dao.alchemy.queuemember import QueueMember
+from hamcrest import (
+    assert_that,
+    calling,
+    contains_exactly,
+    equal_to,
+    has_properties,
+    raises,
+)
 
-from wazo_agid.handlers.userfeatures import UserFeatures
+from wazo_agid.cache import EntityCache
 from wazo_agid.modules import linear_group_get_interfaces
 
 
+def group_row(uuid=None, exten=None, context=None, ring_in_use=0):
+    return {
+        'name': 'sales',
+        'ring_in_use': ring_in_use,
+        'uuid': uuid,
+        'exten': exten,
+        'context': context,
+    }
+
+
+class FakeCursor:
+    def __init__(self, group_rows, users_in_dnd):
+        self.group_rows = group_rows
+        self.users_in_dnd = users_in_dnd
+        self.queries = []
+        self._rows = []
+
+    def execute(self, query, args):
+        self.queries.append(query)
+        if query == linear_group_get_interfaces.GROUP_MEMBERS_QUERY:
+            self._rows = self.group_rows
+        else:
+            self._rows = [
+                {'uuid': uuid} for uuid in args[0] if uuid in self.users_in_dnd
+            ]
+
+    def fetchall(self):
+        return self._rows
+
+
 class TestGetGroupMembers(unittest.TestCase):
     def setUp(self):
-        pass
+        self.cursor = Mock()
 
     def test_get_group_info_empty(self):
-        with patch(
-            'wazo_agid.modules.linear_group_get_interfaces.group_dao'
-        ) as mock_dao:
-            mock_dao.get.return_value = Mock(
-                user_queue_members=[],
-                extension_queue_members=[],
-                ring_in_use=False,
-            )
-            mock_dao.get.return_value.name = 'test'
-            group_info = linear_group_get_interfaces.get_group_info(1)
-            assert group_info.members == []
-            assert group_info.name == 'test'
-            assert not group_info.ring_in_use
+        self.cursor.fetchall.return_value = [group_row()]
+
+        group_info = linear_group_get_interfaces.get_group_info(self.cursor, 1)
+
+        assert_that(
+            group_info, has_properties(members=(), name='sales', ring_in_use=False)
+        )
+
+    def test_get_group_info_unknown_group(self):
+        self.cursor.fetchall.return_value = []
+
+        assert_that(
+            calling(linear_group_get_interfaces.get_group_info).with_args(
+                self.cursor, 1
+            ),
+            raises(LookupError),
+        )
 
     def test_get_group_info_only_users(self):
-        with patch(
-            'wazo_agid.modules.linear_group_get_interfaces.group_dao'
-        ) as mock_dao:
-            mock_users = [
-                Mock(
-                    spec=QueueMember,
-                    id='1',
-                    user=Mock(spec=UserFeatures, uuid=str(uuid4()), enablednd=False),
-                ),
-                Mock(
-                    spec=QueueMember,
-                    id='2',
-                    user=Mock(spec=UserFeatures, uuid=str(uuid4()), enablednd=True),
-                ),
-                Mock(
-                    spec=QueueMember,
-                    id='3',
-                    user=Mock(spec=UserFeatures, uuid=str(uuid4()), enablednd=False),
-                ),
-            ]
-            mock_dao.get.return_value = Mock(
-                user_queue_members=mock_users,
-                extension_queue_members=[],
-            )
-            group_info = linear_group_get_interfaces.get_group_info(1)
-            assert group_info.members and len(group_info.members) == 3
-            assert_that(
-                group_info.members,
-                contains_inanyorder(
-                    *(
-                        has_properties(
-                            type='user',
-                            uuid=member.user.uuid,
-                            dnd=member.user.enablednd,
-                        )
-                        for member in mock_users
-                    )
-                ),
-            )
-
-    def test_get_group_info_only_extensions(self):
-        with patch(
-            'wazo_agid.modules.linear_group_get_interfaces.group_dao'
-        ) as mock_dao:
-            mock_extensions = [
-                Mock(
-                    spec=QueueMember,
-                    id='1',
-                    extension=Mock(exten='1', context='somecontext'),
-                ),
-                Mock(
-                    spec=QueueMember,
-                    id='2',
-                    extension=Mock(exten='2', context='somecontext'),
-                ),
-                Mock(
-                    spec=QueueMember,
-                    id='3',
-                    extension=Mock(exten='3', context='somecontext'),
-                ),
-            ]
-            mock_dao.get.return_value = Mock(
-                user_queue_members=[],
-                extension_queue_members=mock_extensions,
-            )
-
-            group_info = linear_group_get_interfaces.get_group_info(1)
-            assert group_info.members and len(group_info.members) == 3
-            assert_that(
-                group_info.members,
-                contains_inanyorder(
-                    *(
-                        has_properties(
-                            type='extension',
-                            extension=member.extension.exten,
-                            context='somecontext',
-                        )
-                        for member in mock_extensions
-                    )
-                ),
-            )
+        uuids = [str(uuid4()) for _ in range(3)]
+        self.cursor.fetchall.return_value = [
+            group_row(uuid=uuids[0]),
+            group_row(uuid=uuids[1]),
+            group_row(uuid=uuids[2]),
+        ]
+
+        group_info = linear_group_get_interfaces.get_group_info(self.cursor, 1)
+
+        assert_that(
+            group_info.members,
+            contains_exactly(
+                has_properties(type='user', uuid=uuids[0]),
+                has_properties(type='user', uuid=uuids[1]),
+                has_properties(type='user', uuid=uuids[2]),
+            ),
+        )
+
+    def test_get_group_info_users_and_extensions(self):
+        user_uuid = str(uuid4())
+        self.cursor.fetchall.return_value = [
+            group_row(uuid=user_uuid),
+            group_row(exten='1', context='somecontext'),
+            group_row(exten='2', context='somecontext'),
+        ]
+
+        group_info = linear_group_get_interfaces.get_group_info(self.cursor, 1)
+
+        assert_that(
+            group_info.members,
+            contains_exactly(
+                has_properties(type='user', uuid=user_uuid),
+                has_properties(type='extension', extension='1', context='somecontext'),
+                has_properties(type='extension', extension='2', context='somecontext'),
+            ),
+        )
+        self.cursor.execute.assert_called_once_with(
+            linear_group_get_interfaces.GROUP_MEMBERS_QUERY, (1,)
+        )
+
+
+class TestLinearGroupGetInterfaces(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.object(
+            linear_group_get_interfaces,
+            '_group_cache',
+            EntityCache('linear_group', ttl=60),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.agi = MagicMock()
+        self.states = {
+            'EXTENSION_STATE(alice@usersharedlines)': 'NOT_INUSE',
+            'EXTENSION_STATE(bob@usersharedlines)': 'INUSE',
+            'EXTENSION_STATE(carol@usersharedlines)': 'NOT_INUSE',
+            'EXTENSION_STATE(1001@default)': 'UNKNOWN',
+        }
+        self.agi.get_variables.side_effect = lambda names: [
+            self.states[name] for name in names
+        ]
+        self.cursor = FakeCursor(
+            [
+                group_row(uuid='alice'),
+                group_row(uuid='bob'),
+                group_row(uuid='carol'),
+                group_row(exten='1001', context='default'),
+            ],
+            users_in_dnd={'carol'},
+        )
+
+    def get_interfaces(self):
+        self.agi.reset_mock()
+        linear_group_get_interfaces.linear_group_get_interfaces(
+            self.agi, self.cursor, ['1']
+        )
+        return [
+            args[1]
+            for args, _ in self.agi.set_variable.call_args_list
+            if args[0] != 'WAZO_GROUP_LINEAR_INTERFACE_COUNT'
+        ]
+
+    def test_available_members_are_dialed(self):
+        interfaces = self.get_interfaces()
+
+        assert_that(
+            interfaces,
+            contains_exactly('Local/alice@usersharedlines', 'Local/1001@default'),
+        )
+        self.agi.get_variables.assert_called_once()
+        self.agi.set_variable.assert_any_call('WAZO_GROUP_LINEAR_INTERFACE_COUNT', 2)
+
+    def test_states_are_not_read_when_ringing_in_use(self):
+        self.cursor.group_rows = [
+            group_row(uuid='bob', ring_in_use=1),
+            group_row(uuid='carol', ring_in_use=1),
+        ]
+
+        interfaces = self.get_interfaces()
+
+        assert_that(interfaces, contains_exactly('Local/bob@usersharedlines'))
+        self.agi.get_variables.assert_not_called()
+
+    def test_dnd_is_read_on_each_call(self):
+        self.get_interfaces()
+        self.cursor.users_in_dnd = {'alice'}
+
+        interfaces = self.get_interfaces()
+
+        assert_that(
+            interfaces,
+            contains_exactly('Local/carol@usersharedlines', 'Local/1001@default'),
+        )
+        assert_that(
+            self.cursor.queries.count(linear_group_get_interfaces.GROUP_MEMBERS_QUERY),
+            equal_to(1),
+        )
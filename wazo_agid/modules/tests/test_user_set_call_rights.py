@@ -0,0 +1,111 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import unittest
+from unittest.mock import Mock, call, patch
+
+from hamcrest import assert_that, contains_exactly, equal_to
+
+from wazo_agid import dialplan_variables as dv
+from wazo_agid.call_rights import CallRightMatcher
+
+from ..user_set_call_rights import user_set_call_rights
+
+
+def a_rule(member_type, id_=1, authorization=0, passwd='', rightcallcode=None):
+    return {
+        'member_type': member_type,
+        'id': id_,
+        'authorization': authorization,
+        'passwd': passwd,
+        'rightcallcode': rightcallcode,
+    }
+
+
+@patch('wazo_agid.call_rights.get_matcher')
+class TestUserSetCallRights(unittest.TestCase):
+    def setUp(self):
+        self.variables = {'WAZO_USERID': '42', 'WAZO_DSTNUM': '0612345678'}
+        self.agi = Mock()
+        self.agi.get_variables.side_effect = lambda names: [
+            self.variables.get(name, '') for name in names
+        ]
+        self.cursor = Mock()
+        self.cursor.fetchall.return_value = []
+        self.matcher = CallRightMatcher([(1, '_06XXXXXXXX'), (2, '_1XX')])
+
+    def test_no_matching_call_right(self, get_matcher):
+        get_matcher.return_value = self.matcher
+        self.variables['WAZO_DSTNUM'] = '911'
+
+        user_set_call_rights(self.agi, self.cursor, [])
+
+        self.agi.set_variable.assert_called_once_with(dv.AUTHORIZATION, 'ALLOW')
+        self.cursor.execute.assert_not_called()
+
+    def test_user_rule_with_rightcallcode(self, get_matcher):
+        get_matcher.return_value = self.matcher
+        self.cursor.fetchall.return_value = [
+            a_rule('user', passwd='1234', rightcallcode='5678'),
+        ]
+
+        user_set_call_rights(self.agi, self.cursor, [])
+
+        assert_that(
+            self.agi.set_variable.call_args_list,
+            contains_exactly(
+                call(dv.PASSWORD, '5678'),
+                call(dv.AUTHORIZATION, 'DENY'),
+            ),
+        )
+
+    def test_group_rule_when_user_has_none(self, get_matcher):
+        get_matcher.return_value = self.matcher
+        self.cursor.fetchall.return_value = [
+            a_rule('user', id_=None),
+            a_rule('group', authorization=1),
+        ]
+
+        user_set_call_rights(self.agi, self.cursor, [])
+
+        self.agi.set_variable.assert_called_once_with(dv.AUTHORIZATION, 'ALLOW')
+
+    def test_unknown_user_without_outcall_is_allowed(self, get_matcher):
+        get_matcher.return_value = self.matcher
+
+        user_set_call_rights(self.agi, self.cursor, [])
+
+        self.agi.set_variable.assert_called_once_with(dv.AUTHORIZATION, 'ALLOW')
+
+    def test_outcall_rule(self, get_matcher):
+        get_matcher.return_value = self.matcher
+        self.variables[dv.OUTCALL_ID] = '3'
+        self.cursor.fetchall.return_value = [a_rule('outcall', passwd='0000')]
+
+        user_set_call_rights(self.agi, self.cursor, [])
+
+        assert_that(
+            self.agi.set_variable.call_args_list,
+            contains_exactly(
+                call(dv.PASSWORD, '0000'),
+                call(dv.AUTHORIZATION, 'DENY'),
+            ),
+        )
+        params = self.cursor.execute.call_args[0][1]
+        assert_that(params, equal_to({'user_id': 42, 'outcall_id': 3}))
+
+    def test_one_query_per_call(self, get_matcher):
+        get_matcher.return_value = self.matcher
+        self.variables[dv.OUTCALL_ID] = '3'
+        self.cursor.fetchall.return_value = [
+            a_rule('user', id_=None),
+            a_rule('group', id_=None),
+            a_rule('outcall', authorization=1),
+        ]
+
+        for _ in range(10):
+            user_set_call_rights(self.agi, self.cursor, [])
+
+        assert_that(self.cursor.execute.call_count, equal_to(10))
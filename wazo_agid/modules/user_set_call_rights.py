@@ -1,147 +1,129 @@
-# Copyright 2006-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2006-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from __future__ import annotations
 
 import logging
+from collections import defaultdict
 
 from psycopg2.extras import DictCursor, DictRow
-from psycopg2.sql import SQL, Literal, Placeholder
+from psycopg2.sql import SQL, Literal
 
 from wazo_agid import agid, call_rights
 from wazo_agid import dialplan_variables as dv
-from wazo_agid import objects
-from wazo_agid.objects import join_column_names
 
 logger = logging.getLogger(__name__)
 
+# Rules of the user, of the groups of the user and of the outcall matching
+# the call rights, in a single round trip. The user row with a NULL id is
+# returned when the user exists, even if no rule applies to them.
+RULES_QUERY = SQL(
+    "WITH rights AS ("
+    "SELECT rightcall.id, rightcall.authorization, rightcall.passwd, "
+    "rightcallmember.type, rightcallmember.typeval "
+    "FROM rightcall "
+    "INNER JOIN rightcallmember "
+    "ON rightcall.id = rightcallmember.rightcallid "
+    "WHERE rightcall.id IN ({rightcall_ids}) "
+    "AND rightcall.commented = 0"
+    "), caller AS ("
+    "SELECT id, rightcallcode FROM userfeatures WHERE id = %(user_id)s"
+    ") "
+    "SELECT 'user' AS member_type, rights.id, rights.authorization, "
+    "rights.passwd, caller.rightcallcode "
+    "FROM caller "
+    "LEFT JOIN rights "
+    "ON rights.type = 'user' "
+    "AND rights.typeval = CAST(caller.id AS VARCHAR) "
+    "UNION ALL "
+    "SELECT 'group', rights.id, rights.authorization, rights.passwd, NULL "
+    "FROM rights "
+    "INNER JOIN groupfeatures "
+    "ON rights.typeval = CAST(groupfeatures.id AS VARCHAR) "
+    "INNER JOIN queuemember "
+    "ON groupfeatures.name = queuemember.queue_name "
+    "INNER JOIN queue "
+    "ON queue.name = queuemember.queue_name "
+    "INNER JOIN caller "
+    "ON queuemember.userid = caller.id "
+    "WHERE rights.type = 'group' "
+    "AND queuemember.usertype = 'user' "
+    "AND queuemember.category = 'group' "
+    "AND queuemember.commented = 0 "
+    "AND queue.category = 'group' "
+    "AND queue.commented = 0 "
+    "UNION ALL "
+    "SELECT 'outcall', rights.id, rights.authorization, rights.passwd, NULL "
+    "FROM rights "
+    "INNER JOIN outcall "
+    "ON rights.typeval = CAST(outcall.id AS VARCHAR) "
+    "WHERE rights.type = 'outcall' "
+    "AND outcall.id = %(outcall_id)s "
+    "ORDER BY id"
+)
+
+
+def _fetch_rules(
+    cursor: DictCursor,
+    rightcall_ids: set[int],
+    user_id: int | None,
+    outcall_id: int | None,
+) -> dict[str, list[DictRow]]:
+    cursor.execute(
+        RULES_QUERY.format(
+            rightcall_ids=SQL(',').join(Literal(id_) for id_ in sorted(rightcall_ids))
+        ),
+        {'user_id': user_id, 'outcall_id': outcall_id},
+    )
+    rules: dict[str, list[DictRow]] = defaultdict(list)
+    for row in cursor.fetchall():
+        rules[row['member_type']].append(row)
+    return rules
+
 
 def _user_set_call_rights(
     agi: agid.FastAGI, cursor: DictCursor, args: list[str]
 ) -> None:
-    userid = agi.get_variable('WAZO_USERID')
-    dstnum = agi.get_variable('WAZO_DSTNUM')
-    outcallid = agi.get_variable(dv.OUTCALL_ID)
-
-    cursor.execute("SELECT rightcallid, exten FROM rightcallexten")
-    res = cursor.fetchall()
+    userid, dstnum, outcallid = agi.get_variables(
+        ['WAZO_USERID', 'WAZO_DSTNUM', dv.OUTCALL_ID]
+    )
 
-    if not res:
+    matcher = call_rights.get_matcher(cursor)
+    if not matcher:
         call_rights.allow(agi)
 
-    rightcallidset = {
-        row['rightcallid']
-        for row in res
-        if call_rights.extension_matches(dstnum, row['exten'])
-    }
+    rightcallidset = matcher.matching_ids(dstnum)
 
     if not rightcallidset:
         call_rights.allow(agi)
 
-    rightcall_ids = SQL(',').join(Literal(str(el)) for el in rightcallidset)
     try:
-        user = objects.User(agi, cursor, int(userid))
-    except (ValueError, LookupError):
+        user_id = int(userid)
+    except ValueError:
+        user_id = None
+
+    rules = _fetch_rules(
+        cursor, rightcallidset, user_id, int(outcallid) if outcallid else None
+    )
+    user_rows = rules['user']
+
+    if not user_rows:
         if not outcallid:
             call_rights.allow(agi)
     else:
-        query = SQL(
-            "SELECT {columns} FROM rightcall "
-            "INNER JOIN rightcallmember "
-            "ON rightcall.id = rightcallmember.rightcallid "
-            "WHERE rightcall.id IN ({rightcall_ids}) "
-            "AND rightcallmember.type = 'user' "
-            "AND rightcallmember.typeval = '%s' "
-            "AND rightcall.commented = 0"
-        )
-        columns = (
-            call_rights.RIGHTCALL_AUTHORIZATION_COLNAME,
-            call_rights.RIGHTCALL_PASSWD_COLNAME,
-        )
-        cursor.execute(
-            query.format(
-                columns=join_column_names(columns),
-                rightcall_ids=rightcall_ids,
-            ),
-            (user.id,),
-        )
-        call_rights_res: list[DictCursor] = cursor.fetchall()
-
-        if user.rightcallcode:
-            for i, value in enumerate(call_rights_res):
-                if value[1]:
-                    call_rights_res[i][1] = user.rightcallcode
-
-        call_rights.apply_rules(agi, call_rights_res)
-
-        cursor.execute(
-            "SELECT groupfeatures.id FROM groupfeatures "
-            "INNER JOIN queuemember "
-            "ON groupfeatures.name = queuemember.queue_name "
-            "INNER JOIN queue "
-            "ON queue.name = queuemember.queue_name "
-            "WHERE queuemember.userid = %s "
-            "AND queuemember.usertype = 'user' "
-            "AND queuemember.category = 'group' "
-            "AND queuemember.commented = 0 "
-            "AND queue.category = 'group' "
-            "AND queue.commented = 0",
-            (user.id,),
-        )
-        group_feature_res: list[DictRow] = cursor.fetchall()
-
-        if group_feature_res:
-            groupids = [row['id'] for row in group_feature_res]
-            columns = (
-                call_rights.RIGHTCALL_AUTHORIZATION_COLNAME,
-                call_rights.RIGHTCALL_PASSWD_COLNAME,
-            )
-            query = SQL(
-                "SELECT {columns} FROM rightcall "
-                "INNER JOIN rightcallmember "
-                "ON rightcall.id = rightcallmember.rightcallid "
-                "WHERE rightcall.id IN ({rightcall_ids}) "
-                "AND rightcallmember.type = 'group' "
-                "AND rightcallmember.typeval IN ({typeval_choices}) "
-                "AND rightcall.commented = 0"
-            )
-            cursor.execute(
-                query.format(
-                    columns=join_column_names(columns),
-                    typeval_choices=SQL(',').join(
-                        Placeholder() * len(group_feature_res)
-                    ),
-                    rightcall_ids=rightcall_ids,
-                ),
-                [str(group_id) for group_id in groupids],
-            )
-            member_res = cursor.fetchall()
-            call_rights.apply_rules(agi, member_res)
+        rightcallcode = user_rows[0]['rightcallcode']
+        user_rules = []
+        for row in user_rows:
+            if row['id'] is None:
+                continue
+            if rightcallcode and row['passwd']:
+                row = dict(row, passwd=rightcallcode)
+            user_rules.append(row)
+        call_rights.apply_rules(agi, user_rules)
+        call_rights.apply_rules(agi, rules['group'])
 
     if outcallid:
-        columns = (
-            call_rights.RIGHTCALL_AUTHORIZATION_COLNAME,
-            call_rights.RIGHTCALL_PASSWD_COLNAME,
-        )
-        query = SQL(
-            "SELECT {columns} FROM rightcall "
-            "INNER JOIN rightcallmember "
-            "ON rightcall.id = rightcallmember.rightcallid "
-            "INNER JOIN outcall "
-            "ON CAST(rightcallmember.typeval AS integer) = outcall.id "
-            "WHERE rightcall.id IN ({rightcall_ids}) "
-            "AND rightcallmember.type = 'outcall' "
-            "AND outcall.id = %s "
-            "AND rightcall.commented = 0",
-        )
-        cursor.execute(
-            query.format(
-                columns=join_column_names(columns), rightcall_ids=rightcall_ids
-            ),
-            (outcallid,),
-        )
-        call_rights_res = cursor.fetchall()
-        call_rights.apply_rules(agi, call_rights_res)
+        call_rights.apply_rules(agi, rules['outcall'])
 
     call_rights.allow(agi)
 
@@ -155,4 +137,8 @@ def user_set_call_rights(
         return
 
 
-agid.register(user_set_call_rights)
+def setup(cursor: DictCursor) -> None:
+    call_rights.get_matcher(cursor)
+
+
+agid.register(user_set_call_rights, setup)
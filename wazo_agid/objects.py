@@ -1,18 +1,21 @@
-# Copyright 2007-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2007-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from __future__ import annotations
 
 import logging
 import re
-from collections.abc import Sequence
-from typing import TYPE_CHECKING
+from collections.abc import Hashable, Sequence
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any
 
 from psycopg2.extras import DictCursor, DictRow
 from psycopg2.sql import SQL, Composable, Identifier
 from xivo_dao import user_dao
 
+from wazo_agid import cache
 from wazo_agid import dialplan_variables as dv
+from wazo_agid import timezones
 from wazo_agid.schedule import (
     AlwaysOpenedSchedule,
     Schedule,
@@ -27,6 +30,16 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+_user_cache = cache.get_cache('user')
+_queue_cache = cache.get_cache('queue')
+_dialaction_cache = cache.get_cache('dialaction')
+_tenant_cache = cache.get_cache('tenant')
+_trunk_cache = cache.get_cache('trunk')
+_did_cache = cache.get_cache('did')
+_context_cache = cache.get_cache('context')
+_callerid_cache = cache.get_cache('callerid')
+_schedule_cache = cache.get_cache('schedule')
+
 
 class DBUpdateException(Exception):
     pass
@@ -43,6 +56,14 @@ def sanitize_aliased_column(name: str, alias: str) -> Composable:
     return Identifier(*name.split(".")) + SQL(" AS ") + Identifier(alias)
 
 
+def fetch_one(
+    cursor: DictCursor, query: Composable | str, args: Sequence[Any]
+) -> dict[str, Any] | None:
+    cursor.execute(query, args)
+    res: DictRow = cursor.fetchone()
+    return dict(res) if res else None
+
+
 def join_column_names(fields: Sequence[str]) -> Composable:
     """
     Take a list of fields and join them together for insertion, safely, into SQL query.
@@ -368,6 +389,45 @@ class Paging:
 
 
 class User:
+    _columns = (
+        'id',
+        'uuid',
+        'tenant_uuid',
+        'firstname',
+        'lastname',
+        'language',
+        'userfield',
+        'callerid',
+        'mobilephonenumber',
+        'musiconhold',
+        'outcallerid',
+        'ringseconds',
+        'simultcalls',
+        'voicemailid',
+        'enablexfer',
+        'dtmf_hangup',
+        'enableonlinerec',
+        'preprocess_subroutine',
+        'bsfilter',
+        'rightcallcode',
+    )
+    # changed from the phones, confd and the applications, read on each call
+    _feature_columns = (
+        'enablevoicemail',
+        'incallfilter',
+        'enablednd',
+        'enableunc',
+        'destunc',
+        'enablerna',
+        'destrna',
+        'enablebusy',
+        'destbusy',
+        'call_record_outgoing_external_enabled',
+        'call_record_outgoing_internal_enabled',
+        'call_record_incoming_external_enabled',
+        'call_record_incoming_internal_enabled',
+    )
+
     def __init__(
         self, agi, cursor: DictCursor, xid=None, exten=None, context=None, agent_id=None
     ):
@@ -375,16 +435,25 @@ class User:
         self.cursor = cursor
 
         if xid:
-            user_row = user_dao.get(xid)
+            user_row = self._get_cached(('id', str(xid)), user_dao.get, xid)
         elif exten and context:
-            user_row = user_dao.get_user_by_number_context(exten, context)
+            user_row = self._get_cached(
+                ('exten', exten, context),
+                user_dao.get_user_by_number_context,
+                exten,
+                context,
+            )
         elif agent_id:
-            user_row = user_dao.get_user_by_agent_id(agent_id)
+            user_row = self._get_cached(
+                ('agent_id', str(agent_id)), user_dao.get_user_by_agent_id, agent_id
+            )
         else:
             raise LookupError(
                 '"id", "exten@context" or "agent_id" must be provided to look up an user entry'
             )
 
+        features = self._get_features(cursor, user_row.id)
+
         self.id = user_row.id
         self.uuid = user_row.uuid
         self.tenant_uuid = user_row.tenant_uuid
@@ -398,34 +467,34 @@ class User:
         self.outcallerid = user_row.outcallerid
         self.ringseconds = int(user_row.ringseconds)
         self.simultcalls = user_row.simultcalls
-        self.enablevoicemail = user_row.enablevoicemail
+        self.enablevoicemail = features['enablevoicemail']
         self.voicemailid = user_row.voicemailid
         self.enablexfer = user_row.enablexfer
         self.dtmf_hangup = user_row.dtmf_hangup
         self.enableonlinerec = user_row.enableonlinerec
-        self.incallfilter = user_row.incallfilter
-        self.enablednd = user_row.enablednd
-        self.enableunc = user_row.enableunc
-        self.destunc = user_row.destunc
-        self.enablerna = user_row.enablerna
-        self.destrna = user_row.destrna
-        self.enablebusy = user_row.enablebusy
-        self.destbusy = user_row.destbusy
+        self.incallfilter = features['incallfilter']
+        self.enablednd = features['enablednd']
+        self.enableunc = features['enableunc']
+        self.destunc = features['destunc']
+        self.enablerna = features['enablerna']
+        self.destrna = features['destrna']
+        self.enablebusy = features['enablebusy']
+        self.destbusy = features['destbusy']
         self.preprocess_subroutine = user_row.preprocess_subroutine
         self.bsfilter = user_row.bsfilter
         self.rightcallcode = user_row.rightcallcode
-        self.call_record_outgoing_external_enabled = (
-            user_row.call_record_outgoing_external_enabled
-        )
-        self.call_record_outgoing_internal_enabled = (
-            user_row.call_record_outgoing_internal_enabled
-        )
-        self.call_record_incoming_external_enabled = (
-            user_row.call_record_incoming_external_enabled
-        )
-        self.call_record_incoming_internal_enabled = (
-            user_row.call_record_incoming_internal_enabled
-        )
+        self.call_record_outgoing_external_enabled = features[
+            'call_record_outgoing_external_enabled'
+        ]
+        self.call_record_outgoing_internal_enabled = features[
+            'call_record_outgoing_internal_enabled'
+        ]
+        self.call_record_incoming_external_enabled = features[
+            'call_record_incoming_external_enabled'
+        ]
+        self.call_record_incoming_internal_enabled = features[
+            'call_record_incoming_internal_enabled'
+        ]
         self.call_record_enabled = all(
             (
                 self.call_record_outgoing_external_enabled,
@@ -454,6 +523,24 @@ class User:
         if not self.vmbox:
             self.enablevoicemail = 0
 
+    @classmethod
+    def _get_cached(cls, key: Hashable, find, *args) -> SimpleNamespace:
+        def load() -> SimpleNamespace:
+            row = find(*args)
+            return SimpleNamespace(**{c: getattr(row, c) for c in cls._columns})
+
+        return _user_cache.get(key, load)
+
+    @classmethod
+    def _get_features(cls, cursor: DictCursor, user_id: int) -> dict[str, Any]:
+        query = SQL("SELECT {columns} FROM userfeatures WHERE id = %s").format(
+            columns=join_column_names(cls._feature_columns)
+        )
+        features = fetch_one(cursor, query, (user_id,))
+        if not features:
+            raise LookupError(f"Unable to find user (id: {user_id})")
+        return features
+
     def toggle_feature(self, feature):
         if feature == 'enablevoicemail':
             enabled = int(not self.enablevoicemail)
@@ -528,11 +615,12 @@ class Queue:
             "AND queue.commented = 0 "
             "AND queue.category = 'queue'"
         )
-        cursor.execute(
-            query.format(columns=join_column_names(columns)),
-            (queue_id,),
+        res = _queue_cache.get(
+            queue_id,
+            lambda: fetch_one(
+                cursor, query.format(columns=join_column_names(columns)), (queue_id,)
+            ),
         )
-        res: DictRow = cursor.fetchone()
         if not res:
             raise LookupError(f"Unable to find queue (id: {queue_id})")
 
@@ -663,18 +751,19 @@ class DialAction:
         agi, event, category, action, actionarg1, actionarg2, isda=True
     ):
         xtype = f"{category}_{event}".upper()
-        agi.set_variable(f"WAZO_FWD_{xtype}_ACTION", action)
-
-        # Sometimes, it's useful to know whether these variables were
-        # set manually, or by this object.
-        if isda:
-            agi.set_variable(f"WAZO_FWD_{xtype}_ISDA", "1")
-
         action_arg_1 = actionarg1.replace('|', ';') if actionarg1 else ""
         action_arg_2 = actionarg2 or ""
 
-        agi.set_variable(f"WAZO_FWD_{xtype}_ACTIONARG1", action_arg_1)
-        agi.set_variable(f"WAZO_FWD_{xtype}_ACTIONARG2", action_arg_2)
+        with agi.batch():
+            agi.set_variable(f"WAZO_FWD_{xtype}_ACTION", action)
+
+            # Sometimes, it's useful to know whether these variables were
+            # set manually, or by this object.
+            if isda:
+                agi.set_variable(f"WAZO_FWD_{xtype}_ISDA", "1")
+
+            agi.set_variable(f"WAZO_FWD_{xtype}_ACTIONARG1", action_arg_1)
+            agi.set_variable(f"WAZO_FWD_{xtype}_ACTIONARG2", action_arg_2)
 
     def __init__(self, agi, cursor: DictCursor, event, category, categoryval):
         self.agi = agi
@@ -682,14 +771,18 @@ class DialAction:
         self.event = event
         self.category = category
 
-        cursor.execute(
-            "SELECT action, actionarg1, actionarg2 FROM dialaction "
-            "WHERE event = %s "
-            "AND category = %s "
-            "AND categoryval::INTEGER = %s ",
-            (event, category, categoryval),
+        res = _dialaction_cache.get(
+            (event, category, str(categoryval)),
+            lambda: fetch_one(
+                cursor,
+                "SELECT action, actionarg1, actionarg2 FROM dialaction "
+                "WHERE event = %s "
+                "AND category = %s "
+                "AND categoryval::INTEGER = %s ",
+                (event, category, categoryval),
+            ),
+            cache_none=True,
         )
-        res: DictRow = cursor.fetchone()
         if not res:
             self.action = "none"
             self.actionarg1 = None
@@ -729,11 +822,12 @@ class Tenant:
             'country',
         ]
         query = SQL('SELECT {columns} FROM tenant WHERE uuid = %s')
-        cursor.execute(
-            query.format(columns=join_column_names(columns)),
-            (tenant_uuid,),
+        res = _tenant_cache.get(
+            tenant_uuid,
+            lambda: fetch_one(
+                cursor, query.format(columns=join_column_names(columns)), (tenant_uuid,)
+            ),
         )
-        res = cursor.fetchone()
         if not res:
             raise LookupError(f'Unable to find tenant (uuid: {tenant_uuid})')
 
@@ -753,11 +847,12 @@ class Trunk:
         query = SQL(
             "SELECT {columns} FROM trunkfeatures WHERE id = %s",
         )
-        cursor.execute(
-            query.format(columns=join_column_names(columns)),
-            (xid,),
+        res = _trunk_cache.get(
+            xid,
+            lambda: self._fetch_with_interface(
+                cursor, query.format(columns=join_column_names(columns)), xid
+            ),
         )
-        res: DictRow = cursor.fetchone()
         self.agi.verbose(f'res {res}')
 
         if not res:
@@ -765,20 +860,33 @@ class Trunk:
 
         self.id = xid
         self.outgoing_caller_id_format = res['outgoing_caller_id_format']
+        if res['interface'] is None:
+            raise ValueError(f"Unknown protocol for trunk {xid}")
+        self.interface = res['interface']
+        self.intfsuffix = res['intfsuffix']
+
+    @staticmethod
+    def _fetch_with_interface(
+        cursor: DictCursor, query: Composable, xid
+    ) -> dict[str, Any] | None:
+        res = fetch_one(cursor, query, (xid,))
+        if not res:
+            return None
+
+        res['interface'] = res['intfsuffix'] = None
         if res['endpoint_sip_uuid']:
-            (self.interface, self.intfsuffix) = ChanSIP.get_intf_and_suffix(
+            (res['interface'], res['intfsuffix']) = ChanSIP.get_intf_and_suffix(
                 cursor, res['endpoint_sip_uuid']
             )
         elif res['endpoint_iax_id']:
-            (self.interface, self.intfsuffix) = ChanIAX2.get_intf_and_suffix(
+            (res['interface'], res['intfsuffix']) = ChanIAX2.get_intf_and_suffix(
                 cursor, res['endpoint_iax_id']
             )
         elif res['endpoint_custom_id']:
-            (self.interface, self.intfsuffix) = ChanCustom.get_intf_and_suffix(
+            (res['interface'], res['intfsuffix']) = ChanCustom.get_intf_and_suffix(
                 cursor, res['endpoint_custom_id']
             )
-        else:
-            raise ValueError(f"Unknown protocol for trunk {xid}")
+        return res
 
 
 class DID:
@@ -804,11 +912,12 @@ class DID:
             "WHERE incall.id = %s "
             "AND incall.commented = 0 AND extensions.commented = 0"
         )
-        cursor.execute(
-            query.format(columns=join_column_names(columns)),
-            (incall_id,),
+        res = _did_cache.get(
+            incall_id,
+            lambda: fetch_one(
+                cursor, query.format(columns=join_column_names(columns)), (incall_id,)
+            ),
         )
-        res: DictRow = cursor.fetchone()
 
         if not res:
             raise LookupError(f"Unable to find DID entry (id: {incall_id})")
@@ -909,6 +1018,13 @@ class Outcall:
 class ScheduleDataMapper:
     @classmethod
     def get_from_path(cls, cursor: DictCursor, path, path_id):
+        # cached schedules keep their current state until its next transition
+        return _schedule_cache.get(
+            (path, str(path_id)), lambda: cls._load_from_path(cursor, path, path_id)
+        )
+
+    @classmethod
+    def _load_from_path(cls, cursor: DictCursor, path, path_id):
         # fetch schedule info
         columns = (
             'id',
@@ -935,9 +1051,7 @@ class ScheduleDataMapper:
         schedule_id = res['id']
         timezone = res['timezone']
         if not timezone:
-            cursor.execute("SELECT timezone FROM infos")
-            infos = cursor.fetchone()
-            timezone = infos['timezone']
+            timezone = timezones.get_default_timezone_name(cursor)
 
         default_action = ScheduleAction(
             res['fallback_action'], res['fallback_actionid'], res['fallback_actionargs']
@@ -1002,9 +1116,12 @@ class Context:
             "AND (contextinclude.include IS NULL OR contextinc.name IS NOT NULL) "
             "ORDER BY contextinclude.priority ASC",
         )
-        cursor.execute(query.format(columns=join_column_names(columns)), (context,))
-
-        res: list[DictRow] = cursor.fetchall()
+        res = _context_cache.get(
+            context,
+            lambda: self._fetch_all(
+                cursor, query.format(columns=join_column_names(columns)), context
+            ),
+        )
         if not res:
             raise LookupError(f"Unable to find context entry (name: {context})")
 
@@ -1016,6 +1133,11 @@ class Context:
             if row['include']:
                 self.include.append(row['include'])
 
+    @staticmethod
+    def _fetch_all(cursor: DictCursor, query: Composable, context) -> list[dict]:
+        cursor.execute(query, (context,))
+        return [dict(row) for row in cursor.fetchall()]
+
 
 CALLERID_MATCHER = re.compile(
     r'^(?:"(.+)"|([a-zA-Z0-9\-\.\!%\*_\+`\'\~]+)) ?(?:<(\+?[0-9\*#]+)>)?$'
@@ -1105,14 +1227,18 @@ class CallerID:
         self.type = xtype
         self.typeval = typeval
 
-        cursor.execute(
-            "SELECT mode, callerdisplay FROM callerid "
-            "WHERE type = %s "
-            "AND typeval = %s "
-            "AND mode IS NOT NULL",
-            (xtype, typeval),
+        res = _callerid_cache.get(
+            (xtype, str(typeval)),
+            lambda: fetch_one(
+                cursor,
+                "SELECT mode, callerdisplay FROM callerid "
+                "WHERE type = %s "
+                "AND typeval = %s "
+                "AND mode IS NOT NULL",
+                (xtype, typeval),
+            ),
+            cache_none=True,
         )
-        res: DictRow = cursor.fetchone()
 
         self.mode = None
         self.calleridname = None
@@ -1173,12 +1299,13 @@ class CallerID:
             else:
                 raise RuntimeError(f"Unknown callerid mode: {self.mode!r}")
 
-            self.agi.set_variable('CALLERID(name-pres)', 'allowed')
-            self.agi.set_variable('CALLERID(num-pres)', 'allowed')
-            self.agi.set_variable('CALLERID(all)', f'"{name}" <{calleridnum}>')
+            with self.agi.batch():
+                self.agi.set_variable('CALLERID(name-pres)', 'allowed')
+                self.agi.set_variable('CALLERID(num-pres)', 'allowed')
+                self.agi.set_variable('CALLERID(all)', f'"{name}" <{calleridnum}>')
 
-            if not force_rewrite:
-                self.agi.set_variable(dv.CID_REWRITTEN, 1)
+                if not force_rewrite:
+                    self.agi.set_variable(dv.CID_REWRITTEN, 1)
 
 
 class ChanSIP:
@@ -0,0 +1,45 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Cache of the outgoing caller IDs of the users, fetched from wazo-confd.
+
+The caller IDs of a user are fetched when the user is called and cached for
+ttl seconds.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from wazo_agid.cache import EntityCache
+
+DEFAULT_TTL = 300.0
+DEFAULT_MAX_ENTRIES = 10000
+
+# disabled until configure() is called by the server
+_cache = EntityCache('outgoing_callerids', ttl=0)
+
+
+def configure(ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+    _cache.ttl = ttl
+    _cache.max_entries = max_entries
+    _cache.clear()
+
+
+def stats() -> dict[str, int]:
+    return _cache.stats()
+
+
+def clear() -> None:
+    _cache.clear()
+
+
+def _fetch(confd_client: Any, user_uuid: str) -> list[dict[str, Any]]:
+    response = confd_client.users.relations(user_uuid).list_outgoing_callerids()
+    return response['items']
+
+
+def get(confd_client: Any, user_uuid: str) -> list[dict[str, Any]]:
+    """Return the outgoing caller IDs of the user, through the cache"""
+    return _cache.get(user_uuid, lambda: _fetch(confd_client, user_uuid))
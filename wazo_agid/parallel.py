@@ -0,0 +1,89 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Run independent blocking calls, like REST client calls, concurrently.
+
+The calls run in a pool of threads shared by all requests. The time a request
+waits for them is measured as HTTP time, they are not traced one by one.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures import wait
+from typing import Any, Callable
+
+import requests
+
+from wazo_agid import metrics
+
+DEFAULT_MAX_WORKERS = 16
+# Same as the default timeout of the REST clients
+DEFAULT_TIMEOUT = 10.0
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+class DeadlineExceeded(requests.Timeout):
+    pass
+
+
+class Outcome:
+    """Result of a call started with start() or run()"""
+
+    __slots__ = ('_future', '_deadline')
+
+    def __init__(self, future: Future, deadline: float | None) -> None:
+        self._future = future
+        self._deadline = deadline
+
+    def result(self) -> Any:
+        """
+        Return the value of the call or raise its exception.
+
+        DeadlineExceeded is raised if the call does not finish before the
+        deadline given when it was started.
+        """
+        if not self._future.done():
+            timeout = None
+            if self._deadline is not None:
+                timeout = max(0.0, self._deadline - time.monotonic())
+            with metrics.timed('http', 'parallel'):
+                try:
+                    return self._future.result(timeout)
+                except FutureTimeoutError:
+                    self._future.cancel()
+                    raise DeadlineExceeded('call did not finish before its deadline')
+        return self._future.result()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    # created on first use, after the pre-fork workers are started
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                DEFAULT_MAX_WORKERS, thread_name_prefix='parallel'
+            )
+        return _executor
+
+
+def start(call: Callable[[], Any], timeout: float | None = DEFAULT_TIMEOUT) -> Outcome:
+    """Start `call` in the background, its result is available for `timeout` seconds"""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    return Outcome(_get_executor().submit(call), deadline)
+
+
+def run(
+    *calls: Callable[[], Any], timeout: float | None = DEFAULT_TIMEOUT
+) -> list[Outcome]:
+    """Call `calls` concurrently and wait for them at most `timeout` seconds in total"""
+    outcomes = [start(call, timeout) for call in calls]
+    with metrics.timed('http', 'parallel'):
+        wait([outcome._future for outcome in outcomes], timeout)
+    return outcomes
@@ -0,0 +1,197 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 10
+# Requests fail fast when no connection is free instead of waiting
+DEFAULT_WAIT_TIMEOUT = 0.5
+DEFAULT_MAX_LIFETIME = 3600.0
+HEALTH_CHECK_INTERVAL = 30.0
+
+
+class ConnectionPoolTimeout(psycopg2.OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of PostgreSQL connections.
+
+    At most `size` connections are opened. When they are all in use, callers
+    wait up to `wait_timeout` seconds for one to be released. Connections
+    older than `max_lifetime` seconds are closed instead of being reused, and
+    connections idle for more than HEALTH_CHECK_INTERVAL seconds are checked
+    before being handed out.
+    """
+
+    def __init__(
+        self,
+        connection_info: dict[str, Any],
+        size: int = DEFAULT_POOL_SIZE,
+        wait_timeout: float = DEFAULT_WAIT_TIMEOUT,
+        max_lifetime: float = DEFAULT_MAX_LIFETIME,
+        connect: Callable[..., connection] = psycopg2.connect,
+    ) -> None:
+        self.connection_info = connection_info
+        self.size = size
+        self.wait_timeout = wait_timeout
+        self.max_lifetime = max_lifetime
+        self._connect = connect
+
+        self._condition = threading.Condition()
+        # idle connections, the most recently used last
+        self._idle: list[connection] = []
+        self._opened_at: dict[connection, float] = {}
+        self._released_at: dict[connection, float] = {}
+        self._opening = 0
+
+        self.waits = 0
+        self.wait_time = 0.0
+        self.wait_timeouts = 0
+        self.connections_opened = 0
+        self.connections_discarded = 0
+
+    def getconn(self) -> connection:
+        waiting_since = None
+        while True:
+            with self._condition:
+                while not self._idle and self._count() >= self.size:
+                    now = time.monotonic()
+                    if waiting_since is None:
+                        waiting_since = now
+                        self.waits += 1
+                    remaining = waiting_since + self.wait_timeout - now
+                    if remaining <= 0:
+                        self.wait_timeouts += 1
+                        self.wait_time += now - waiting_since
+                        logger.warning(
+                            'no database connection available after %.1fs (pool size: %d)',
+                            self.wait_timeout,
+                            self.size,
+                        )
+                        raise ConnectionPoolTimeout(
+                            f'No database connection available after {self.wait_timeout}s'
+                        )
+                    self._condition.wait(remaining)
+
+                if self._idle:
+                    conn = self._idle.pop()
+                else:
+                    conn = None
+                    self._opening += 1
+
+            if conn is None:
+                conn = self._open()
+                break
+            if self._is_usable(conn):
+                break
+            self._discard(conn)
+
+        if waiting_since is not None:
+            self.wait_time += time.monotonic() - waiting_since
+        return conn
+
+    def putconn(self, conn: connection) -> None:
+        if not self._reset(conn):
+            self._discard(conn)
+            return
+
+        with self._condition:
+            self._released_at[conn] = time.monotonic()
+            self._idle.append(conn)
+            self._condition.notify()
+
+    def closeall(self) -> None:
+        with self._condition:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self) -> dict[str, int | float]:
+        with self._condition:
+            opened = self._count()
+            idle = len(self._idle)
+        return {
+            'size': self.size,
+            'opened': opened,
+            'idle': idle,
+            'in_use': opened - idle,
+            'waits': self.waits,
+            'wait_time': self.wait_time,
+            'wait_timeouts': self.wait_timeouts,
+            'connections_opened': self.connections_opened,
+            'connections_discarded': self.connections_discarded,
+        }
+
+    def _count(self) -> int:
+        return len(self._opened_at) + self._opening
+
+    def _open(self) -> connection:
+        try:
+            conn = self._connect(**self.connection_info)
+        except Exception:
+            with self._condition:
+                self._opening -= 1
+                self._condition.notify()
+            raise
+
+        now = time.monotonic()
+        with self._condition:
+            self._opening -= 1
+            self._opened_at[conn] = now
+            self._released_at[conn] = now
+            self.connections_opened += 1
+        return conn
+
+    def _discard(self, conn: connection) -> None:
+        try:
+            conn.close()
+        except Exception:
+            logger.debug('error while closing database connection', exc_info=True)
+
+        with self._condition:
+            if self._opened_at.pop(conn, None) is not None:
+                self.connections_discarded += 1
+            self._released_at.pop(conn, None)
+            self._condition.notify()
+
+    def _is_expired(self, conn: connection) -> bool:
+        return time.monotonic() - self._opened_at[conn] > self.max_lifetime
+
+    def _is_usable(self, conn: connection) -> bool:
+        if conn.closed or self._is_expired(conn):
+            return False
+
+        if time.monotonic() - self._released_at[conn] < HEALTH_CHECK_INTERVAL:
+            return True
+
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            conn.rollback()
+        except psycopg2.Error:
+            logger.info('discarding broken database connection')
+            return False
+        return True
+
+    def _reset(self, conn: connection) -> bool:
+        if conn.closed or conn not in self._opened_at or self._is_expired(conn):
+            return False
+
+        if conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                return False
+        return True
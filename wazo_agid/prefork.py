@@ -0,0 +1,155 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Pre-fork mode: several wazo-agid processes accepting from one socket.
+
+The parent process binds the listening socket and forks the workers, which
+inherit it. Each worker opens its own database connections and REST clients.
+The parent only supervises the workers: it restarts the ones that die and
+forwards SIGHUP, SIGUSR1 and SIGTERM to all of them. A worker receiving
+SIGHUP or SIGUSR1 before it installs its own handlers keeps them until it
+calls worker_ready().
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import signal
+import socket
+import time
+from types import FrameType
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+LISTEN_BACKLOG = 128
+# Minimum delay between two starts of the same worker
+RESTART_DELAY = 1.0
+FORWARDED_SIGNALS = (signal.SIGHUP, signal.SIGUSR1)
+STOP_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+WorkerFunction = Callable[[int], None]
+
+# forwarded signals received by the worker before worker_ready()
+_deferred_signals: list[int] = []
+
+
+def listen(address: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((address, port))
+    sock.listen(LISTEN_BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _defer_signal(signum: int, frame: FrameType | None) -> None:
+    _deferred_signals.append(signum)
+
+
+def worker_ready() -> None:
+    """
+    Raise again the signals received by the worker before it installed its
+    handlers. The signals it does not handle are ignored from now on.
+    """
+    for signum in FORWARDED_SIGNALS:
+        if signal.getsignal(signum) is _defer_signal:
+            signal.signal(signum, signal.SIG_IGN)
+    deferred, _deferred_signals[:] = set(_deferred_signals), []
+    for deferred_signum in sorted(deferred):
+        if signal.getsignal(deferred_signum) is not signal.SIG_IGN:
+            signal.raise_signal(deferred_signum)
+
+
+class Supervisor:
+    """Fork `processes` workers calling `target` with their index and keep them running"""
+
+    def __init__(self, processes: int, target: WorkerFunction) -> None:
+        self.processes = processes
+        self.target = target
+        self._workers: dict[int, int] = {}  # pid -> index
+        self._started_at: dict[int, float] = {}  # index -> start time
+        self._running = False
+
+    def run(self) -> None:
+        self._running = True
+        for signum in FORWARDED_SIGNALS:
+            signal.signal(signum, self._forward)
+        for signum in STOP_SIGNALS:
+            signal.signal(signum, self._stop)
+
+        for index in range(self.processes):
+            self._spawn(index)
+
+        while self._workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            if pid not in self._workers:
+                continue
+            index = self._workers.pop(pid)
+            if not self._running:
+                continue
+
+            logger.error(
+                'worker %d (pid %d) exited with status %d, restarting it',
+                index,
+                pid,
+                os.waitstatus_to_exitcode(status),
+            )
+            delay = self._started_at[index] + RESTART_DELAY - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            if self._running:
+                self._spawn(index)
+
+        logger.info('all workers stopped')
+
+    def _spawn(self, index: int) -> None:
+        self._started_at[index] = time.monotonic()
+        # the worker must not run the handlers of the supervisor
+        signals = set(FORWARDED_SIGNALS + STOP_SIGNALS)
+        signal.pthread_sigmask(signal.SIG_BLOCK, signals)
+        pid = os.fork()
+        if pid:
+            # registered before a signal can be forwarded
+            self._workers[pid] = index
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, signals)
+            logger.info('started worker %d (pid %d)', index, pid)
+            return
+
+        # kept until the worker handles them, instead of killing it
+        for signum in FORWARDED_SIGNALS:
+            signal.signal(signum, _defer_signal)
+        for signum in STOP_SIGNALS:
+            signal.signal(signum, signal.SIG_DFL)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, signals)
+        exit_code = 0
+        try:
+            self.target(index)
+        except BaseException:
+            logger.exception('worker %d failed', index)
+            exit_code = 1
+        finally:
+            logging.shutdown()
+            os._exit(exit_code)
+
+    def _forward(self, signum: int, frame: FrameType | None) -> None:
+        logger.debug('forwarding signal %d to the workers', signum)
+        for pid in list(self._workers):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def _stop(self, signum: int, frame: FrameType | None) -> None:
+        logger.info('stopping the workers')
+        self._running = False
+        for pid in list(self._workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
@@ -0,0 +1,150 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Sampling profiler of the threads handling AGI requests.
+
+Sending SIGUSR1 to wazo-agid starts the profiler for a few seconds, sending it
+again stops it early. The stacks are written in the collapsed format read by
+flamegraph.pl and speedscope, each stack starting with the name of the handler
+that was running.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from types import CodeType, FrameType
+from typing import Any, Callable
+
+from wazo_agid import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DURATION = 30.0
+DEFAULT_INTERVAL = 0.01
+MAX_DEPTH = 128
+
+
+class SamplingProfiler:
+    def __init__(
+        self,
+        interval: float = DEFAULT_INTERVAL,
+        active_handlers: Callable[[], dict[int, str]] | None = None,
+    ) -> None:
+        self.interval = interval
+        self._active_handlers = active_handlers or metrics.registry.active_handlers
+        self._code_names: dict[CodeType, str] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.samples: Counter[str] = Counter()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration: float, output_file: str) -> None:
+        self._stop.clear()
+        self.samples.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(duration, output_file),
+            name='agid-profiler',
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def sample(self) -> None:
+        handlers = self._active_handlers()
+        if not handlers:
+            return
+
+        frames = sys._current_frames()
+        for ident, handler in handlers.items():
+            frame = frames.get(ident)
+            if frame is not None:
+                self.samples[f'{handler};{self._collapse(frame)}'] += 1
+
+    def dump(self, output_file: str) -> None:
+        # the output directory may be shared with other users: never follow
+        # nor truncate a file created beforehand
+        fd = os.open(output_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f'{stack} {count}\n')
+
+    def _run(self, duration: float, output_file: str) -> None:
+        logger.info('profiling AGI handlers for %.0f seconds', duration)
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline and not self._stop.wait(self.interval):
+            self.sample()
+
+        try:
+            self.dump(output_file)
+        except OSError as e:
+            logger.error('could not write the profile to %s: %s', output_file, e)
+            return
+        logger.info(
+            'profile of %d samples written to %s',
+            sum(self.samples.values()),
+            output_file,
+        )
+
+    def _collapse(self, frame: FrameType | None) -> str:
+        names: list[str] = []
+        while frame is not None and len(names) < MAX_DEPTH:
+            names.append(self._code_name(frame))
+            frame = frame.f_back
+        names.reverse()
+        return ';'.join(names)
+
+    def _code_name(self, frame: FrameType) -> str:
+        code = frame.f_code
+        name = self._code_names.get(code)
+        if name is None:
+            module = frame.f_globals.get('__name__', '?')
+            name = self._code_names[code] = f'{module}:{code.co_name}'
+        return name
+
+
+_profiler = SamplingProfiler()
+_settings: dict[str, Any] = {
+    'duration': DEFAULT_DURATION,
+    'output_dir': tempfile.gettempdir(),
+}
+
+
+def toggle() -> None:
+    """Start the profiler, or stop it if it is running"""
+    if _profiler.running:
+        logger.info('stopping the profiler')
+        _profiler.stop()
+        return
+
+    filename = time.strftime('wazo-agid-%Y%m%d-%H%M%S', time.localtime())
+    output_file = os.path.join(
+        _settings['output_dir'], f'{filename}-{os.getpid()}.collapsed'
+    )
+    _profiler.start(_settings['duration'], output_file)
+
+
+def sigusr1_handle(signum: int, frame: FrameType | None) -> None:
+    toggle()
+
+
+def setup(config: dict[str, Any]) -> None:
+    _settings.update(
+        duration=float(config.get('duration', DEFAULT_DURATION)),
+        output_dir=config.get('output_dir') or tempfile.gettempdir(),
+    )
+    _profiler.interval = float(config.get('interval', DEFAULT_INTERVAL))
+    signal.signal(signal.SIGUSR1, sigusr1_handle)
@@ -0,0 +1,250 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Cache of the reverse lookups of caller numbers in wazo-dird.
+
+Found and not found results are cached for different durations. Concurrent
+lookups of the same number wait for the first one instead of querying
+wazo-dird again. When wazo-dird fails, the expired result of the number is
+used if there is one, and the number is not looked up again for error_ttl
+seconds.
+
+In deferred mode, lookups run in a pool of threads and requests only wait for
+them for wait_budget seconds. A lookup finishing later is still cached, so the
+next call from the same number, or the next reverse lookup of this call, finds
+it.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 300.0
+DEFAULT_NEGATIVE_TTL = 60.0
+DEFAULT_ERROR_TTL = 10.0
+DEFAULT_MAX_ENTRIES = 10000
+# Time a lookup waits for the same lookup made by another request
+DEFAULT_WAIT_TIMEOUT = 2.0
+# Time a request waits for a deferred lookup
+DEFAULT_WAIT_BUDGET = 0.2
+DEFAULT_LOOKUP_WORKERS = 4
+
+NUMBER_SEPARATORS = str.maketrans('', '', ' -.()/')
+
+LookupResult = Optional[dict[str, Any]]
+Key = tuple[str, str, str, str]
+
+
+def normalize_number(number: str) -> str:
+    return number.strip().translate(NUMBER_SEPARATORS)
+
+
+def is_found(result: LookupResult) -> bool:
+    return result is not None and result.get('display') is not None
+
+
+class ReverseLookupCache:
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL,
+        negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+        error_ttl: float = DEFAULT_ERROR_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        wait_timeout: float = DEFAULT_WAIT_TIMEOUT,
+        executor: Executor | None = None,
+        wait_budget: float = DEFAULT_WAIT_BUDGET,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.error_ttl = error_ttl
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+        self.executor = executor
+        self.wait_budget = wait_budget
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (expiration time, result), the most recently used last
+        self._entries: OrderedDict[Key, tuple[float, LookupResult]] = OrderedDict()
+        self._pending: dict[Key, Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.errors = 0
+        self.evictions = 0
+        self.late = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, key: Key, lookup: Callable[[], LookupResult]) -> LookupResult:
+        """
+        Return the result cached for `key`, calling `lookup` to get it on a miss.
+
+        When `lookup` fails, the expired result of the key is returned if there
+        is one, otherwise the exception is raised. With an executor, `lookup`
+        runs in the executor and the expired result, or None, is returned if it
+        does not finish in `wait_budget` seconds.
+        """
+        if not self.enabled:
+            return lookup()
+
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            pending = self._pending.get(key)
+            if pending is None:
+                self.misses += 1
+                pending = self._pending[key] = Future()
+                leader = True
+            else:
+                self.waits += 1
+                leader = False
+
+        if leader:
+            if self.executor is None:
+                return self._resolve(key, lookup, entry, pending)
+            self.executor.submit(
+                self._resolve_in_background, key, lookup, entry, pending
+            )
+
+        timeout = self.wait_timeout if self.executor is None else self.wait_budget
+        try:
+            return pending.result(timeout=timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                self.late += 1
+            logger.info('reverse lookup of %s is still pending', key[3])
+            return entry[1] if entry else None
+
+    def _resolve(
+        self,
+        key: Key,
+        lookup: Callable[[], LookupResult],
+        entry: tuple[float, LookupResult] | None,
+        pending: Future,
+    ) -> LookupResult:
+        try:
+            result = lookup()
+        except Exception as e:
+            stale = entry[1] if entry else None
+            with self._lock:
+                self.errors += 1
+                self._store(key, self.error_ttl, stale)
+                del self._pending[key]
+            pending.set_result(stale)
+            if entry is None:
+                raise
+            logger.info('reverse lookup failed, using the expired result: %s', e)
+            return stale
+
+        ttl = self.ttl if is_found(result) else self.negative_ttl
+        with self._lock:
+            self._store(key, ttl, result)
+            del self._pending[key]
+        pending.set_result(result)
+        return result
+
+    def _resolve_in_background(self, *args: Any) -> None:
+        try:
+            self._resolve(*args)
+        except Exception as e:
+            logger.info('Reverse lookup failed: %s', e)
+
+    def _store(self, key: Key, ttl: float, result: LookupResult) -> None:
+        if ttl <= 0:
+            self._entries.pop(key, None)
+            return
+        self._entries[key] = (self._clock() + ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            'entries': entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'waits': self.waits,
+            'errors': self.errors,
+            'evictions': self.evictions,
+            'late': self.late,
+        }
+
+
+# disabled until configure() is called by the server
+_cache = ReverseLookupCache(ttl=0)
+
+
+def configure(
+    ttl: float = DEFAULT_TTL,
+    negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+    error_ttl: float = DEFAULT_ERROR_TTL,
+    max_entries: int = DEFAULT_MAX_ENTRIES,
+    deferred: bool = False,
+    wait_budget: float = DEFAULT_WAIT_BUDGET,
+    lookup_workers: int = DEFAULT_LOOKUP_WORKERS,
+) -> None:
+    global _cache
+    if _cache.executor:
+        _cache.executor.shutdown(wait=False)
+    executor = None
+    if deferred:
+        if ttl <= 0:
+            logger.warning('deferred reverse lookups require the cache, ignored')
+        else:
+            executor = ThreadPoolExecutor(
+                lookup_workers, thread_name_prefix='reverse-lookup'
+            )
+    _cache = ReverseLookupCache(
+        ttl,
+        negative_ttl,
+        error_ttl,
+        max_entries,
+        executor=executor,
+        wait_budget=wait_budget,
+    )
+
+
+def stats() -> dict[str, int]:
+    return _cache.stats()
+
+
+def clear() -> None:
+    _cache.clear()
+
+
+def reverse(
+    dird_client: Any, profile: str, user_uuid: str, exten: str, tenant_uuid: str
+) -> LookupResult:
+    """Look up `exten` in the directories of the profile, through the cache"""
+
+    def lookup() -> LookupResult:
+        return dird_client.directories.reverse(
+            profile=profile, user_uuid=user_uuid, exten=exten, tenant_uuid=tenant_uuid
+        )
+
+    key = (tenant_uuid, user_uuid, profile, normalize_number(exten))
+    return _cache.get(key, lookup)
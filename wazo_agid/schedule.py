@@ -1,12 +1,15 @@
-# Copyright 2010-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2010-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import datetime
 import re
 
-import pytz
-
 from wazo_agid import dialplan_variables as dv
+from wazo_agid import timezones
+
+# How far ahead the next state transition of a schedule is searched
+TRANSITION_HORIZON = datetime.timedelta(days=1)
+ONE_MINUTE = datetime.timedelta(minutes=1)
 
 
 class Schedule:
@@ -15,6 +18,8 @@ class Schedule:
         self._closed_periods = closed_periods
         self._default_action = default_action
         self._timezone_name = timezone_name
+        # (state, UTC datetime until which the state is valid)
+        self._current = None
 
     def compute_state(self, current_datetime):
         for closed_period in self._closed_periods:
@@ -26,13 +31,72 @@ class Schedule:
         return ScheduleState.new_closed_state(self._default_action)
 
     def compute_state_for_now(self):
-        current_datetime = self._get_current_localized_time()
-        return self.compute_state(current_datetime)
-
-    def _get_current_localized_time(self):
-        timezone = pytz.timezone(self._timezone_name)
-        utc_now = pytz.utc.localize(datetime.datetime.utcnow())
-        return utc_now.astimezone(timezone)
+        """
+        Return the current state, computed again only when the next
+        transition computed by compute_state_until() is reached.
+        """
+        utc_now = datetime.datetime.now(datetime.timezone.utc)
+        current = self._current
+        if current is None or utc_now >= current[1]:
+            current = self._current = self.compute_state_until(utc_now)
+        return current[0]
+
+    def compute_state_until(self, utc_now):
+        """
+        Return the state at `utc_now` and the UTC datetime of the next
+        transition to another state, or of the end of the searched horizon.
+        """
+        timezone = timezones.get_timezone(self._timezone_name)
+        local_now = utc_now.astimezone(timezone)
+        state = self.compute_state(local_now)
+
+        offset = local_now.utcoffset()
+        end = utc_now + TRANSITION_HORIZON
+        if end.astimezone(timezone).utcoffset() != offset:
+            end = self._find_offset_change(timezone, utc_now, end, offset)
+
+        # the UTC offset is constant until `end`, local times are only shifted
+        local_now = local_now.replace(tzinfo=None)
+        local_end = end.replace(tzinfo=None) + offset
+        for boundary in self._local_boundaries(local_now, local_end):
+            if not state.is_same(self.compute_state(boundary)):
+                return state, (boundary - offset).replace(tzinfo=datetime.timezone.utc)
+        return state, end
+
+    def _local_boundaries(self, local_now, local_end):
+        # the state can only change when a day starts or an hours range
+        # starts or ends
+        times = {(0, 0)}
+        for period in self._opened_periods + self._closed_periods:
+            for start, end in period.hours_ranges():
+                times.add(start)
+                end_hour, end_minute = end
+                if (end_hour, end_minute) != (23, 59):
+                    times.add(divmod(end_hour * 60 + end_minute + 1, 60))
+
+        midnight = local_now.replace(hour=0, minute=0, second=0, microsecond=0)
+        boundaries = []
+        while midnight < local_end:
+            for hour, minute in times:
+                boundary = midnight.replace(hour=hour, minute=minute)
+                if local_now < boundary < local_end:
+                    boundaries.append(boundary)
+            midnight += datetime.timedelta(days=1)
+        return sorted(boundaries)
+
+    @staticmethod
+    def _find_offset_change(timezone, start, end, offset):
+        # first minute after `start` with a different UTC offset
+        low, high = 0, int((end - start) / ONE_MINUTE)
+        start = start.replace(second=0, microsecond=0)
+        while high - low > 1:
+            middle = (low + high) // 2
+            moment = start + middle * ONE_MINUTE
+            if moment.astimezone(timezone).utcoffset() == offset:
+                low = middle
+            else:
+                high = middle
+        return start + high * ONE_MINUTE
 
 
 class AlwaysOpenedSchedule:
@@ -56,6 +120,9 @@ class ScheduleState:
     def new_closed_state(cls, action):
         return cls('closed', action)
 
+    def is_same(self, other):
+        return self.state == other.state and self.action is other.action
+
 
 class ScheduleAction:
     def __init__(self, action, actionarg1, actionarg2):
@@ -113,6 +180,13 @@ class SchedulePeriod:
                 return False
         return True
 
+    def hours_ranges(self):
+        return [
+            (checker.start_time, checker.end_time)
+            for checker in self._checkers
+            if isinstance(checker, HoursChecker)
+        ]
+
 
 class SchedulePeriodBuilder:
     def __init__(self):
@@ -157,12 +231,12 @@ class SchedulePeriodBuilder:
 
 class HoursChecker:
     def __init__(self, start_hour, start_minute, end_hour, end_minute):
-        self._start_time = (start_hour, start_minute)
-        self._end_time = (end_hour, end_minute)
+        self.start_time = (start_hour, start_minute)
+        self.end_time = (end_hour, end_minute)
 
     def is_in(self, tested_datetime):
         tested_time = (tested_datetime.hour, tested_datetime.minute)
-        return self._start_time <= tested_time <= self._end_time
+        return self.start_time <= tested_time <= self.end_time
 
     _HOURS_VALUE_REGEX = re.compile(r'^(\d\d):([0-5]\d)-(\d\d):([0-5]\d)$')
 
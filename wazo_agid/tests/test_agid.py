@@ -1,12 +1,15 @@
-# Copyright 2013-2024 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2013-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from __future__ import annotations
 
+import signal
+from functools import partial
 from unittest import TestCase
-from unittest.mock import Mock
+from unittest.mock import MagicMock, Mock, patch
 
-from wazo_agid.agid import Handler
+from wazo_agid import agid
+from wazo_agid.agid import BaseAGID, Database, Handler
 
 
 class TestHandler(TestCase):
@@ -18,3 +21,33 @@ class TestHandler(TestCase):
         handler.setup(fake_cursor)
 
         setup_function.assert_called_once_with(fake_cursor)
+
+
+class TestSighup(TestCase):
+    def setUp(self):
+        self.database = Database('postgresql://localhost/asterisk', pool_size=1)
+        self.database.pool.wait_timeout = 0.01
+        connect = Mock(side_effect=lambda **kwargs: MagicMock())
+        self.database.pool._connect = connect
+        self.setup_function = Mock()
+        server = Mock(database=self.database, initialized=True)
+        server.setup = partial(BaseAGID.setup, server)
+        server_patcher = patch.object(agid, '_server', server)
+        server_patcher.start()
+        self.addCleanup(server_patcher.stop)
+        connect_patcher = patch.object(agid.psycopg2, 'connect', connect)
+        connect_patcher.start()
+        self.addCleanup(connect_patcher.stop)
+        handlers_patcher = patch.dict(
+            agid._handlers,
+            {'foo': Handler('foo', self.setup_function, Mock())},
+            clear=True,
+        )
+        handlers_patcher.start()
+        self.addCleanup(handlers_patcher.stop)
+
+    def test_reload_when_the_workers_hold_all_the_connections(self):
+        with self.database.connection():
+            agid.sighup_handle(signal.SIGHUP, None)
+
+        self.setup_function.assert_called_once()
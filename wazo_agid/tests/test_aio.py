@@ -0,0 +1,88 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from unittest import TestCase
+
+from hamcrest import assert_that, calling, contains_exactly, equal_to, raises
+
+from ..aio import AsyncFastAGIStream, read_agi_env
+from ..fastagi import FastAGI, FastAGISIGPIPEHangup
+
+
+class TestAsyncFastAGIStream(TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.server_lines: list[bytes] = []
+
+    def tearDown(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout=5)
+
+    def _connect(self, asterisk_output: bytes):
+        async def asterisk(reader, writer):
+            writer.write(asterisk_output)
+            await writer.drain()
+            while line := await reader.readline():
+                self.server_lines.append(line)
+            writer.close()
+
+        async def connect():
+            server = await asyncio.start_server(asterisk, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            return server, reader, writer
+
+        return self._run(connect())
+
+    def test_read_agi_env_stops_at_blank_line(self):
+        server, reader, writer = self._connect(
+            b'agi_network_script: foo\nagi_arg_1: bar\n\n200 result=1\n'
+        )
+
+        lines = self._run(read_agi_env(reader))
+
+        assert_that(
+            lines,
+            contains_exactly(b'agi_network_script: foo\n', b'agi_arg_1: bar\n', b'\n'),
+        )
+        writer.close()
+        server.close()
+
+    def test_fastagi_over_async_stream(self):
+        server, reader, writer = self._connect(
+            b'agi_network_script: foo\nagi_arg_1: bar\n\n200 result=1 (value)\n'
+        )
+        env_lines = self._run(read_agi_env(reader))
+        stream = AsyncFastAGIStream(self.loop, reader, writer, env_lines)
+
+        agi = FastAGI(stream, stream, {})
+        value = agi.get_variable('FOO')
+
+        assert_that(agi.env['agi_network_script'], equal_to('foo'))
+        assert_that(agi.args, contains_exactly('bar'))
+        assert_that(value, equal_to('value'))
+        self.loop.call_soon_threadsafe(writer.close)
+        self._run(asyncio.sleep(0.1))
+        assert_that(self.server_lines, contains_exactly(b'GET VARIABLE "FOO"\n'))
+        server.close()
+
+    def test_flush_on_closed_connection_is_a_hangup(self):
+        server, reader, writer = self._connect(b'\n')
+        env_lines = self._run(read_agi_env(reader))
+        stream = AsyncFastAGIStream(self.loop, reader, writer, env_lines)
+        agi = FastAGI(stream, stream, {})
+        self.loop.call_soon_threadsafe(writer.transport.abort)
+        self._run(asyncio.sleep(0.1))
+
+        assert_that(calling(agi.noop), raises(FastAGISIGPIPEHangup))
+        server.close()
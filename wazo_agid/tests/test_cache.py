@@ -0,0 +1,102 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import multiprocessing
+from unittest import TestCase
+from unittest.mock import Mock
+
+from hamcrest import assert_that, calling, equal_to, has_entries, raises
+
+from ..cache import EntityCache
+
+
+class TestEntityCache(TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.cache = EntityCache('user', ttl=10, max_entries=2, clock=lambda: self.now)
+
+    def test_value_is_loaded_once(self):
+        load = Mock(return_value='value')
+
+        self.cache.get('key', load)
+        value = self.cache.get('key', load)
+
+        assert_that(value, equal_to('value'))
+        load.assert_called_once_with()
+        assert_that(self.cache.stats(), has_entries(entries=1, hits=1, misses=1))
+
+    def test_value_expires(self):
+        self.cache.get('key', lambda: 'old')
+        self.now += 10
+
+        assert_that(self.cache.get('key', lambda: 'new'), equal_to('new'))
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.get('a', lambda: 'a')
+        self.cache.get('b', lambda: 'b')
+        self.cache.get('a', lambda: 'a')
+        self.cache.get('c', lambda: 'c')
+
+        assert_that(self.cache.get('a', lambda: 'reloaded'), equal_to('a'))
+        assert_that(self.cache.get('b', lambda: 'reloaded'), equal_to('reloaded'))
+        assert_that(self.cache.stats(), has_entries(evictions=2))
+
+    def test_errors_and_none_are_not_cached(self):
+        load = Mock(side_effect=LookupError)
+
+        assert_that(calling(self.cache.get).with_args('key', load), raises(LookupError))
+        self.cache.get('key', lambda: None)
+
+        assert_that(self.cache.get('key', lambda: 'value'), equal_to('value'))
+
+    def test_none_is_cached_when_asked(self):
+        self.cache.get('key', lambda: None, cache_none=True)
+
+        assert_that(
+            self.cache.get('key', lambda: 'value', cache_none=True), equal_to(None)
+        )
+
+    def test_ttl_of_the_value(self):
+        def ttl_for(value: bool) -> float:
+            return 10 if value else 2
+
+        self.cache.get('yes', lambda: True, ttl_for=ttl_for)
+        self.cache.get('no', lambda: False, ttl_for=ttl_for)
+        self.now += 2
+
+        assert_that(self.cache.get('yes', lambda: False), equal_to(True))
+        assert_that(self.cache.get('no', lambda: True), equal_to(True))
+
+    def test_disabled_when_ttl_is_zero(self):
+        self.cache.ttl = 0
+        load = Mock(return_value='value')
+
+        self.cache.get('key', load)
+        self.cache.get('key', load)
+
+        assert_that(load.call_count, equal_to(2))
+
+    def test_invalidate(self):
+        self.cache.get('key', lambda: 'old')
+        self.cache.invalidate('key')
+
+        assert_that(self.cache.get('key', lambda: 'new'), equal_to('new'))
+
+    def test_clear_is_shared_with_the_forked_processes(self):
+        self.cache.share()
+        self.cache.get('key', lambda: 'old')
+        child = multiprocessing.get_context('fork').Process(target=self.cache.clear)
+        child.start()
+        child.join(5)
+
+        assert_that(self.cache.get('key', lambda: 'new'), equal_to('new'))
+
+    def test_not_shared_by_default(self):
+        self.cache.get('key', lambda: 'old')
+        child = multiprocessing.get_context('fork').Process(target=self.cache.clear)
+        child.start()
+        child.join(5)
+
+        assert_that(self.cache.get('key', lambda: 'new'), equal_to('old'))
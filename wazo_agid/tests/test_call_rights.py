@@ -0,0 +1,51 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+from unittest import TestCase
+
+from hamcrest import assert_that, empty, equal_to, is_
+
+from ..call_rights import CallRightMatcher, extension_matches
+
+
+class TestCallRightMatcher(TestCase):
+    def test_matching_ids(self):
+        matcher = CallRightMatcher(
+            [
+                (1, '_0.'),
+                (2, '_00XXXX.'),
+                (3, '1234'),
+                (4, '_NXX'),
+                (5, '_+33!'),
+                (6, '_*3X'),
+            ]
+        )
+
+        assert_that(matcher.matching_ids('0033123456'), equal_to({1, 2}))
+        assert_that(matcher.matching_ids('1234'), equal_to({3}))
+        assert_that(matcher.matching_ids('234'), equal_to({4}))
+        assert_that(matcher.matching_ids('+33'), equal_to({5}))
+        assert_that(matcher.matching_ids('*31'), equal_to({6}))
+        assert_that(matcher.matching_ids('12345'), is_(empty()))
+
+    def test_same_result_as_extension_matches(self):
+        patterns = ['_0.', '_1[2-4]X', '_XXXX', '_12?3', '1|5', '_ZN!', '_[*#]X', '']
+        extens = list(enumerate(patterns))
+        matcher = CallRightMatcher(extens)
+
+        for number in ['0', '01', '123', '13', '1', '5', '1234', '91', '*1', '#12', '']:
+            expected = {
+                i for i, pattern in extens if extension_matches(number, pattern)
+            }
+            assert_that(matcher.matching_ids(number), equal_to(expected), number)
+
+    def test_invalid_patterns_are_ignored(self):
+        matcher = CallRightMatcher([(1, '_1[2'), (2, '_1X')])
+
+        assert_that(matcher.matching_ids('12'), equal_to({2}))
+        assert_that(matcher.size, equal_to(1))
+
+    def test_empty(self):
+        assert_that(bool(CallRightMatcher([])), is_(False))
@@ -0,0 +1,158 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+import requests
+from hamcrest import assert_that, calling, equal_to, has_entries, raises
+
+from .. import circuit_breaker
+from ..circuit_breaker import CircuitBreaker, CircuitOpen
+
+CONFD_URL = 'http://localhost:9486/1.1/users/abc'
+
+
+class TestCircuitBreaker(TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.breaker = CircuitBreaker(
+            'confd', failure_threshold=2, reset_timeout=30, clock=lambda: self.now
+        )
+
+    def open_circuit(self):
+        for _ in range(self.breaker.failure_threshold):
+            self.breaker.check()
+            self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.breaker.check()
+
+        self.breaker.record_failure()
+
+        assert_that(calling(self.breaker.check), raises(CircuitOpen))
+        assert_that(self.breaker.stats(), has_entries(open=1, opened=1, rejected=1))
+
+    def test_one_trial_call_after_reset_timeout(self):
+        self.open_circuit()
+        self.now += 30
+
+        self.breaker.check()
+
+        assert_that(calling(self.breaker.check), raises(CircuitOpen))
+        assert_that(self.breaker.stats(), has_entries(half_open=1))
+
+    def test_successful_trial_closes(self):
+        self.open_circuit()
+        self.now += 30
+        self.breaker.check()
+
+        self.breaker.record_success()
+
+        self.breaker.check()
+        assert_that(self.breaker.stats(), has_entries(open=0, half_open=0))
+
+    def test_failed_trial_opens_again(self):
+        self.open_circuit()
+        self.now += 30
+        self.breaker.check()
+
+        self.breaker.record_failure()
+
+        assert_that(calling(self.breaker.check), raises(CircuitOpen))
+        self.now += 30
+        self.breaker.check()
+
+
+class TestGuardedSend(TestCase):
+    def setUp(self):
+        values: dict[str, object] = {
+            '_routes': [],
+            '_breakers': {},
+            '_instrument_requests': Mock(),
+        }
+        for name, value in values.items():
+            patcher = patch.object(circuit_breaker, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        circuit_breaker.configure(failure_threshold=1, reset_timeout=30)
+        self.send = Mock(return_value=Mock(status_code=200))
+        self.guarded_send = circuit_breaker.guard_send(self.send)
+        self.adapter = Mock()
+
+    def request(self, url=CONFD_URL, **kwargs):
+        return self.guarded_send(self.adapter, Mock(url=url), **kwargs)
+
+    def test_requests_of_other_hosts_are_not_guarded(self):
+        circuit_breaker.register('confd', 'localhost', 9486, None, 2)
+        self.send.side_effect = requests.ConnectionError
+
+        for _ in range(2):
+            assert_that(
+                calling(self.request).with_args('http://example.com/'),
+                raises(requests.ConnectionError),
+            )
+
+        assert_that(self.send.call_count, equal_to(2))
+
+    def test_timeout_is_capped_to_the_deadline(self):
+        circuit_breaker.register('confd', 'localhost', 9486, None, 2)
+
+        self.request(timeout=10)
+        self.request(timeout=(10, 1))
+        self.request()
+
+        timeouts = [call.kwargs['timeout'] for call in self.send.call_args_list]
+        assert_that(timeouts, equal_to([2, (2, 1), 2]))
+
+    def test_server_errors_open_the_circuit(self):
+        circuit_breaker.register('confd', 'localhost', 9486, None, 2)
+        self.send.return_value = Mock(status_code=503)
+
+        self.request()
+
+        assert_that(calling(self.request), raises(CircuitOpen))
+        self.send.assert_called_once()
+
+    def test_timeouts_open_the_circuit(self):
+        circuit_breaker.register('confd', 'localhost', 9486, None, 2)
+        self.send.side_effect = requests.ReadTimeout
+
+        assert_that(calling(self.request), raises(requests.ReadTimeout))
+
+        assert_that(calling(self.request), raises(CircuitOpen))
+
+    def test_client_errors_do_not_open_the_circuit(self):
+        circuit_breaker.register('confd', 'localhost', 9486, None, 2)
+        self.send.return_value = Mock(status_code=404)
+
+        self.request()
+        self.request()
+
+        assert_that(self.send.call_count, equal_to(2))
+
+    def test_services_do_not_share_breakers(self):
+        circuit_breaker.register('confd', 'localhost', 9486, None, 2)
+        circuit_breaker.register('dird', 'localhost', 9489, None, 1)
+        self.send.side_effect = requests.ConnectionError
+        assert_that(calling(self.request), raises(requests.ConnectionError))
+        self.send.side_effect = None
+
+        self.request('http://localhost:9489/0.1/directories')
+
+        stats = circuit_breaker.stats()
+        assert_that(stats['confd'], has_entries(open=1))
+        assert_that(stats['dird'], has_entries(open=0))
+
+    def test_longest_prefix_is_used(self):
+        circuit_breaker.register('auth', 'proxy', None, '/api', 2)
+        circuit_breaker.register('confd', 'proxy', None, '/api/confd', 5)
+
+        self.request('https://proxy/api/confd/1.1/users')
+
+        assert_that(self.send.call_args.kwargs['timeout'], equal_to(5))
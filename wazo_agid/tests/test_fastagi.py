@@ -0,0 +1,305 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+from io import BytesIO
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from hamcrest import (
+    assert_that,
+    calling,
+    contains_exactly,
+    equal_to,
+    has_entries,
+    has_item,
+    raises,
+)
+
+from .. import metrics, tracing
+from ..fastagi import FastAGI, FastAGIInvalidCommand
+
+
+def build_agi(responses: bytes) -> tuple[FastAGI, BytesIO]:
+    inf = BytesIO(b'agi_network_script: foo\n\n' + responses)
+    outf = BytesIO()
+    return FastAGI(inf, outf, {}), outf
+
+
+def unread(agi: FastAGI) -> bytes:
+    assert isinstance(agi.inf, BytesIO)
+    return agi.inf.read()
+
+
+class TestBatch(TestCase):
+    def test_set_variable_outside_batch(self):
+        agi, outf = build_agi(b'200 result=1\n')
+
+        agi.set_variable('FOO', 'bar')
+
+        assert_that(outf.getvalue(), equal_to(b'SET VARIABLE "FOO" "bar"\n'))
+
+    def test_set_variables_are_written_at_once(self):
+        agi, outf = build_agi(b'200 result=1\n' * 3)
+        agi.outf = writer = Mock(wraps=outf)
+
+        with agi.batch():
+            agi.set_variable('FOO', 'foo')
+            agi.set_variable('BAR', 'bar')
+            agi.set_variable('BAZ', 'baz')
+            assert_that(outf.getvalue(), equal_to(b''))
+
+        writer.write.assert_called_once_with(
+            b'SET VARIABLE "FOO" "foo"\n'
+            b'SET VARIABLE "BAR" "bar"\n'
+            b'SET VARIABLE "BAZ" "baz"\n'
+        )
+        assert_that(unread(agi), equal_to(b''))
+
+    def test_nested_batches_are_sent_by_the_outermost(self):
+        agi, outf = build_agi(b'200 result=1\n' * 2)
+
+        with agi.batch():
+            with agi.batch():
+                agi.set_variable('FOO', 'foo')
+            assert_that(outf.getvalue(), equal_to(b''))
+            agi.set_variable('BAR', 'bar')
+
+        assert_that(
+            outf.getvalue(),
+            equal_to(b'SET VARIABLE "FOO" "foo"\nSET VARIABLE "BAR" "bar"\n'),
+        )
+
+    def test_variables_set_twice_are_sent_once(self):
+        agi, outf = build_agi(b'200 result=1\n' * 2)
+
+        with agi.batch():
+            agi.set_variable('FOO', 'foo')
+            agi.set_variable('BAR', 'bar')
+            agi.set_variable('__FOO', 'baz')
+
+        assert_that(
+            outf.getvalue(),
+            equal_to(b'SET VARIABLE "__FOO" "baz"\nSET VARIABLE "BAR" "bar"\n'),
+        )
+        assert_that(unread(agi), equal_to(b''))
+
+    def test_writes_around_a_function_keep_their_order(self):
+        agi, outf = build_agi(b'200 result=1\n' * 3)
+
+        with agi.batch():
+            agi.set_variable('FOO', 'foo')
+            agi.set_variable('CHANNEL(language)', 'fr_FR')
+            agi.set_variable('FOO', 'bar')
+
+        assert_that(
+            outf.getvalue(),
+            equal_to(
+                b'SET VARIABLE "FOO" "foo"\n'
+                b'SET VARIABLE "CHANNEL(language)" "fr_FR"\n'
+                b'SET VARIABLE "FOO" "bar"\n'
+            ),
+        )
+
+    def test_pending_commands_are_sent_before_other_commands(self):
+        agi, outf = build_agi(b'200 result=1\n200 result=1 (value)\n')
+
+        with agi.batch():
+            agi.set_variable('FOO', 'foo')
+            value = agi.get_variable('BAR')
+
+        assert_that(value, equal_to('value'))
+        assert_that(
+            outf.getvalue(),
+            equal_to(b'SET VARIABLE "FOO" "foo"\nGET VARIABLE "BAR"\n'),
+        )
+
+    def test_all_results_are_read_before_raising(self):
+        agi, _ = build_agi(
+            b'510 Invalid or unknown command\n200 result=1\n200 result=1 (value)\n'
+        )
+
+        def set_variables():
+            with agi.batch():
+                agi.set_variable('FOO', 'foo')
+                agi.set_variable('BAR', 'bar')
+
+        assert_that(calling(set_variables), raises(FastAGIInvalidCommand))
+        assert_that(agi.get_variable('BAZ'), equal_to('value'))
+
+    def test_error_of_the_block_is_not_replaced_by_the_flush(self):
+        agi, outf = build_agi(b'510 Invalid or unknown command\n')
+
+        def fail():
+            with agi.batch():
+                agi.set_variable('FOO', 'foo')
+                raise ValueError()
+
+        assert_that(calling(fail), raises(ValueError))
+        assert_that(outf.getvalue(), equal_to(b'SET VARIABLE "FOO" "foo"\n'))
+
+
+class TestGetVariables(TestCase):
+    def test_get_variables_are_written_at_once(self):
+        agi, outf = build_agi(b'200 result=1 (foo)\n200 result=0\n')
+        agi.outf = writer = Mock(wraps=outf)
+
+        values = agi.get_variables(['FOO', 'BAR', 'FOO'])
+
+        assert_that(values, contains_exactly('foo', '', 'foo'))
+        writer.write.assert_called_once_with(
+            b'GET VARIABLE "FOO"\nGET VARIABLE "BAR"\n'
+        )
+
+    def test_values_are_cached(self):
+        agi, outf = build_agi(b'200 result=1 (foo)\n200 result=1 (bar)\n')
+
+        agi.get_variable('FOO')
+        values = agi.get_variables(['FOO', 'BAR'])
+
+        assert_that(values, contains_exactly('foo', 'bar'))
+        assert_that(agi.get_variable('BAR'), equal_to('bar'))
+        assert_that(
+            outf.getvalue(),
+            equal_to(b'GET VARIABLE "FOO"\nGET VARIABLE "BAR"\n'),
+        )
+
+    def test_set_variable_updates_the_cache(self):
+        agi, outf = build_agi(b'200 result=1\n')
+
+        agi.set_variable('__FOO', 'foo\nbar')
+
+        assert_that(agi.get_variable('FOO'), equal_to('foo bar'))
+        assert_that(outf.getvalue(), equal_to(b'SET VARIABLE "__FOO" "foo bar"\n'))
+
+    def test_functions_are_not_cached(self):
+        agi, outf = build_agi(b'200 result=1 (fr_FR)\n' * 2)
+
+        agi.get_variable('CHANNEL(language)')
+        agi.get_variable('CHANNEL(language)')
+
+        assert_that(outf.getvalue().count(b'GET VARIABLE'), equal_to(2))
+
+    def test_cache_is_cleared_by_other_commands(self):
+        agi, outf = build_agi(
+            b'200 result=1 (foo)\n200 result=1 (0)\n200 result=1 (bar)\n'
+        )
+
+        agi.get_variable('FOO')
+        agi.appexec('Wait', '0')
+
+        assert_that(agi.get_variable('FOO'), equal_to('bar'))
+
+    def test_cache_is_cleared_when_setting_a_function(self):
+        agi, _ = build_agi(b'200 result=1 (foo)\n200 result=1\n200 result=1 (bar)\n')
+
+        agi.get_variable('FOO')
+        agi.set_variable('HASH(foo,bar)', 'baz')
+
+        assert_that(agi.get_variable('FOO'), equal_to('bar'))
+
+
+class TestParsing(TestCase):
+    def test_agi_env(self):
+        env = BytesIO(
+            b'agi_network_script: foo\n'
+            b'agi_channel: PJSIP/abc-00000001\n'
+            b'agi_callerid:  "Bob: \xc3\xa9" <1001> \n'
+            b'agi_arg_1: foo\n'
+            b'agi_noval\n'
+            b'\n'
+        )
+
+        agi = FastAGI(env, BytesIO(), {})
+
+        assert_that(
+            agi.env,
+            has_entries(
+                agi_network_script='foo',
+                agi_channel='PJSIP/abc-00000001',
+                agi_callerid='"Bob: \xe9" <1001>',
+                agi_noval='',
+            ),
+        )
+        assert_that(agi.args, contains_exactly('foo'))
+
+    def test_simple_results_are_parsed_like_other_results(self):
+        agi, _ = build_agi(b'')
+        lines = [
+            '200 result=1',
+            '200 result=0 (foo)',
+            '200 result=1 (foo bar (baz))',
+            '200 result=1 (a=b c=d)',
+            '200 result=1   (spaces)',
+            '200 result=1 ()',
+            '200 result=-1',
+            '200 result=1 (hangup)',
+        ]
+
+        for line in lines:
+            fast = self._parse(FastAGI._parse_simple_result, line[11:])
+            slow = self._parse(agi._parse_result, line)
+            assert_that(fast, equal_to(slow), line)
+
+    def test_other_results_are_left_to_the_regex(self):
+        lines = [
+            '200 result=',
+            '200 result= 1',
+            '200 result=0 endpos=1234',
+            '200 result=1 (foo) endpos=1234',
+            '200 result=1 (unclosed',
+        ]
+
+        for line in lines:
+            assert_that(FastAGI._parse_simple_result(line[11:]), equal_to(None), line)
+
+    def test_get_result(self):
+        agi, _ = build_agi(b'200 result=1 (bar)\n200 result=0 endpos=1234\n')
+
+        assert_that(agi.get_result(), equal_to({'result': ('1', 'bar')}))
+        assert_that(
+            agi.get_result(),
+            equal_to({'result': ('0', ''), 'endpos': ('1234', '')}),
+        )
+
+    def test_quote(self):
+        assert_that(FastAGI._quote('PJSIP/abc'), equal_to('"PJSIP/abc"'))
+        assert_that(FastAGI._quote(42), equal_to('"42"'))
+        assert_that(FastAGI._quote(None), equal_to('""'))
+        assert_that(FastAGI._quote(b'foo'), equal_to('"foo"'))
+        assert_that(FastAGI._quote('a "b" \\c\nd'), equal_to('"a \\"b\\" \\\\c d"'))
+
+    @staticmethod
+    def _parse(parse, argument):
+        try:
+            return parse(argument)
+        except Exception as e:
+            return type(e)
+
+
+class TestMetrics(TestCase):
+    def setUp(self):
+        tracing.configure(True)
+        self.addCleanup(tracing.configure, False)
+        patcher = patch.object(metrics, 'registry', metrics.Registry())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_commands_are_timed_in_the_current_request(self):
+        agi, _ = build_agi(b'200 result=1 (foo)\n200 result=1\n200 result=1\n')
+
+        with metrics.track_request() as timer:
+            agi.get_variable('FOO')
+            with agi.batch():
+                agi.set_variable('BAR', 'bar')
+                agi.set_variable('BAZ', 'baz')
+
+        assert_that(timer.io['agi'] > 0, equal_to(True))
+        assert timer.trace is not None
+        assert_that(
+            timer.trace.summary,
+            has_entries(
+                {('agi', 'GET VARIABLE'): has_item(1), ('agi', 'pipeline'): has_item(1)}
+            ),
+        )
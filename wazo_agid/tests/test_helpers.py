@@ -1,4 +1,4 @@
-# Copyright 2017-2024 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2017-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from __future__ import annotations
@@ -7,11 +7,14 @@ import unittest
 from unittest.mock import Mock, patch
 from unittest.mock import sentinel as s
 
+import requests
 from hamcrest import assert_that, equal_to
 
+from .. import mobile_connections
+from ..cache import EntityCache
 from ..helpers import _has_mobile_connection as has_mobile_connection
 from ..helpers import _is_mobile_reachable as is_mobile_and_reachable
-from ..helpers import build_sip_interface, requests
+from ..helpers import build_sip_interface
 
 ABCD_INTERFACE = (
     'PJSIP/ycetqvtr/sip:n753iqfr@127.0.0.1:44530;transport=ws&'
@@ -98,6 +101,7 @@ class TestIsRegisteredAndMobile(unittest.TestCase):
 
         agi = Mock()
         agi.get_variable.side_effect = get_variable
+        agi.get_variables.side_effect = lambda names: [get_variable(n) for n in names]
 
         result = is_mobile_and_reachable(agi, 'name')
 
@@ -112,6 +116,7 @@ class TestIsRegisteredAndMobile(unittest.TestCase):
 
         agi = Mock()
         agi.get_variable.side_effect = get_variable
+        agi.get_variables.side_effect = lambda names: [get_variable(n) for n in names]
 
         result = is_mobile_and_reachable(agi, 'name')
 
@@ -130,10 +135,12 @@ class TestIsRegisteredAndMobile(unittest.TestCase):
 
         agi = Mock()
         agi.get_variable.side_effect = get_variable
+        agi.get_variables.side_effect = lambda names: [get_variable(n) for n in names]
 
         result = is_mobile_and_reachable(agi, 'name')
 
         assert_that(result, equal_to(True))
+        agi.get_variables.assert_called_once()
 
 
 class TestHasMobileConnection(unittest.TestCase):
@@ -177,6 +184,7 @@ class TestHasMobileConnection(unittest.TestCase):
 
         assert_that(result, equal_to(True))
         self.agi.set_variable.called_once_with('WAZO_MOBILE_CONNECTION', True)
+        self.auth_client.users.get_sessions.assert_not_called()
 
     def test_mobile_session_only(self):
         self.auth_client.token.list.return_value = {
@@ -192,3 +200,46 @@ class TestHasMobileConnection(unittest.TestCase):
 
         assert_that(result, equal_to(True))
         self.agi.set_variable.called_once_with('WAZO_MOBILE_CONNECTION', True)
+
+
+class TestMobileConnectionCache(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = patch.object(
+            mobile_connections,
+            '_cache',
+            EntityCache('mobile_connections', ttl=30, clock=lambda: self.now),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.agi = Mock()
+        self.auth_client = Mock()
+        self.agi.config = {'auth': {'client': self.auth_client}}
+        self.auth_client.token.list.return_value = {'items': [], 'filtered': 0}
+        self.auth_client.users.get_sessions.return_value = {'items': []}
+
+    def test_mobile_connection_is_cached(self):
+        self.auth_client.token.list.return_value = {'items': [{}], 'filtered': 1}
+
+        has_mobile_connection(self.agi, s.user_uuid)
+        self.now += 29
+        result = has_mobile_connection(self.agi, s.user_uuid)
+
+        assert_that(result, equal_to(True))
+        self.auth_client.token.list.assert_called_once()
+
+    def test_no_mobile_connection_is_cached_shortly(self):
+        has_mobile_connection(self.agi, s.user_uuid)
+        has_mobile_connection(self.agi, s.user_uuid)
+        self.now += mobile_connections.DEFAULT_NEGATIVE_TTL
+        has_mobile_connection(self.agi, s.user_uuid)
+
+        assert_that(self.auth_client.token.list.call_count, equal_to(2))
+
+    def test_auth_errors_are_not_cached(self):
+        self.auth_client.token.list.side_effect = requests.HTTPError
+
+        has_mobile_connection(self.agi, s.user_uuid)
+        has_mobile_connection(self.agi, s.user_uuid)
+
+        assert_that(self.auth_client.token.list.call_count, equal_to(2))
@@ -0,0 +1,130 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from hamcrest import assert_that, calling, contains_string, equal_to, raises
+
+from .. import metrics
+
+
+class TestHistogram(TestCase):
+    def test_samples_are_cumulative(self):
+        histogram = metrics.Histogram()
+        histogram.observe(0.0005)
+        histogram.observe(0.003)
+        histogram.observe(60)
+
+        samples = list(histogram.samples('latency', 'handler="h"'))
+
+        assert_that(samples[0], equal_to('latency_bucket{handler="h",le="0.001"} 1'))
+        assert_that(samples[2], equal_to('latency_bucket{handler="h",le="0.005"} 2'))
+        assert_that(samples[-4], equal_to('latency_bucket{handler="h",le="10.0"} 2'))
+        assert_that(samples[-3], equal_to('latency_bucket{handler="h",le="+Inf"} 3'))
+        assert_that(samples[-1], equal_to('latency_count{handler="h"} 3'))
+
+
+class TestTrackRequest(TestCase):
+    def setUp(self):
+        self.registry = metrics.Registry()
+        patcher = patch.object(metrics, 'registry', self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_request_is_recorded_under_its_handler(self):
+        with metrics.track_request() as timer:
+            timer.handler = 'incoming_user_set_features'
+            assert_that(self.registry.in_flight, equal_to(1))
+
+        output = self.registry.render()
+
+        assert_that(
+            output,
+            contains_string(
+                'wazo_agid_requests_total{handler="incoming_user_set_features"} 1'
+            ),
+        )
+        assert_that(output, contains_string('wazo_agid_requests_in_flight 0'))
+
+    def test_errors_are_counted_by_class(self):
+        with metrics.track_request() as timer:
+            timer.handler = 'monitoring'
+            timer.fail(KeyError('agi_network_script'))
+
+        def fail():
+            with metrics.track_request() as timer:
+                timer.handler = 'monitoring'
+                raise ValueError()
+
+        assert_that(calling(fail), raises(ValueError))
+
+        output = self.registry.render()
+        assert_that(
+            output,
+            contains_string(
+                'wazo_agid_request_errors_total{handler="monitoring",error="KeyError"} 1'
+            ),
+        )
+        assert_that(
+            output,
+            contains_string(
+                'wazo_agid_request_errors_total{handler="monitoring",error="ValueError"} 1'
+            ),
+        )
+        assert_that(
+            output, contains_string('wazo_agid_requests_total{handler="monitoring"} 2')
+        )
+
+    def test_io_time_is_added_to_the_current_request(self):
+        with patch(
+            'wazo_agid.metrics.time.perf_counter', side_effect=[0, 1, 3, 4, 5, 10]
+        ):
+            with metrics.track_request() as timer:
+                with metrics.timed('db'):
+                    pass
+                with metrics.timed('http'):
+                    pass
+
+        assert_that(timer.io, equal_to({'agi': 0.0, 'db': 2, 'http': 1}))
+
+    def test_timed_outside_of_a_request(self):
+        with metrics.timed('db'):
+            pass
+
+        assert_that(self.registry.render(), contains_string('in_flight 0'))
+
+
+class TestRegistryStats(TestCase):
+    def test_stats_are_rendered_as_gauges(self):
+        registry = metrics.Registry()
+        registry.register_stats('pool', lambda: {'size': 10, 'idle': 3})
+        registry.register_stats(
+            'cache', lambda: {'users': {'hits': 4}, 'queues': {'hits': 1}}, 'cache'
+        )
+
+        output = registry.render()
+
+        assert_that(output, contains_string('# TYPE pool_size gauge\npool_size 10\n'))
+        assert_that(output, contains_string('pool_idle 3\n'))
+        assert_that(
+            output,
+            contains_string(
+                '# TYPE cache_hits gauge\n'
+                'cache_hits{cache="queues"} 1\n'
+                'cache_hits{cache="users"} 4\n'
+            ),
+        )
+
+    def test_failing_stats_are_skipped(self):
+        def broken_stats() -> dict[str, int]:
+            raise ZeroDivisionError()
+
+        registry = metrics.Registry()
+        registry.register_stats('broken', broken_stats)
+
+        output = registry.render()
+
+        assert_that(output, contains_string('wazo_agid_threads_active'))
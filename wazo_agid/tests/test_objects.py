@@ -1,13 +1,16 @@
-# Copyright 2023-2024 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2023-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from __future__ import annotations
 
+from types import SimpleNamespace
 from unittest import TestCase
+from unittest.mock import Mock, patch
 
-from hamcrest import assert_that, is_
+from hamcrest import assert_that, equal_to, is_
 
-from ..objects import VMBox
+from ..cache import EntityCache
+from ..objects import User, VMBox
 
 
 class VMBoxFastInit(VMBox):
@@ -43,3 +46,37 @@ class TestVMBox(TestCase):
         vmbox.skipcheckpass = 1
 
         assert_that(vmbox.has_password(), is_(False))
+
+
+def user_features(**features):
+    return dict.fromkeys(User._feature_columns, 0) | features
+
+
+class TestUser(TestCase):
+    def setUp(self):
+        row = SimpleNamespace(
+            **(dict.fromkeys(User._columns) | {'id': 42, 'ringseconds': 30})
+        )
+        patcher = patch('wazo_agid.objects.user_dao')
+        self.user_dao = patcher.start()
+        self.user_dao.get.return_value = row
+        self.addCleanup(patcher.stop)
+        cache_patcher = patch('wazo_agid.objects._user_cache', EntityCache('user'))
+        cache_patcher.start()
+        self.addCleanup(cache_patcher.stop)
+        self.cursor = Mock()
+
+    def test_features_are_read_on_each_call(self):
+        self.cursor.fetchone.side_effect = [
+            user_features(enablednd=0),
+            user_features(enablednd=1, enableunc=1, destunc='1234'),
+        ]
+
+        first = User(Mock(), self.cursor, xid=42)
+        second = User(Mock(), self.cursor, xid=42)
+
+        self.user_dao.get.assert_called_once_with(42)
+        assert_that(first.enablednd, equal_to(0))
+        assert_that(second.enablednd, equal_to(1))
+        assert_that(second.enableunc, equal_to(1))
+        assert_that(second.destunc, equal_to('1234'))
@@ -0,0 +1,54 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from hamcrest import assert_that, calling, equal_to, raises
+from requests import HTTPError
+
+from .. import outgoing_callerids
+from ..cache import EntityCache
+
+CALLERIDS = {'items': [{'type': 'main', 'number': '5555551234'}], 'total': 1}
+
+
+class TestOutgoingCallerids(TestCase):
+    def setUp(self):
+        patcher = patch.object(
+            outgoing_callerids, '_cache', EntityCache('outgoing_callerids', ttl=300)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.confd_client = Mock()
+        relations = self.confd_client.users.relations.return_value
+        self.list_outgoing_callerids = relations.list_outgoing_callerids
+        self.list_outgoing_callerids.return_value = CALLERIDS
+
+    def test_callerids_are_fetched_once(self):
+        outgoing_callerids.get(self.confd_client, 'user-uuid')
+        result = outgoing_callerids.get(self.confd_client, 'user-uuid')
+
+        assert_that(result, equal_to(CALLERIDS['items']))
+        self.confd_client.users.relations.assert_called_once_with('user-uuid')
+
+    def test_errors_are_not_cached(self):
+        self.list_outgoing_callerids.side_effect = [HTTPError(), CALLERIDS]
+
+        assert_that(
+            calling(outgoing_callerids.get).with_args(self.confd_client, 'user-uuid'),
+            raises(HTTPError),
+        )
+        result = outgoing_callerids.get(self.confd_client, 'user-uuid')
+
+        assert_that(result, equal_to(CALLERIDS['items']))
+
+    def test_cleared_on_reload(self):
+        outgoing_callerids.get(self.confd_client, 'user-uuid')
+
+        outgoing_callerids.clear()
+        outgoing_callerids.get(self.confd_client, 'user-uuid')
+
+        assert_that(self.list_outgoing_callerids.call_count, equal_to(2))
@@ -0,0 +1,66 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import threading
+from unittest import TestCase
+
+from hamcrest import assert_that, calling, equal_to, raises
+from requests import RequestException
+
+from .. import parallel
+
+
+class TestRun(TestCase):
+    def test_calls_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def call(value):
+            barrier.wait()
+            return value
+
+        first, second = parallel.run(lambda: call(1), lambda: call(2))
+
+        assert_that([first.result(), second.result()], equal_to([1, 2]))
+
+    def test_exception_is_raised_by_result(self):
+        def fail():
+            raise LookupError('not found')
+
+        failed, succeeded = parallel.run(fail, lambda: 'value')
+
+        assert_that(calling(failed.result), raises(LookupError))
+        assert_that(succeeded.result(), equal_to('value'))
+
+    def test_calls_share_the_deadline(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        slow, fast = parallel.run(release.wait, lambda: 'value', timeout=0.01)
+
+        assert_that(calling(slow.result), raises(parallel.DeadlineExceeded))
+        assert_that(fast.result(), equal_to('value'))
+
+    def test_deadline_is_a_request_exception(self):
+        assert_that(
+            issubclass(parallel.DeadlineExceeded, RequestException), equal_to(True)
+        )
+
+
+class TestStart(TestCase):
+    def test_result_waits_for_the_call(self):
+        release = threading.Event()
+
+        outcome = parallel.start(lambda: release.wait(5) and 'value')
+        release.set()
+
+        assert_that(outcome.result(), equal_to('value'))
+
+    def test_result_waits_until_the_deadline(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        outcome = parallel.start(release.wait, timeout=0.01)
+
+        assert_that(calling(outcome.result), raises(parallel.DeadlineExceeded))
@@ -0,0 +1,112 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import threading
+from unittest import TestCase
+from unittest.mock import MagicMock, Mock, patch
+
+import psycopg2
+from hamcrest import assert_that, calling, equal_to, has_entries, is_, raises
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INERROR
+
+from ..pool import HEALTH_CHECK_INTERVAL, ConnectionPool, ConnectionPoolTimeout
+
+
+def new_connection(*args, **kwargs):
+    connection = MagicMock(closed=0)
+    connection.get_transaction_status.return_value = TRANSACTION_STATUS_IDLE
+    return connection
+
+
+class TestConnectionPool(TestCase):
+    def setUp(self):
+        self.connect = Mock(side_effect=new_connection)
+        self.pool = ConnectionPool(
+            {'dbname': 'asterisk'},
+            size=2,
+            wait_timeout=0.05,
+            max_lifetime=60,
+            connect=self.connect,
+        )
+
+    def test_connections_are_reused(self):
+        connection = self.pool.getconn()
+        self.pool.putconn(connection)
+
+        assert_that(self.pool.getconn(), is_(connection))
+        self.connect.assert_called_once_with(dbname='asterisk')
+
+    def test_wait_timeout_when_exhausted(self):
+        self.pool.getconn()
+        self.pool.getconn()
+
+        assert_that(calling(self.pool.getconn), raises(ConnectionPoolTimeout))
+        assert_that(
+            self.pool.stats(),
+            has_entries(opened=2, in_use=2, waits=1, wait_timeouts=1),
+        )
+
+    def test_waiter_gets_released_connection(self):
+        first = self.pool.getconn()
+        self.pool.getconn()
+        self.pool.wait_timeout = 5
+        timer = threading.Timer(0.01, self.pool.putconn, [first])
+        timer.start()
+
+        connection = self.pool.getconn()
+
+        timer.join()
+        assert_that(connection, is_(first))
+        assert_that(self.pool.stats(), has_entries(waits=1, wait_timeouts=0))
+
+    def test_closed_connection_is_replaced(self):
+        connection = self.pool.getconn()
+        self.pool.putconn(connection)
+        connection.closed = 1
+
+        new = self.pool.getconn()
+
+        assert_that(new is connection, equal_to(False))
+        assert_that(self.pool.stats(), has_entries(connections_discarded=1))
+
+    def test_expired_connection_is_closed_on_release(self):
+        connection = self.pool.getconn()
+        self.pool.max_lifetime = 0
+
+        with patch('wazo_agid.pool.time.monotonic', return_value=1e9):
+            self.pool.putconn(connection)
+
+        connection.close.assert_called_once_with()
+        assert_that(self.pool.stats(), has_entries(opened=0, idle=0))
+
+    def test_aborted_transaction_is_rolled_back_on_release(self):
+        connection = self.pool.getconn()
+        connection.get_transaction_status.return_value = TRANSACTION_STATUS_INERROR
+
+        self.pool.putconn(connection)
+
+        connection.rollback.assert_called_once_with()
+        assert_that(self.pool.stats(), has_entries(idle=1))
+
+    def test_idle_connection_is_health_checked(self):
+        connection = self.pool.getconn()
+        self.pool.putconn(connection)
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.execute.side_effect = psycopg2.OperationalError
+
+        with patch('wazo_agid.pool.time.monotonic') as monotonic:
+            monotonic.return_value = 1e6 + HEALTH_CHECK_INTERVAL
+            self.pool._released_at[connection] = 1e6
+            self.pool._opened_at[connection] = 1e6
+            new = self.pool.getconn()
+
+        assert_that(new is connection, equal_to(False))
+        connection.close.assert_called_once_with()
+
+    def test_connect_error_frees_the_slot(self):
+        self.connect.side_effect = psycopg2.OperationalError
+
+        assert_that(calling(self.pool.getconn), raises(psycopg2.OperationalError))
+        assert_that(self.pool.stats(), has_entries(opened=0))
@@ -0,0 +1,151 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import time
+from unittest import TestCase
+
+from hamcrest import assert_that, contains_inanyorder, equal_to
+
+from ..prefork import Supervisor, listen, worker_ready
+
+
+def record_signals(directory: str, index: int) -> None:
+    def record(signum, frame):
+        with open(os.path.join(directory, f'{index}-{os.getpid()}'), 'a') as f:
+            f.write(f'{signum}\n')
+
+    # the start is recorded first even if SIGHUP is received meanwhile
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGHUP})
+    signal.signal(signal.SIGHUP, record)
+    record(0, None)
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGHUP})
+    while True:
+        signal.pause()
+
+
+def record_signals_late(directory: str, index: int) -> None:
+    # SIGHUP is received before the handler is installed
+    with open(os.path.join(directory, f'{index}-{os.getpid()}'), 'a') as f:
+        f.write('0\n')
+    time.sleep(0.5)
+
+    def record(signum, frame):
+        with open(os.path.join(directory, f'{index}-{os.getpid()}'), 'a') as f:
+            f.write(f'{signum}\n')
+
+    signal.signal(signal.SIGHUP, record)
+    worker_ready()
+    while True:
+        signal.pause()
+
+
+def supervise(directory: str, processes: int, worker=record_signals) -> None:
+    Supervisor(processes, lambda index: worker(directory, index)).run()
+
+
+class SupervisorTestCase(TestCase):
+    worker = staticmethod(record_signals)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.supervisor = multiprocessing.get_context('fork').Process(
+            target=supervise, args=(self.directory, 2, self.worker)
+        )
+        self.supervisor.start()
+        self.addCleanup(self.supervisor.join, 5)
+        self.addCleanup(self._stop)
+
+    def _stop(self):
+        if self.supervisor.is_alive():
+            self._kill_supervisor(signal.SIGTERM)
+
+    def _kill_supervisor(self, signum: int) -> None:
+        assert self.supervisor.pid is not None
+        os.kill(self.supervisor.pid, signum)
+
+    def _workers(self, count: int) -> dict[str, list[str]]:
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            files = os.listdir(self.directory)
+            if len(files) >= count:
+                break
+            time.sleep(0.01)
+        workers = {}
+        for name in os.listdir(self.directory):
+            with open(os.path.join(self.directory, name)) as f:
+                workers[name] = f.read().split()
+        return workers
+
+    def _wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and not condition():
+            time.sleep(0.01)
+
+
+class TestSupervisor(SupervisorTestCase):
+    def test_workers_are_started_with_their_index(self):
+        workers = self._workers(2)
+
+        assert_that(
+            [name.split('-')[0] for name in workers], contains_inanyorder('0', '1')
+        )
+
+    def test_sighup_is_forwarded_to_all_workers(self):
+        self._workers(2)
+
+        self._kill_supervisor(signal.SIGHUP)
+        self._wait_for(lambda: all(len(s) == 2 for s in self._workers(2).values()))
+
+        for signals in self._workers(2).values():
+            assert_that(signals, equal_to(['0', str(int(signal.SIGHUP))]))
+
+    def test_dead_worker_is_restarted(self):
+        name = sorted(self._workers(2))[0]
+        index, pid = name.split('-')
+
+        os.kill(int(pid), signal.SIGKILL)
+        self._wait_for(lambda: len(self._workers(3)) == 3)
+
+        indexes = [name.split('-')[0] for name in self._workers(3)]
+        assert_that(indexes.count(index), equal_to(2))
+
+    def test_sigterm_stops_the_workers(self):
+        self._workers(2)
+
+        self._kill_supervisor(signal.SIGTERM)
+        self.supervisor.join(5)
+
+        assert_that(self.supervisor.exitcode, equal_to(0))
+
+
+class TestStartingWorker(SupervisorTestCase):
+    worker = staticmethod(record_signals_late)
+
+    def test_sighup_received_before_the_handler_is_raised_again(self):
+        self._workers(2)
+
+        self._kill_supervisor(signal.SIGHUP)
+        self._wait_for(lambda: all(len(s) == 2 for s in self._workers(2).values()))
+
+        for signals in self._workers(2).values():
+            assert_that(signals, equal_to(['0', str(int(signal.SIGHUP))]))
+
+
+class TestListen(TestCase):
+    def test_socket_is_inherited_by_workers(self):
+        sock = listen('127.0.0.1', 0)
+        self.addCleanup(sock.close)
+
+        assert_that(sock.get_inheritable(), equal_to(True))
+        assert_that(
+            sock.getsockopt(socket.SOL_SOCKET, socket.SO_ACCEPTCONN), equal_to(1)
+        )
@@ -0,0 +1,104 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import os
+import stat
+import tempfile
+import threading
+from unittest import TestCase
+
+from hamcrest import assert_that, contains_string, empty, equal_to, has_length
+
+from ..profiler import SamplingProfiler
+
+
+def waiting_handler(started: threading.Event, done: threading.Event) -> None:
+    started.set()
+    done.wait()
+
+
+class TestSamplingProfiler(TestCase):
+    def setUp(self):
+        self.started = threading.Event()
+        self.done = threading.Event()
+        self.thread = threading.Thread(
+            target=waiting_handler, args=(self.started, self.done)
+        )
+        self.thread.start()
+        self.started.wait()
+        assert self.thread.ident is not None
+        self.ident = self.thread.ident
+        self.addCleanup(self.thread.join)
+        self.addCleanup(self.done.set)
+
+    def test_samples_are_tagged_with_the_handler(self):
+        handlers = {self.ident: 'incoming_user_set_features'}
+        profiler = SamplingProfiler(active_handlers=lambda: handlers)
+
+        profiler.sample()
+        profiler.sample()
+
+        assert_that(profiler.samples, has_length(1))
+        stack, count = profiler.samples.most_common()[0]
+        assert_that(count, equal_to(2))
+        assert_that(stack.split(';')[0], equal_to('incoming_user_set_features'))
+        assert_that(
+            stack, contains_string('wazo_agid.tests.test_profiler:waiting_handler;')
+        )
+
+    def test_idle_threads_are_not_sampled(self):
+        profiler = SamplingProfiler(active_handlers=dict)
+
+        profiler.sample()
+
+        assert_that(profiler.samples, empty())
+
+    def test_profile_is_written_in_collapsed_format(self):
+        handlers = {self.ident: 'monitoring'}
+        profiler = SamplingProfiler(interval=0.001, active_handlers=lambda: handlers)
+        output_dir = tempfile.mkdtemp()
+        output_file = os.path.join(output_dir, 'profile.collapsed')
+        self.addCleanup(os.rmdir, output_dir)
+        self.addCleanup(os.remove, output_file)
+
+        profiler.start(0.05, output_file)
+        assert profiler._thread is not None
+        profiler._thread.join()
+
+        with open(output_file) as f:
+            lines = f.read().splitlines()
+        assert_that(lines, has_length(1))
+        stack, count = lines[0].rsplit(' ', 1)
+        assert_that(stack.startswith('monitoring;'), equal_to(True))
+        assert_that(int(count) > 0, equal_to(True))
+
+    def test_profile_is_only_readable_by_the_service(self):
+        profiler = SamplingProfiler(active_handlers=dict)
+        output_dir = tempfile.mkdtemp()
+        output_file = os.path.join(output_dir, 'profile.collapsed')
+        self.addCleanup(os.rmdir, output_dir)
+        self.addCleanup(os.remove, output_file)
+
+        profiler.dump(output_file)
+
+        assert_that(stat.S_IMODE(os.stat(output_file).st_mode), equal_to(0o600))
+
+    def test_existing_file_is_not_overwritten(self):
+        profiler = SamplingProfiler(active_handlers=dict)
+        profiler.samples['monitoring;main'] = 1
+        output_dir = tempfile.mkdtemp()
+        target = os.path.join(output_dir, 'target')
+        output_file = os.path.join(output_dir, 'profile.collapsed')
+        self.addCleanup(os.rmdir, output_dir)
+        self.addCleanup(os.remove, target)
+        self.addCleanup(os.remove, output_file)
+        with open(target, 'w') as f:
+            f.write('unchanged')
+        os.symlink(target, output_file)
+
+        self.assertRaises(FileExistsError, profiler.dump, output_file)
+
+        with open(target) as f:
+            assert_that(f.read(), equal_to('unchanged'))
@@ -0,0 +1,180 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from hamcrest import assert_that, calling, equal_to, has_entries, raises
+
+from .. import reverse_lookup
+from ..reverse_lookup import LookupResult, ReverseLookupCache
+
+FOUND: LookupResult = {'display': 'Bob', 'fields': {'name': 'Bob'}}
+NOT_FOUND: LookupResult = {'display': None, 'fields': {}}
+
+
+def key(number):
+    return ('tenant', 'user', 'default', number)
+
+
+class TestReverseLookupCache(TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.cache = ReverseLookupCache(
+            ttl=300,
+            negative_ttl=60,
+            error_ttl=10,
+            max_entries=2,
+            clock=lambda: self.now,
+        )
+
+    def test_result_is_looked_up_once(self):
+        lookup = Mock(return_value=FOUND)
+
+        self.cache.get(key('1234'), lookup)
+        result = self.cache.get(key('1234'), lookup)
+
+        assert_that(result, equal_to(FOUND))
+        lookup.assert_called_once_with()
+        assert_that(self.cache.stats(), has_entries(entries=1, hits=1, misses=1))
+
+    def test_not_found_expires_before_found(self):
+        self.cache.get(key('1'), lambda: FOUND)
+        self.cache.get(key('2'), lambda: NOT_FOUND)
+        self.now += 60
+
+        assert_that(self.cache.get(key('1'), lambda: NOT_FOUND), equal_to(FOUND))
+        assert_that(self.cache.get(key('2'), lambda: FOUND), equal_to(FOUND))
+
+    def test_least_recently_used_is_evicted(self):
+        for number in ('1', '2', '1', '3'):
+            self.cache.get(key(number), lambda: FOUND)
+
+        lookup = Mock(return_value=NOT_FOUND)
+        self.cache.get(key('1'), lookup)
+        self.cache.get(key('2'), lookup)
+
+        lookup.assert_called_once_with()
+        assert_that(self.cache.stats(), has_entries(evictions=2))
+
+    def test_expired_result_is_used_when_lookup_fails(self):
+        self.cache.get(key('1234'), lambda: FOUND)
+        self.now += 300
+        lookup = Mock(side_effect=ConnectionError)
+
+        assert_that(self.cache.get(key('1234'), lookup), equal_to(FOUND))
+        assert_that(self.cache.get(key('1234'), lookup), equal_to(FOUND))
+        lookup.assert_called_once_with()
+        assert_that(self.cache.stats(), has_entries(errors=1))
+
+    def test_failed_lookup_is_not_retried_before_error_ttl(self):
+        lookup = Mock(side_effect=ConnectionError)
+
+        assert_that(
+            calling(self.cache.get).with_args(key('1234'), lookup),
+            raises(ConnectionError),
+        )
+        assert_that(self.cache.get(key('1234'), lookup), equal_to(None))
+        self.now += 10
+
+        assert_that(self.cache.get(key('1234'), lambda: FOUND), equal_to(FOUND))
+
+    def test_concurrent_lookups_of_a_number_wait_for_the_first(self):
+        looking_up = threading.Event()
+        release = threading.Event()
+
+        def slow_lookup():
+            looking_up.set()
+            release.wait(5)
+            return FOUND
+
+        results = []
+        first = threading.Thread(
+            target=lambda: results.append(self.cache.get(key('1234'), slow_lookup))
+        )
+        first.start()
+        looking_up.wait(5)
+        second = threading.Thread(
+            target=lambda: results.append(self.cache.get(key('1234'), Mock()))
+        )
+        second.start()
+        while self.cache.stats()['waits'] == 0:
+            release.wait(0.01)
+        release.set()
+        first.join(5)
+        second.join(5)
+
+        assert_that(results, equal_to([FOUND, FOUND]))
+        assert_that(self.cache.stats(), has_entries(misses=1, waits=1))
+
+    def test_disabled_when_ttl_is_zero(self):
+        self.cache.ttl = 0
+        lookup = Mock(return_value=FOUND)
+
+        self.cache.get(key('1234'), lookup)
+        self.cache.get(key('1234'), lookup)
+
+        assert_that(lookup.call_count, equal_to(2))
+
+
+class TestDeferredLookup(TestCase):
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(1)
+        self.addCleanup(self.executor.shutdown)
+        self.cache = ReverseLookupCache(executor=self.executor, wait_budget=0.01)
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def slow_lookup(self):
+        self.release.wait(5)
+        return FOUND
+
+    def test_fast_lookup_is_returned(self):
+        assert_that(self.cache.get(key('1234'), lambda: FOUND), equal_to(FOUND))
+
+    def test_slow_lookup_is_cached_for_the_next_call(self):
+        assert_that(self.cache.get(key('1234'), self.slow_lookup), equal_to(None))
+        assert_that(self.cache.stats(), has_entries(late=1))
+
+        self.release.set()
+        self.executor.submit(lambda: None).result(5)
+
+        assert_that(self.cache.get(key('1234'), Mock()), equal_to(FOUND))
+
+    def test_failed_lookup_is_not_raised(self):
+        lookup = Mock(side_effect=ConnectionError)
+
+        assert_that(self.cache.get(key('1234'), lookup), equal_to(None))
+
+
+class TestReverse(TestCase):
+    def setUp(self):
+        patcher = patch.object(reverse_lookup, '_cache', ReverseLookupCache())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.dird_client = Mock()
+        self.dird_client.directories.reverse.return_value = FOUND
+
+    def test_numbers_are_normalized(self):
+        for number in ('418 555-1234', '(418) 555.1234', '4185551234'):
+            result = reverse_lookup.reverse(
+                self.dird_client, 'default', 'user', number, 'tenant'
+            )
+            assert_that(result, equal_to(FOUND))
+
+        self.dird_client.directories.reverse.assert_called_once_with(
+            profile='default',
+            user_uuid='user',
+            exten='418 555-1234',
+            tenant_uuid='tenant',
+        )
+
+    def test_users_do_not_share_results(self):
+        reverse_lookup.reverse(self.dird_client, 'default', 'alice', '1234', 'tenant')
+        reverse_lookup.reverse(self.dird_client, 'default', 'bob', '1234', 'tenant')
+
+        assert_that(self.dird_client.directories.reverse.call_count, equal_to(2))
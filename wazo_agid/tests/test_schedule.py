@@ -1,11 +1,13 @@
-# Copyright 2013-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2013-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from __future__ import annotations
 
 import datetime
 import unittest
-from unittest.mock import Mock, call
+from unittest.mock import Mock, call, patch
+
+import pytz
 
 from wazo_agid import dialplan_variables as dv
 from wazo_agid.schedule import (
@@ -243,6 +245,62 @@ class TestSchedule(unittest.TestCase):
         self._assert_schedule_is_in_state(schedule, current_time, 'opened')
 
 
+class TestScheduleTransitions(unittest.TestCase):
+    def setUp(self):
+        self.schedule = (
+            _a_schedule()
+            .opened(_a_period().hours('08:00-16:59').weekdays('1-5').build())
+            .closed(_a_period().hours('12:00-12:59').action(1).build())
+            .timezone_name('America/Montreal')
+            .build()
+        )
+
+    def test_next_transition_is_the_end_of_the_hours_range(self):
+        # wednesday, 10:00 in Montreal
+        state, until = self.schedule.compute_state_until(_utc(2024, 1, 10, 15, 0))
+
+        self.assertEqual('opened', state.state)
+        self.assertEqual(_utc(2024, 1, 10, 17, 0), until)
+
+    def test_next_transition_skips_boundaries_without_state_change(self):
+        # friday, 18:30 in Montreal, saturday 08:00 does not open
+        state, until = self.schedule.compute_state_until(_utc(2024, 1, 12, 23, 30))
+
+        self.assertEqual(('closed', None), (state.state, state.action))
+        self.assertEqual(_utc(2024, 1, 13, 17, 0), until)
+
+    def test_transition_to_another_closed_action(self):
+        # wednesday, 11:30 in Montreal
+        _, until = self.schedule.compute_state_until(_utc(2024, 1, 10, 16, 30))
+        state, _ = self.schedule.compute_state_until(until)
+
+        self.assertEqual(_utc(2024, 1, 10, 17, 0), until)
+        self.assertEqual(('closed', 1), (state.state, state.action))
+
+    def test_utc_offset_change_ends_the_search(self):
+        schedule = _a_schedule().timezone_name('Europe/Paris').build()
+
+        _, until = schedule.compute_state_until(_utc(2024, 3, 30, 12, 0))
+
+        self.assertEqual(_utc(2024, 3, 31, 1, 0), until)
+
+    def test_state_is_reused_until_the_next_transition(self):
+        with patch.object(
+            self.schedule,
+            'compute_state_until',
+            wraps=self.schedule.compute_state_until,
+        ) as compute_state_until:
+            first = self.schedule.compute_state_for_now()
+            second = self.schedule.compute_state_for_now()
+
+        self.assertIs(first, second)
+        compute_state_until.assert_called_once()
+
+
+def _utc(*args):
+    return pytz.utc.localize(datetime.datetime(*args))
+
+
 def _a_schedule():
     return ScheduleBuilder()
 
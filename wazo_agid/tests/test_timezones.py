@@ -0,0 +1,74 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import datetime
+import unittest
+import zoneinfo
+from unittest.mock import Mock
+
+from hamcrest import assert_that, calling, equal_to, instance_of, raises, same_instance
+
+from .. import timezones
+from ..cache import EntityCache
+from ..schedule import ScheduleBuilder, SchedulePeriodBuilder
+
+
+class TestGetTimezone(unittest.TestCase):
+    def tearDown(self):
+        timezones.configure(timezones.DEFAULT_BACKEND)
+
+    def test_timezones_are_loaded_once(self):
+        timezone = timezones.get_timezone('America/Montreal')
+
+        assert_that(timezones.get_timezone('America/Montreal'), same_instance(timezone))
+
+    def test_zoneinfo_backend(self):
+        timezones.configure('zoneinfo')
+
+        timezone = timezones.get_timezone('Europe/Paris')
+
+        assert_that(timezone, instance_of(zoneinfo.ZoneInfo))
+
+    def test_unknown_backend(self):
+        assert_that(
+            calling(timezones.configure).with_args('dateutil'), raises(ValueError)
+        )
+
+    def test_schedule_transitions_with_zoneinfo(self):
+        timezones.configure('zoneinfo')
+        schedule = (
+            ScheduleBuilder()
+            .opened(SchedulePeriodBuilder().hours('08:00-16:59').build())
+            .timezone_name('Europe/Paris')
+            .build()
+        )
+        utc_now = datetime.datetime(2024, 3, 30, 12, tzinfo=datetime.timezone.utc)
+
+        state, until = schedule.compute_state_until(utc_now)
+
+        assert_that(state.state, equal_to('opened'))
+        assert_that(
+            until,
+            equal_to(datetime.datetime(2024, 3, 30, 16, tzinfo=datetime.timezone.utc)),
+        )
+
+
+class TestGetDefaultTimezoneName(unittest.TestCase):
+    def setUp(self):
+        self.infos_cache = timezones._infos_cache
+        timezones._infos_cache = EntityCache('infos')
+
+    def tearDown(self):
+        timezones._infos_cache = self.infos_cache
+
+    def test_infos_are_queried_once(self):
+        cursor = Mock()
+        cursor.fetchone.return_value = {'timezone': 'America/Montreal'}
+
+        timezones.get_default_timezone_name(cursor)
+        name = timezones.get_default_timezone_name(cursor)
+
+        assert_that(name, equal_to('America/Montreal'))
+        cursor.execute.assert_called_once_with("SELECT timezone FROM infos")
@@ -0,0 +1,167 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+from collections import deque
+from unittest import TestCase
+from unittest.mock import patch
+
+import sqlalchemy
+from hamcrest import (
+    assert_that,
+    calling,
+    contains_exactly,
+    empty,
+    equal_to,
+    has_entries,
+    has_length,
+    raises,
+)
+
+from .. import metrics, tracing
+
+
+class TestFingerprints(TestCase):
+    def test_query_literals_are_replaced(self):
+        query = (
+            "SELECT *  FROM userfeatures\n WHERE id = 42 AND name = 'it''s' "
+            "AND rightcall.id IN (1, 2, 3) AND col1 = 'x'"
+        )
+
+        assert_that(
+            tracing.query_fingerprint(query),
+            equal_to(
+                'SELECT * FROM userfeatures WHERE id = ? AND name = ? '
+                'AND rightcall.id IN (...) AND col1 = ?'
+            ),
+        )
+
+    def test_url_ids_are_replaced(self):
+        url = (
+            'https://localhost:9486/api/confd/1.1/users/'
+            '6d04d6f8-0c4f-4a4b-9e0a-1d0a2b5d6c7e/services/dnd?recurse=true'
+        )
+
+        assert_that(
+            tracing.url_fingerprint('PUT', url),
+            equal_to('PUT /api/confd/1.1/users/{id}/services/dnd'),
+        )
+        assert_that(
+            tracing.url_fingerprint('GET', 'http://localhost/1.0/agents/12'),
+            equal_to('GET /1.0/agents/{id}'),
+        )
+
+
+class TestTrace(TestCase):
+    def setUp(self):
+        tracing.configure(True, min_duration=0)
+        self.addCleanup(tracing.configure, False)
+        registry_patcher = patch.object(metrics, 'registry', metrics.Registry())
+        registry_patcher.start()
+        self.addCleanup(registry_patcher.stop)
+        recent: deque[dict] = deque(maxlen=2)
+        recent_patcher = patch.object(tracing, '_recent', recent)
+        recent_patcher.start()
+        self.addCleanup(recent_patcher.stop)
+
+    def test_spans_are_nested(self):
+        with metrics.track_request() as timer:
+            timer.handler = 'incoming_user_set_features'
+            with metrics.timed('handler', 'incoming_user_set_features'):
+                with metrics.timed('db', 'SELECT ?'):
+                    pass
+                with metrics.timed('agi', 'GET VARIABLE'):
+                    pass
+                with metrics.timed('agi', 'GET VARIABLE'):
+                    pass
+
+        trace = tracing.recent_traces()[-1]
+        assert_that(
+            trace,
+            has_entries(handler='incoming_user_set_features', error=None, span_count=4),
+        )
+        handler_span = trace['spans']['children'][0]
+        assert_that(
+            handler_span['children'],
+            contains_exactly(
+                has_entries(kind='db', name='SELECT ?'),
+                has_entries(kind='agi', name='GET VARIABLE'),
+                has_entries(kind='agi', name='GET VARIABLE'),
+            ),
+        )
+        assert_that(
+            trace['summary'],
+            has_length(3),
+        )
+        assert_that(
+            [entry for entry in trace['summary'] if entry['kind'] == 'agi'],
+            contains_exactly(has_entries(name='GET VARIABLE', count=2)),
+        )
+
+    def test_failed_queries_are_ended(self):
+        metrics._instrument_sqlalchemy()
+        engine = sqlalchemy.create_engine('sqlite://')
+
+        with metrics.track_request() as timer:
+            timer.handler = 'user_set_call_rights'
+            with metrics.timed('handler', 'user_set_call_rights'):
+                with engine.connect() as conn:
+                    assert_that(
+                        calling(conn.execute).with_args('SELECT * FROM missing'),
+                        raises(sqlalchemy.exc.OperationalError),
+                    )
+                    conn.execute('SELECT 1')
+                    assert_that(conn.info[metrics.QUERY_START_KEY], empty())
+
+        handler_span = tracing.recent_traces()[-1]['spans']['children'][0]
+        assert_that(
+            handler_span['children'],
+            contains_exactly(
+                has_entries(kind='db', name='SELECT * FROM missing'),
+                has_entries(kind='db', name='SELECT ?'),
+            ),
+        )
+
+    def test_span_name_function_is_only_called_when_tracing(self):
+        tracing.configure(False)
+        names: list[str] = []
+
+        def name() -> str:
+            names.append('called')
+            return 'SELECT'
+
+        with metrics.track_request():
+            with metrics.timed('db', name):
+                pass
+
+        assert_that(names, empty())
+
+    def test_fast_requests_are_not_kept(self):
+        tracing.configure(True, min_duration=60)
+
+        with metrics.track_request():
+            pass
+
+        assert_that(tracing.recent_traces(), empty())
+
+    def test_buffer_keeps_the_last_traces(self):
+        for name in ('first', 'second', 'third'):
+            with metrics.track_request() as timer:
+                timer.handler = name
+
+        assert_that(
+            [trace['handler'] for trace in tracing.recent_traces()],
+            contains_exactly('second', 'third'),
+        )
+
+    def test_spans_above_the_limit_are_summarized(self):
+        with patch.object(tracing, 'MAX_SPANS', 2):
+            with metrics.track_request():
+                for _ in range(5):
+                    with metrics.timed('agi', 'NOOP'):
+                        pass
+
+        trace = tracing.recent_traces()[-1]
+        assert_that(trace['spans']['children'], has_length(2))
+        assert_that(trace['summary'], contains_exactly(has_entries(count=5)))
@@ -0,0 +1,74 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import socket
+import threading
+from unittest import TestCase
+
+from hamcrest import assert_that, equal_to, has_entries
+
+from ..workers import REJECT_COMMANDS, WorkerPool, reject_connection
+
+
+class TestWorkerPool(TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.started = threading.Semaphore(0)
+        self.processed: list[int] = []
+
+        def process(item):
+            self.started.release()
+            self.release.wait()
+            self.processed.append(item)
+
+        self.pool = WorkerPool(process, max_workers=2, queue_size=1)
+        self.addCleanup(self.pool.shutdown)
+        self.addCleanup(self.release.set)
+
+    def test_submit_is_refused_when_queue_is_full(self):
+        for item in (1, 2):
+            assert_that(self.pool.submit(item), equal_to(True))
+            self.started.acquire()
+        assert_that(self.pool.submit(3), equal_to(True))
+
+        assert_that(self.pool.submit(4), equal_to(False))
+        assert_that(
+            self.pool.stats(),
+            has_entries(max_workers=2, busy=2, queued=1, rejected=1),
+        )
+
+    def test_queued_items_are_processed(self):
+        for item in range(3):
+            self.pool.submit(item)
+            if item < 2:
+                self.started.acquire()
+
+        self.release.set()
+        self.pool.shutdown()
+
+        assert_that(sorted(self.processed), equal_to([0, 1, 2]))
+
+
+class TestRejectConnection(TestCase):
+    def test_call_is_sent_to_agi_fail(self):
+        asterisk, agid = socket.socketpair()
+        self.addCleanup(asterisk.close)
+        asterisk.sendall(b'agi_network_script: foo\nagi_channel: PJSIP/abc\n\n')
+
+        reject_connection(agid)
+        agid.close()
+
+        received = b''
+        while data := asterisk.recv(4096):
+            received += data
+        assert_that(received, equal_to(REJECT_COMMANDS))
+
+    def test_closed_connection(self):
+        asterisk, agid = socket.socketpair()
+        asterisk.close()
+
+        reject_connection(agid)
+
+        agid.close()
@@ -0,0 +1,53 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import datetime
+import logging
+import zoneinfo
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+import pytz
+
+from wazo_agid import cache
+
+if TYPE_CHECKING:
+    from psycopg2.extras import DictCursor
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('pytz', 'zoneinfo')
+DEFAULT_BACKEND = 'pytz'
+
+_backend = DEFAULT_BACKEND
+_infos_cache = cache.get_cache('infos')
+
+
+def configure(backend: str) -> None:
+    global _backend
+
+    if backend not in BACKENDS:
+        raise ValueError(f'unknown timezone backend {backend!r}')
+    logger.debug('using %s timezones', backend)
+    _backend = backend
+    get_timezone.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def get_timezone(name: str) -> datetime.tzinfo:
+    """Return the timezone named `name`, loaded once per process"""
+    if _backend == 'zoneinfo':
+        return zoneinfo.ZoneInfo(name)
+    return pytz.timezone(name)
+
+
+def get_default_timezone_name(cursor: DictCursor) -> str:
+    """Return the timezone of the system, cached until the next reload"""
+
+    def load() -> str:
+        cursor.execute("SELECT timezone FROM infos")
+        return cursor.fetchone()['timezone']
+
+    return _infos_cache.get('timezone', load)
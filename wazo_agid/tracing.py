@@ -0,0 +1,180 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Opt-in traces of the AGI requests.
+
+A trace is the tree of the spans of one request: the handler, the AGI
+commands, the SQL queries and the HTTP calls, with their timings. Finished
+traces are logged as JSON lines on the wazo_agid.trace logger and the last
+ones are kept in memory, to be served with the metrics.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+import threading
+import time
+from collections import deque
+from typing import Any
+
+logger = logging.getLogger(__name__)
+trace_logger = logging.getLogger('wazo_agid.trace')
+
+DEFAULT_MIN_DURATION = 0.0
+DEFAULT_BUFFER_SIZE = 100
+# Spans recorded for each trace, the following ones are only summarized
+MAX_SPANS = 500
+MAX_NAME_LENGTH = 200
+
+re_string_literal = re.compile(r"'(?:[^']|'')*'")
+re_number = re.compile(r'(?<![\w$])-?\d+(?:\.\d+)?\b')
+re_value_list = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+re_whitespace = re.compile(r'\s+')
+re_path_id = re.compile(
+    r'/(?:\d+|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})(?=/|$)',
+    re.IGNORECASE,
+)
+
+_settings = {
+    'enabled': False,
+    'min_duration': DEFAULT_MIN_DURATION,
+}
+_recent: deque[dict[str, Any]] = deque(maxlen=DEFAULT_BUFFER_SIZE)
+_recent_lock = threading.Lock()
+
+
+def query_fingerprint(query: str) -> str:
+    """Return the query with its literal values replaced by ?"""
+    query = re_string_literal.sub('?', query)
+    query = re_number.sub('?', query)
+    query = re_value_list.sub('(...)', query)
+    return re_whitespace.sub(' ', query).strip()[:MAX_NAME_LENGTH]
+
+
+def url_fingerprint(method: str, url: str) -> str:
+    """Return the method and the path of the URL with its ids replaced by {id}"""
+    path = url.split('://', 1)[-1].partition('/')[2].split('?', 1)[0]
+    return f'{method} {re_path_id.sub("/{id}", "/" + path)}'[:MAX_NAME_LENGTH]
+
+
+class Span:
+    __slots__ = ('kind', 'name', 'start', 'duration', 'children')
+
+    def __init__(self, kind: str, name: str, start: float) -> None:
+        self.kind = kind
+        self.name = name
+        self.start = start
+        self.duration = 0.0
+        self.children: list[Span] = []
+
+    def as_dict(self, origin: float) -> dict[str, Any]:
+        span = {
+            'kind': self.kind,
+            'name': self.name,
+            'start': round(self.start - origin, 6),
+            'duration': round(self.duration, 6),
+        }
+        if self.children:
+            span['children'] = [child.as_dict(origin) for child in self.children]
+        return span
+
+
+class Trace:
+    """Spans of one request, started and ended in order"""
+
+    def __init__(self) -> None:
+        self.timestamp = time.time()
+        self.start = time.perf_counter()
+        self.root = Span('request', '', self.start)
+        self._stack = [self.root]
+        self.span_count = 0
+        # (kind, name) -> [count, total duration], for all the spans
+        self.summary: dict[tuple[str, str], list] = {}
+
+    def begin(self, kind: str, name: str) -> None:
+        span = Span(kind, name, time.perf_counter())
+        if self.span_count < MAX_SPANS:
+            self._stack[-1].children.append(span)
+        self.span_count += 1
+        self._stack.append(span)
+
+    def end(self, duration: float) -> None:
+        span = self._stack.pop()
+        span.duration = duration
+        totals = self.summary.get((span.kind, span.name))
+        if totals is None:
+            self.summary[(span.kind, span.name)] = [1, duration]
+        else:
+            totals[0] += 1
+            totals[1] += duration
+
+    def as_dict(
+        self, handler: str, error: str | None, duration: float
+    ) -> dict[str, Any]:
+        self.root.name = handler
+        self.root.duration = duration
+        return {
+            'handler': handler,
+            'timestamp': self.timestamp,
+            'duration': round(duration, 6),
+            'error': error,
+            'span_count': self.span_count,
+            'summary': [
+                {
+                    'kind': kind,
+                    'name': name,
+                    'count': count,
+                    'duration': round(total, 6),
+                }
+                for (kind, name), (count, total) in sorted(
+                    self.summary.items(), key=lambda item: -item[1][1]
+                )
+            ],
+            'spans': self.root.as_dict(self.start),
+        }
+
+
+def configure(
+    enabled: bool,
+    min_duration: float = DEFAULT_MIN_DURATION,
+    buffer_size: int = DEFAULT_BUFFER_SIZE,
+) -> None:
+    global _recent
+    logger.debug(
+        'tracing: enabled=%s min_duration=%s buffer_size=%s',
+        enabled,
+        min_duration,
+        buffer_size,
+    )
+    _settings.update(enabled=enabled, min_duration=min_duration)
+    with _recent_lock:
+        _recent = deque(_recent, maxlen=buffer_size)
+
+
+def is_enabled() -> bool:
+    return bool(_settings['enabled'])
+
+
+def new_trace() -> Trace | None:
+    if not _settings['enabled']:
+        return None
+    return Trace()
+
+
+def finish(trace: Trace, handler: str, error: str | None, duration: float) -> None:
+    """Log the trace of a request slower than the configured min_duration"""
+    if duration < _settings['min_duration']:
+        return
+
+    trace_dict = trace.as_dict(handler, error, duration)
+    with _recent_lock:
+        _recent.append(trace_dict)
+    trace_logger.info('%s', json.dumps(trace_dict, separators=(',', ':')))
+
+
+def recent_traces() -> list[dict[str, Any]]:
+    with _recent_lock:
+        return list(_recent)
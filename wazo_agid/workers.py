@@ -0,0 +1,117 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import logging
+import queue
+import socket
+import threading
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+# Each worker holds a database connection for the whole request, the number
+# of workers is limited to the size of the connection pool
+DEFAULT_MAX_WORKERS = 10
+DEFAULT_QUEUE_SIZE = 64
+REJECT_TIMEOUT = 0.5
+# Threads rejecting the connections, so that slow clients do not block the
+# accept loop, and connections waiting for them
+REJECT_WORKERS = 4
+REJECT_QUEUE_SIZE = 256
+MAX_AGI_ENV_SIZE = 65536
+
+# Same commands as the error path of the handlers: send the call to the
+# agi_fail extension and make the AGI fail
+REJECT_COMMANDS = b'EXEC Goto "agi_fail,s,1"\nfailure to have pure code\n'
+
+_STOP = object()
+
+
+def reject_connection(sock: socket.socket) -> None:
+    """Send the call to agi_fail without waiting for the results"""
+    try:
+        sock.settimeout(REJECT_TIMEOUT)
+        # Closing the socket before reading the AGI environment would reset
+        # the connection before Asterisk reads the commands
+        received = b''
+        while b'\n\n' not in received and len(received) < MAX_AGI_ENV_SIZE:
+            data = sock.recv(4096)
+            if not data:
+                return
+            received += data
+        sock.sendall(REJECT_COMMANDS)
+    except OSError as e:
+        logger.debug('error while rejecting AGI connection: %s', e)
+
+
+class WorkerPool:
+    """
+    Fixed number of threads processing the accepted connections.
+
+    At most `queue_size` connections wait for a thread, submit() refuses the
+    following ones so that they can be rejected instead of waiting.
+    """
+
+    def __init__(
+        self,
+        process: Callable[..., Any],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        name: str = 'agid-worker',
+    ) -> None:
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self._process = process
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self.busy = 0
+        self.rejected = 0
+
+        self._threads = [
+            threading.Thread(target=self._work, name=f'{name}-{i}', daemon=True)
+            for i in range(max_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, *args: Any) -> bool:
+        try:
+            self._queue.put_nowait(args)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            return False
+        return True
+
+    def shutdown(self) -> None:
+        threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(_STOP)
+        for thread in threads:
+            thread.join()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'max_workers': self.max_workers,
+            'busy': self.busy,
+            'queued': self._queue.qsize(),
+            'rejected': self.rejected,
+        }
+
+    def _work(self) -> None:
+        while True:
+            args = self._queue.get()
+            if args is _STOP:
+                return
+
+            with self._lock:
+                self.busy += 1
+            try:
+                self._process(*args)
+            except Exception:
+                logger.exception('unexpected exception in worker')
+            finally:
+                with self._lock:
+                    self.busy -= 1